@@ -1,7 +1,7 @@
 # app_with_ngrok.py
 import streamlit as st
 from diary_storage import DiaryStorage
-from diary_pdf import DiaryPDFMaker
+from mind_coach import WARMUP
 from datetime import datetime, timedelta
 import os
 from pyngrok import ngrok
@@ -98,6 +98,10 @@ def get_storage():
 
 storage = get_storage()
 
+# Mind Coach 백그라운드 워밍업 (프로세스당 1회, 첫 일기 작성 시 콜드 스타트 방지)
+if os.getenv("OPENAI_API_KEY"):
+    WARMUP.start(os.getenv("OPENAI_API_KEY"), storage=storage)
+
 # =============================
 # 더미 데이터 - 식물 정보
 # =============================
@@ -404,7 +408,9 @@ def generate_pdf(plant_name):
         # 통계 가져오기
         stats = storage.get_statistics(plant_name)
         
-        # PDF 생성
+        # PDF 생성 (reportlab은 무거우므로 내보낼 때만 import)
+        from diary_pdf import DiaryPDFMaker
+        
         pdf_maker = DiaryPDFMaker()
         pdf_path = pdf_maker.create_diary_book(diaries, plant_name, stats)
         
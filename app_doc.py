@@ -19,6 +19,7 @@ from plant_doctor import (
     PlantDiseaseRAG,
     TextPreprocessor
 )
+from ncpms_cache import NcpmsResponseCache
 
 # ===== 페이지 설정 =====
 st.set_page_config(
@@ -48,6 +49,9 @@ if not OPENAI_API_KEY:
     st.error("[오류] OPENAI_API_KEY 환경변수를 설정해 주세요.")
     st.stop()
 
+# 작물 인덱스를 이 시간(초)보다 오래 동기화하지 않았으면 기존 인덱스로 답하면서 백그라운드 동기화
+INDEX_MAX_AGE = 7 * 24 * 3600
+
 # ===== 세션 상태 초기화 함수 =====
 def init_session_state():
     """세션 상태 초기화"""
@@ -80,7 +84,8 @@ def init_session_state():
 @st.cache_resource
 def init_systems():
     """시스템 초기화"""
-    collector = PlantDiseaseCollector(api_key=NCPMS_API_KEY)
+    # 병해충 기준 정보는 거의 바뀌지 않으므로 디스크 캐시 사용 (MYGREEN_NCPMS_OFFLINE=1이면 캐시만 사용)
+    collector = PlantDiseaseCollector(api_key=NCPMS_API_KEY, cache=NcpmsResponseCache())
     rag_system = PlantDiseaseRAG(openai_api_key=OPENAI_API_KEY)
     return collector, rag_system
 
@@ -90,32 +95,53 @@ collector, rag_system = init_systems()
 def load_crop_data_background(crop_name):
     """백그라운드에서 작물 데이터 수집 (스레드 내부)"""
     try:
-        # ChromaDB에 이미 있는지 확인
-        chroma_dir = rag_system._get_chroma_dir(crop_name)
-        if chroma_dir.exists():
+        # 완성된 ChromaDB 인덱스가 이미 있는지 확인
+        if rag_system.index_ready(crop_name):
             return {"status": "ready", "crop": crop_name}
         
-        # 데이터 수집
-        diseases = collector.collect_all_data(crop_name)
-        
-        if diseases:
-            # ChromaDB 인덱스 생성
-            rag_system.create_crop_index(crop_name, diseases)
-            return {"status": "ready", "crop": crop_name}
-        else:
-            return {"status": "error", "crop": crop_name}
+        # 데이터 수집과 ChromaDB 인덱스 생성을 파이프라인으로 진행 (수집 실패 시 RuntimeError)
+        rag_system.stream_crop_index(crop_name, collector)
+        return {"status": "ready", "crop": crop_name}
     except Exception as e:
         print(f"[오류] {crop_name} 데이터 로딩 실패: {e}")
         return {"status": "error", "crop": crop_name}
 
+@st.cache_resource
+def get_sync_registry():
+    """진행 중인 인덱스 동기화 작물 목록 (세션 간 공유)"""
+    return {"crops": set(), "lock": threading.Lock()}
+
+def sync_crop_index_background(crop_name):
+    """백그라운드에서 작물 인덱스 증분 동기화 (스레드 내부)"""
+    registry = get_sync_registry()
+    try:
+        rag_system.sync_crop_index(crop_name, collector)
+    except Exception as e:
+        print(f"[경고] {crop_name} 인덱스 동기화 실패, 기존 인덱스 유지: {e}")
+    finally:
+        with registry["lock"]:
+            registry["crops"].discard(crop_name)
+
+def revalidate_crop_index(crop_name):
+    """기존 인덱스가 오래되었으면 동기화 시작 (stale-while-revalidate, 이미 진행 중이면 무시)"""
+    if not rag_system.needs_sync(crop_name, INDEX_MAX_AGE):
+        return
+    registry = get_sync_registry()
+    with registry["lock"]:
+        if crop_name in registry["crops"]:
+            return
+        registry["crops"].add(crop_name)
+    thread = threading.Thread(target=sync_crop_index_background, args=(crop_name,))
+    thread.daemon = True
+    thread.start()
+
 def check_crop_loading_status():
     """작물 로딩 상태 확인 및 업데이트"""
     # 로딩 중인 작물이 있는지 확인
     for crop_name in list(st.session_state.crop_loading.keys()):
         if st.session_state.crop_loading[crop_name]:
-            # ChromaDB 확인
-            chroma_dir = rag_system._get_chroma_dir(crop_name)
-            if chroma_dir.exists():
+            # ChromaDB 확인 (디렉토리만 있고 생성 중이면 아직 준비되지 않음)
+            if rag_system.index_ready(crop_name):
                 st.session_state.crop_data[crop_name] = "ready"
                 st.session_state.crop_loading[crop_name] = False
                 
@@ -138,9 +164,10 @@ def select_crop(crop_name):
     st.session_state.current_crop = crop_name
     st.session_state.show_crop_selection = False
     
-    # ChromaDB에 이미 있는지 확인
-    chroma_dir = rag_system._get_chroma_dir(crop_name)
-    if chroma_dir.exists():
+    # 완성된 ChromaDB 인덱스가 이미 있는지 확인
+    if rag_system.index_ready(crop_name):
+        # 기존 인덱스로 바로 답하고, 오래되었으면 뒤에서 갱신
+        revalidate_crop_index(crop_name)
         st.session_state.crop_data[crop_name] = "ready"
         st.session_state.messages.append({
             "role": "assistant",
@@ -179,11 +206,8 @@ def perform_diagnosis(symptom_text):
         st.session_state.show_crop_selection = True
         return
     
-    # ChromaDB 파일 시스템 직접 체크
-    chroma_dir = rag_system._get_chroma_dir(crop_name)
-    
-    # 데이터가 준비되지 않음
-    if not chroma_dir.exists():
+    # 데이터가 준비되지 않음 (인덱스가 없거나 아직 생성 중)
+    if not rag_system.index_ready(crop_name):
         # 로딩 상태가 아니면 로딩 시작
         if not st.session_state.crop_loading.get(crop_name, False):
             st.session_state.crop_loading[crop_name] = True
@@ -345,8 +369,7 @@ def main():
             # ChromaDB가 준비되었는지 확인
             crop_name = st.session_state.current_crop
             if crop_name:
-                chroma_dir = rag_system._get_chroma_dir(crop_name)
-                if chroma_dir.exists():
+                if rag_system.index_ready(crop_name):
                     # 즉시 진단
                     perform_diagnosis(prompt)
                 else:
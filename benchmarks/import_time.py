@@ -0,0 +1,130 @@
+"""
+모듈 import 시간 예산 리포트
+- 모듈마다 새 인터프리터에서 `python -X importtime`으로 import
+- 누적 import 시간과 가장 무거운 최상위 패키지 요약
+- 모듈별 예산(ms)과 비교 (--check 지정 시 초과하면 종료 코드 1)
+
+Streamlit 페이지(pages/*.py, app.py, app_doc.py)는 Streamlit 런타임 밖에서
+import할 수 없으므로, 페이지가 시작할 때 불러오는 모듈을 측정합니다.
+
+사용 예:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --check --repeat 3
+"""
+
+import re
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 모듈별 import 시간 예산 (ms) - 무거운 의존성은 실제 사용 시점에 import
+IMPORT_BUDGETS_MS: Dict[str, float] = {
+    "metrics": 50,
+    "embedding_ingest": 50,
+    "diary_storage": 600,
+    "vector_index": 250,
+    "mind_coach": 300,
+    "plant_doctor": 300,
+    "diary_backfill": 900,
+    "diary_pdf": 1000,
+}
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_import(module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    새 인터프리터에서 모듈 하나를 import하고 -X importtime 출력을 분석
+
+    Returns:
+        (누적 import 시간 ms, [(최상위 패키지, 누적 ms)] 무거운 순)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(ROOT),
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"'{module}' import 실패:\n{result.stderr[-2000:]}")
+
+    total_ms = 0.0
+    packages: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative_ms = int(match.group(2)) / 1000
+        depth = len(match.group(3)) // 2
+        name = match.group(4)
+        if depth == 0:
+            # 자식이 먼저 출력되고 최상위 모듈이 마지막에 출력됨 (site 등 시작 import는 버림)
+            if name == module:
+                total_ms = cumulative_ms
+                break
+            packages = {}
+        elif depth == 1:
+            # 들여쓰기 1단계 = 측정 대상 모듈이 직접 불러온 모듈
+            top = name.split(".")[0]
+            packages[top] = packages.get(top, 0.0) + cumulative_ms
+
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return total_ms, heaviest
+
+
+def run_report(modules: List[str], repeat: int = 1, top: int = 3) -> Dict[str, Dict]:
+    """
+    모듈별 import 시간 측정 (repeat회 중 최솟값 사용)
+
+    Returns:
+        {모듈: {"ms", "budget_ms", "over_budget", "heaviest"}}
+    """
+    report = {}
+    for module in modules:
+        runs = [measure_import(module) for _ in range(max(1, repeat))]
+        total_ms, heaviest = min(runs, key=lambda run: run[0])
+        budget = IMPORT_BUDGETS_MS.get(module)
+        report[module] = {
+            "ms": round(total_ms, 1),
+            "budget_ms": budget,
+            "over_budget": budget is not None and total_ms > budget,
+            "heaviest": [(name, round(ms, 1)) for name, ms in heaviest[:top]],
+        }
+    return report
+
+
+def print_report(report: Dict[str, Dict]):
+    """측정 결과 표 출력"""
+    print(f"{'module':<18} {'import ms':>10} {'budget':>8}  heaviest imports")
+    for module, row in report.items():
+        budget = f"{row['budget_ms']:g}" if row["budget_ms"] is not None else "-"
+        mark = " !" if row["over_budget"] else ""
+        heaviest = ", ".join(f"{name} {ms:.0f}ms" for name, ms in row["heaviest"])
+        print(f"{module:<18} {row['ms']:>10.1f} {budget:>8}{mark}  {heaviest}")
+
+
+def main():
+    """명령행 실행"""
+    parser = argparse.ArgumentParser(description="모듈 import 시간 예산 리포트")
+    parser.add_argument("modules", nargs="*", help="측정할 모듈 (생략 시 예산이 정해진 전체)")
+    parser.add_argument("--repeat", type=int, default=1, help="모듈별 반복 측정 횟수 (최솟값 사용)")
+    parser.add_argument("--top", type=int, default=3, help="표시할 무거운 import 수")
+    parser.add_argument("--check", action="store_true", help="예산 초과 시 종료 코드 1")
+    args = parser.parse_args()
+
+    report = run_report(args.modules or list(IMPORT_BUDGETS_MS), repeat=args.repeat, top=args.top)
+    print_report(report)
+
+    over = [module for module, row in report.items() if row["over_budget"]]
+    if over:
+        print(f"[경고] import 시간 예산 초과: {', '.join(over)}")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+벤치마크/대체 서버용 지연 시간 분포
+
+형식:
+    const:0.4            항상 0.4초
+    uniform:0.2,0.8      0.2~0.8초 균등 분포
+    lognormal:0.5,0.4    중앙값 0.5초, sigma 0.4 로그정규 분포
+"""
+
+import math
+import random
+import threading
+
+
+class LatencyModel:
+    """지연 시간 분포 (const / uniform / lognormal)"""
+
+    def __init__(self, spec: str, seed: int = 0):
+        kind, _, args = spec.partition(":")
+        self.kind = kind
+        self.args = [float(x) for x in args.split(",") if x]
+        if kind not in ("const", "uniform", "lognormal"):
+            raise ValueError(f"알 수 없는 지연 분포: {spec}")
+        self.spec = spec
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "const":
+                return self.args[0]
+            if self.kind == "uniform":
+                return self._rng.uniform(self.args[0], self.args[1])
+            median, sigma = self.args
+            return self._rng.lognormvariate(math.log(median), sigma)
@@ -0,0 +1,327 @@
+"""
+MindCoachRAG 오프라인 벤치마크
+- ChatOpenAI/OpenAIEmbeddings 대신 지연 시간 분포를 설정할 수 있는 결정적 로컬 가짜 모델 사용
+- 목표 동시성으로 get_full_response를 반복 호출
+- 처리량, 지연 시간 분위수, 메모리(tracemalloc 최대치, 최대 RSS), 단계별 지연 요약 출력
+
+지연 시간 분포 형식:
+    const:0.4            항상 0.4초
+    uniform:0.2,0.8      0.2~0.8초 균등 분포
+    lognormal:0.5,0.4    중앙값 0.5초, sigma 0.4 로그정규 분포
+
+사용 예:
+    python benchmarks/mind_coach_bench.py --requests 200 --concurrency 16
+    python benchmarks/mind_coach_bench.py --chat-latency lognormal:0.8,0.5 --duplicate-ratio 0.3 --json bench.json
+"""
+
+import sys
+import json
+import time
+import zlib
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from latency_model import LatencyModel
+from metrics import REGISTRY
+from mind_coach import MindCoachRAG
+from rate_limiter import GOVERNOR
+from token_budget import count_tokens
+from vector_index import NumpyVectorIndex
+
+# 가짜 모델 호출 수 집계용
+_COUNT_LOCK = threading.Lock()
+
+
+class FakeChatModel(BaseChatModel):
+    """결정적 응답 + 설정한 지연 시간을 갖는 가짜 채팅 모델"""
+
+    latency: Any
+    output_tokens: int = 80
+    calls: int = 0
+    input_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": "fake-chat", "latency": self.latency.spec, "output_tokens": self.output_tokens}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        prompt_tokens = count_tokens(prompt)
+        with _COUNT_LOCK:
+            self.calls += 1
+            self.input_tokens += prompt_tokens
+        time.sleep(self.latency.sample())
+
+        seed = zlib.crc32(prompt.encode("utf-8"))
+        filler = "천천히 자라는 식물처럼 오늘도 잘 버텼어요. " * max(1, self.output_tokens // 20)
+        if "JSON" in prompt:
+            content = json.dumps({
+                "summary": "오늘 하루를 돌아본 일기",
+                "cheer": filler.strip(),
+                "emotion": seed % 101
+            }, ensure_ascii=False)
+        else:
+            content = filler.strip()
+
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": count_tokens(content),
+                "total_tokens": prompt_tokens + count_tokens(content),
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class FakeEmbeddings(Embeddings):
+    """텍스트 해시로 만든 결정적 벡터 + 설정한 지연 시간을 갖는 가짜 임베딩"""
+
+    def __init__(self, latency: LatencyModel, size: int = 1536):
+        self.latency = latency
+        self.size = size
+        self.model = "fake-embedding"
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        vector = rng.standard_normal(self.size).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with _COUNT_LOCK:
+            self.calls += 1
+        time.sleep(self.latency.sample())
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+_SENTENCES = [
+    "오늘은 아침부터 비가 내려서 기분이 가라앉았다.",
+    "회사에서 발표를 무사히 마쳐서 뿌듯했다.",
+    "친구와 오랜만에 통화하면서 많이 웃었다.",
+    "요즘 잠을 잘 못 자서 하루 종일 피곤했다.",
+    "베란다 화분에 새 잎이 돋아난 걸 발견했다.",
+    "작은 실수 하나로 하루 종일 마음이 불편했다.",
+    "저녁에 산책을 하면서 생각을 정리했다.",
+    "가족과 함께 밥을 먹으니 마음이 편안해졌다.",
+]
+
+
+def make_diaries(count: int, sentences: int, duplicate_ratio: float, seed: int) -> List[str]:
+    """합성 일기 목록 (duplicate_ratio 비율만큼 같은 일기가 반복됨)"""
+    rng = random.Random(seed)
+    unique = max(1, int(round(count * (1 - duplicate_ratio))))
+    pool = [
+        " ".join(rng.choice(_SENTENCES) for _ in range(sentences)) + f" ({i}번째 일기)"
+        for i in range(unique)
+    ]
+    return [pool[i % unique] for i in range(count)]
+
+
+def make_corpus(count: int, seed: int) -> List[str]:
+    """위로 메시지 코퍼스 (청크 크기 정도의 합성 문단)"""
+    rng = random.Random(seed)
+    phrases = [
+        "씨앗은 땅속에서 오래 기다린 뒤에야 싹을 틔웁니다.",
+        "잎이 떨어진 나무도 봄이 오면 다시 새순을 냅니다.",
+        "뿌리는 보이지 않는 곳에서 먼저 깊어집니다.",
+        "햇빛이 부족한 날에도 식물은 조금씩 자랍니다.",
+        "꽃은 저마다 피는 계절이 다릅니다.",
+    ]
+    return [" ".join(rng.choice(phrases) for _ in range(8)) + f" [{i}]" for i in range(count)]
+
+
+def build_store(kind: str, corpus: List[str], embeddings: Embeddings, work_dir: Path):
+    """벤치마크용 벡터 스토어 (numpy 또는 chroma)"""
+    if kind == "numpy":
+        vectors = embeddings.embed_documents(corpus)
+        return NumpyVectorIndex(vectors, corpus, embedding_function=embeddings)
+
+    from langchain_community.vectorstores import Chroma
+    return Chroma.from_texts(corpus, embeddings, persist_directory=str(work_dir / "chroma"))
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    """설정대로 벤치마크를 실행하고 결과 요약 반환"""
+    if not args.keep_limits:
+        # 기본 속도 제한이 측정을 왜곡하지 않도록 사실상 무제한으로 설정
+        for family in ("chat", "embeddings"):
+            GOVERNOR.configure(family, rpm=10**9, tpm=None, max_concurrency=10**6)
+
+    chat = FakeChatModel(latency=LatencyModel(args.chat_latency, args.seed), output_tokens=args.output_tokens)
+    embeddings = FakeEmbeddings(LatencyModel(args.embed_latency, args.seed + 1), size=args.embedding_size)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="mind_coach_bench_"))
+    mind_coach = MindCoachRAG(
+        openai_api_key="offline-benchmark",
+        data_dir=str(work_dir / "data"),
+        db_dir=str(work_dir / "db"),
+        llm=chat,
+        embeddings=embeddings
+    )
+    corpus = make_corpus(args.corpus_size, args.seed)
+    mind_coach.db_high = build_store(args.store, corpus[: len(corpus) // 2], mind_coach.embeddings, work_dir / "high")
+    mind_coach.db_low = build_store(args.store, corpus[len(corpus) // 2:], mind_coach.embeddings, work_dir / "low")
+
+    diaries = make_diaries(args.requests, args.diary_sentences, args.duplicate_ratio, args.seed)
+    REGISTRY.reset()
+    chat.calls = chat.input_tokens = 0
+    embeddings.calls = 0
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    degraded = 0
+    lock = threading.Lock()
+
+    def one(diary: str):
+        nonlocal degraded
+        started = time.perf_counter()
+        try:
+            result = mind_coach.get_full_response(diary)
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+            return
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            degraded += bool(result.get("degraded"))
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(one, diaries))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    wall = time.perf_counter() - started
+
+    peak_mb = None
+    if args.tracemalloc:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = round(peak / 1024 / 1024, 2)
+
+    try:
+        import resource
+        max_rss_mb = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:
+        max_rss_mb = None
+
+    return {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "store": args.store,
+            "chat_latency": args.chat_latency,
+            "embed_latency": args.embed_latency,
+            "duplicate_ratio": args.duplicate_ratio,
+        },
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency": {
+            "avg": round(float(np.mean(latencies)), 4) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 4),
+            "p95": round(percentile(latencies, 95), 4),
+            "p99": round(percentile(latencies, 99), 4),
+            "max": round(max(latencies), 4) if latencies else 0.0,
+        },
+        "succeeded": len(latencies),
+        "failed": len(errors),
+        "degraded": degraded,
+        "errors": errors[:5],
+        "llm_calls": chat.calls,
+        "llm_input_tokens": chat.input_tokens,
+        "embedding_calls": embeddings.calls,
+        "memory": {"tracemalloc_peak_mb": peak_mb, "max_rss_mb": max_rss_mb},
+        "stages": REGISTRY.summary(),
+        "counters": dict(sorted(REGISTRY.counters.items())),
+    }
+
+
+def print_summary(report: Dict[str, Any]):
+    """결과 요약 출력"""
+    config = report["config"]
+    latency = report["latency"]
+    print("=" * 60)
+    print(f"[벤치마크] 요청 {config['requests']}개, 동시성 {config['concurrency']}, 스토어 {config['store']}")
+    print(f"  chat 지연 {config['chat_latency']}, 임베딩 지연 {config['embed_latency']}, 중복 비율 {config['duplicate_ratio']}")
+    print(f"  소요 {report['wall_seconds']:.2f}s, 처리량 {report['throughput_rps']:.2f} req/s")
+    print(
+        f"  지연 avg={latency['avg']:.3f}s p50={latency['p50']:.3f}s p95={latency['p95']:.3f}s "
+        f"p99={latency['p99']:.3f}s max={latency['max']:.3f}s"
+    )
+    print(f"  성공 {report['succeeded']}, 실패 {report['failed']}, 대체 응답 {report['degraded']}")
+    print(
+        f"  LLM 호출 {report['llm_calls']}회 (입력 {report['llm_input_tokens']} 토큰), "
+        f"임베딩 호출 {report['embedding_calls']}회"
+    )
+    memory = report["memory"]
+    print(f"  메모리 tracemalloc 최대 {memory['tracemalloc_peak_mb']} MB, 최대 RSS {memory['max_rss_mb']} MB")
+    for error in report["errors"]:
+        print(f"  [오류] {error}")
+    print("-" * 60)
+    REGISTRY.log_summary()
+
+
+def main(argv: Optional[List[str]] = None):
+    """명령행 실행"""
+    parser = argparse.ArgumentParser(description="MindCoachRAG 오프라인 벤치마크")
+    parser.add_argument("--requests", type=int, default=100, help="총 get_full_response 호출 수")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 호출 수")
+    parser.add_argument("--chat-latency", default="lognormal:0.6,0.4", help="채팅 모델 지연 분포")
+    parser.add_argument("--embed-latency", default="lognormal:0.08,0.3", help="임베딩 요청 지연 분포")
+    parser.add_argument("--output-tokens", type=int, default=80, help="가짜 모델 응답 토큰 수 (근사)")
+    parser.add_argument("--diary-sentences", type=int, default=6, help="일기당 문장 수")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0, help="반복되는 일기 비율 (0~1)")
+    parser.add_argument("--corpus-size", type=int, default=200, help="위로 메시지 청크 수 (두 DB 합계)")
+    parser.add_argument("--embedding-size", type=int, default=1536, help="가짜 임베딩 차원")
+    parser.add_argument("--store", choices=["numpy", "chroma"], default="numpy", help="벡터 스토어 종류")
+    parser.add_argument("--tracemalloc", action="store_true", help="tracemalloc으로 최대 할당량 측정 (느려짐)")
+    parser.add_argument("--keep-limits", action="store_true", help="기본 OpenAI 속도 제한을 그대로 적용")
+    parser.add_argument("--seed", type=int, default=0, help="난수 시드")
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 경로")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args)
+    print_summary(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[완료] 결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""
+NCPMS API 로컬 대체 서버
+- SVC01(작물별 병해충 목록)/SVC05(병해충 상세) JSON과 썸네일 이미지를 응답
+- 응답 데이터: ncpms_fixtures_synthetic/ (svc01.json, svc05.json, 선택적으로 images/)
+  또는 NcpmsResponseCache 디렉토리(실제 API에서 받아 둔 응답)를 그대로 재생
+  ※ ncpms_fixtures_synthetic은 실제 API 응답을 녹화한 것이 아니라 SVC01/SVC05 형식에 맞춰
+    직접 작성한 합성 데이터입니다 (sickKey가 STUB-로 시작, 내용은 실제 병해충 정보와 다를 수 있음).
+    실제 응답으로 확인하려면 API 키로 한 번 수집해 둔 캐시 디렉토리를 --cache-dir로 재생하세요.
+- 지연 시간 분포, 오류율(5xx), 연결 끊김 비율, 경로별 처음 N회 실패, 오류 주입 대상 서비스, 응답 크기 조절
+- PlantDiseaseCollector(base_url=server.base_url)로 API 키/네트워크 없이 수집 처리량과 재시도 측정
+
+사용 예:
+    python benchmarks/ncpms_stub_server.py --port 8765 --latency lognormal:0.15,0.5
+    python benchmarks/ncpms_stub_server.py --collect 국화 장미 --error-rate 0.1 --workers 8
+    python benchmarks/ncpms_stub_server.py --cache-dir ./ncpms_cache --collect 국화
+
+코드에서 사용:
+    with NcpmsStubServer(latency="const:0.05", error_rate=0.2) as server:
+        collector = PlantDiseaseCollector("stub", base_url=server.base_url)
+"""
+
+import sys
+import gzip
+import json
+import time
+import random
+import struct
+import socket
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from latency_model import LatencyModel
+
+# 직접 작성한 합성 응답 (실제 API 녹화 아님)
+FIXTURES_DIR = Path(__file__).resolve().parent / "ncpms_fixtures_synthetic"
+
+# 실제 API와 같은 경로 (base_url만 바꾸면 되도록)
+SERVICE_PATH = "/npmsAPI/service"
+IMAGE_PATH = "/images/"
+
+# 수집기가 다운로드 없이 건너뛰는 기본 이미지 URL
+NO_IMAGE_URL = "http://ncpms.rda.go.kr/images/common/noImg.gif"
+
+# 1x1 GIF (GIF89a) - 주석 확장 블록으로 크기를 늘려 썸네일 응답 생성
+_GIF_HEADER = b"GIF89a\x01\x00\x01\x00\x80\x00\x00\xff\xff\xff\x00\x00\x00"
+_GIF_IMAGE = b",\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00"
+_GIF_TRAILER = b";"
+
+
+def make_gif(seed: str, size: int = 0) -> bytes:
+    """
+    seed마다 내용이 다른 유효한 GIF 생성 (내용 해시 저장소 확인용)
+
+    Args:
+        seed: 주석 블록에 넣을 문자열 (보통 sickKey)
+        size: 목표 바이트 수 (주석 블록으로 채움, 최소 크기보다 작으면 무시)
+    """
+    comment = seed.encode("utf-8")
+    base = len(_GIF_HEADER) + len(_GIF_IMAGE) + len(_GIF_TRAILER) + 3
+    if size > base + len(comment) + 1:
+        comment = comment.ljust(size - base - (size - base) // 256 - 1, b".")
+    blocks = b"".join(
+        struct.pack("B", len(comment[i:i + 255])) + comment[i:i + 255]
+        for i in range(0, len(comment), 255)
+    )
+    return _GIF_HEADER + b"!\xfe" + blocks + b"\x00" + _GIF_IMAGE + _GIF_TRAILER
+
+
+def load_fixtures(fixtures_dir: Path) -> Dict[str, Dict]:
+    """fixtures 디렉토리 로드 ({"svc01": {작물명: 목록}, "svc05": {sickKey: 상세}})"""
+    with open(fixtures_dir / "svc01.json", "r", encoding="utf-8") as f:
+        svc01 = json.load(f)
+    with open(fixtures_dir / "svc05.json", "r", encoding="utf-8") as f:
+        svc05 = json.load(f)
+    return {"svc01": svc01, "svc05": svc05}
+
+
+def load_cache_dir(cache_dir: Path) -> Dict[str, Dict]:
+    """
+    NcpmsResponseCache 디렉토리를 fixtures 형식으로 변환
+
+    이미지 URL은 대체 서버 경로({base}/images/{sickKey}.gif)로 바꿉니다.
+    """
+    svc01: Dict[str, List[Dict]] = {}
+    svc05: Dict[str, Dict] = {}
+    for path in sorted(cache_dir.glob("*/*.json.gz")):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[경고] 캐시 항목 무시: {path.name} ({e})")
+            continue
+        params, service = entry["params"], entry["response"].get("service")
+        if service is None:
+            continue
+        if params.get("serviceCode") == "SVC01":
+            items = []
+            for item in service.get("list", []):
+                item = dict(item)
+                if item.get("thumbImg") and item["thumbImg"] != NO_IMAGE_URL:
+                    item["thumbImg"] = f"{{base}}{IMAGE_PATH}{item.get('sickKey')}.gif"
+                items.append(item)
+            svc01[params["cropName"]] = items
+        elif params.get("serviceCode") == "SVC05":
+            svc05[params["sickKey"]] = service
+    print(f"[정보] 캐시 응답 재생: 작물 {len(svc01)}개, 병해충 상세 {len(svc05)}개")
+    return {"svc01": svc01, "svc05": svc05}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """요청 처리 (설정은 server.stub에서 읽음)"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.stub.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        stub = self.server.stub
+        url = urlsplit(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        if url.path.startswith(IMAGE_PATH):
+            service = "image"
+        else:
+            service = params.get("serviceCode", "unknown")
+        stub._count(f"{service}.requests")
+
+        delay = stub.latency.sample()
+        if delay > 0:
+            time.sleep(delay)
+
+        fault = stub._pick_fault(self.path, service)
+        if fault == "drop":
+            # 응답 없이 연결 끊기 (클라이언트에서는 ConnectionError)
+            stub._count(f"{service}.dropped")
+            self.close_connection = True
+            try:
+                self.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            return
+        if fault == "error":
+            stub._count(f"{service}.errors")
+            self._send(stub.error_status, b'{"errorMsg": "stub injected error"}', "application/json")
+            return
+
+        if service == "image":
+            name = url.path[len(IMAGE_PATH):]
+            self._send_image(name)
+        elif url.path != SERVICE_PATH:
+            self._send(404, b"not found", "text/plain")
+        elif service == "SVC01":
+            items = stub.fixtures["svc01"].get(params.get("cropName", ""), [])
+            base = f"http://{self.headers.get('Host', stub.host)}"
+            items = [
+                {**item, "thumbImg": item["thumbImg"].replace("{base}", base)} if "thumbImg" in item else item
+                for item in items
+            ]
+            self._send_json({"service": {"totalCount": len(items), "list": items}})
+        elif service == "SVC05":
+            detail = stub.fixtures["svc05"].get(params.get("sickKey", ""))
+            if detail is None:
+                self._send_json({"errorCode": "ERR_NOT_FOUND", "errorMsg": "stub: unknown sickKey"})
+                return
+            if stub.detail_padding:
+                detail = {**detail, "stubPadding": "x" * stub.detail_padding}
+            self._send_json({"service": detail})
+        else:
+            self._send_json({"errorCode": "ERR_SERVICE", "errorMsg": f"stub: unsupported {service}"})
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.stub._count("bytes_sent", len(body))
+
+    def _send_json(self, payload: Dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send(200, body, "application/json;charset=UTF-8")
+
+    def _send_image(self, name: str):
+        stub = self.server.stub
+        path = stub.fixtures_dir / "images" / name if stub.fixtures_dir else None
+        if path is not None and path.is_file() and path.resolve().parent == (stub.fixtures_dir / "images").resolve():
+            body = path.read_bytes()
+        else:
+            body = make_gif(Path(name).stem, stub.image_bytes)
+        self._send(200, body, "image/gif")
+
+
+class NcpmsStubServer:
+    """NCPMS API 로컬 대체 서버 (백그라운드 스레드에서 실행)"""
+
+    def __init__(
+        self,
+        fixtures_dir: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: str = "const:0",
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        drop_rate: float = 0.0,
+        fail_first: int = 0,
+        fault_services: Optional[List[str]] = None,
+        image_bytes: int = 0,
+        detail_padding: int = 0,
+        seed: int = 0,
+        verbose: bool = False
+    ):
+        """
+        Args:
+            fixtures_dir: svc01.json/svc05.json 디렉토리 (생략 시 합성 데이터 benchmarks/ncpms_fixtures_synthetic)
+            cache_dir: 주어지면 fixtures 대신 NcpmsResponseCache 디렉토리의 응답 재생
+            host: 바인딩 주소
+            port: 포트 (0이면 빈 포트 자동 선택)
+            latency: 응답 지연 분포 (const:0.1 / uniform:0.05,0.3 / lognormal:0.15,0.5)
+            error_rate: error_status로 응답하는 요청 비율 (0~1)
+            error_status: 주입할 오류 상태 코드
+            drop_rate: 응답 없이 연결을 끊는 요청 비율 (0~1)
+            fail_first: 경로(URL)마다 처음 N번은 error_status로 응답 (결정적 재시도 확인용)
+            fault_services: 오류를 주입할 서비스 (SVC01/SVC05/image, 생략 시 전체)
+            image_bytes: 생성하는 썸네일 크기(바이트, 0이면 최소 크기)
+            detail_padding: SVC05 응답에 덧붙이는 더미 필드 길이(문자 수)
+            seed: 오류 주입/지연 난수 시드
+            verbose: 요청 로그 출력
+        """
+        if cache_dir:
+            self.fixtures_dir = None
+            self.fixtures = load_cache_dir(Path(cache_dir))
+        else:
+            self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else FIXTURES_DIR
+            self.fixtures = load_fixtures(self.fixtures_dir)
+        self.host = host
+        self.latency = LatencyModel(latency, seed)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drop_rate = drop_rate
+        self.fail_first = fail_first
+        self.fault_services = set(fault_services) if fault_services else None
+        self.image_bytes = image_bytes
+        self.detail_padding = detail_padding
+        self.verbose = verbose
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._attempts: Dict[str, int] = {}
+        self.stats: Dict[str, int] = {}
+
+        self._server = ThreadingHTTPServer((host, port), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self.port = self._server.server_address[1]
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """PlantDiseaseCollector(base_url=...)에 넘길 서비스 URL"""
+        return f"http://{self.host}:{self.port}{SERVICE_PATH}"
+
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + value
+
+    def _pick_fault(self, path: str, service: str) -> Optional[str]:
+        """이번 요청에 주입할 오류 ("error" / "drop" / None)"""
+        if self.fault_services is not None and service not in self.fault_services:
+            return None
+        with self._lock:
+            attempt = self._attempts.get(path, 0)
+            self._attempts[path] = attempt + 1
+            if attempt < self.fail_first:
+                return "error"
+            roll = self._rng.random()
+        if roll < self.error_rate:
+            return "error"
+        if roll < self.error_rate + self.drop_rate:
+            return "drop"
+        return None
+
+    def start(self) -> "NcpmsStubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ncpms-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "NcpmsStubServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def run_collection(server: NcpmsStubServer, crops: List[str], args) -> Dict:
+    """대체 서버를 대상으로 PlantDiseaseCollector 수집 처리량 측정"""
+    from metrics import REGISTRY
+    from plant_doctor import PlantDiseaseCollector
+
+    with tempfile.TemporaryDirectory(prefix="ncpms_stub_") as tmp_dir:
+        # 수집 이미지는 임시 디렉토리에 저장
+        collector = PlantDiseaseCollector(
+            api_key="stub",
+            base_url=server.base_url,
+            max_workers=args.workers,
+            per_host_limit=args.per_host,
+            min_host_interval=args.min_interval,
+            max_retries=args.max_retries,
+            retry_delay=args.retry_delay,
+            image_dir=str(Path(tmp_dir) / "crop_images")
+        )
+
+        report = {"crops": {}, "collected": 0, "failed": 0}
+        started = time.perf_counter()
+        try:
+            for crop_name in crops:
+                crop_started = time.perf_counter()
+                diseases = collector.collect_all_data(crop_name)
+                report["crops"][crop_name] = {
+                    "collected": len(diseases),
+                    "failed": len(collector.last_failures),
+                    "seconds": round(time.perf_counter() - crop_started, 3),
+                }
+                report["collected"] += len(diseases)
+                report["failed"] += len(collector.last_failures)
+        finally:
+            collector.close()
+        report["wall_seconds"] = round(time.perf_counter() - started, 3)
+    report["throughput"] = round(report["collected"] / report["wall_seconds"], 2) if report["wall_seconds"] else 0.0
+    report["server"] = dict(sorted(server.stats.items()))
+    report["counters"] = dict(sorted(REGISTRY.counters.items()))
+    return report
+
+
+def print_summary(report: Dict):
+    """수집 결과 요약 출력"""
+    from metrics import REGISTRY
+
+    print("=" * 60)
+    print(f"[벤치마크] 수집 {report['collected']}개, 실패 {report['failed']}개")
+    print(f"  소요 {report['wall_seconds']:.2f}s, 처리량 {report['throughput']:.2f} 병해충/s")
+    for crop_name, crop in report["crops"].items():
+        print(f"  - {crop_name}: {crop['collected']}개 수집, {crop['failed']}개 실패, {crop['seconds']:.2f}s")
+    print(f"  서버: {', '.join(f'{name}={value}' for name, value in report['server'].items())}")
+    print("-" * 60)
+    REGISTRY.log_summary()
+
+
+def main(argv: Optional[List[str]] = None):
+    """명령행 실행"""
+    parser = argparse.ArgumentParser(description="NCPMS API 로컬 대체 서버")
+    parser.add_argument("--host", default="127.0.0.1", help="바인딩 주소")
+    parser.add_argument("--port", type=int, default=8765, help="포트 (0이면 자동 선택)")
+    parser.add_argument("--fixtures", default=None, help="fixtures 디렉토리 (기본: 합성 데이터 benchmarks/ncpms_fixtures_synthetic)")
+    parser.add_argument("--cache-dir", default=None, help="NcpmsResponseCache 디렉토리 응답 재생")
+    parser.add_argument("--latency", default="const:0", help="응답 지연 분포")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="오류 응답 비율 (0~1)")
+    parser.add_argument("--error-status", type=int, default=503, help="오류 응답 상태 코드")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="연결 끊김 비율 (0~1)")
+    parser.add_argument("--fail-first", type=int, default=0, help="경로마다 처음 N번 오류 응답")
+    parser.add_argument("--fault-services", nargs="+", default=None, help="오류 주입 대상 서비스 (SVC01 SVC05 image)")
+    parser.add_argument("--image-bytes", type=int, default=0, help="썸네일 크기(바이트)")
+    parser.add_argument("--detail-padding", type=int, default=0, help="SVC05 응답 더미 필드 길이")
+    parser.add_argument("--seed", type=int, default=0, help="난수 시드")
+    parser.add_argument("--verbose", action="store_true", help="요청 로그 출력")
+    parser.add_argument("--collect", nargs="+", default=None, metavar="작물", help="서버를 띄운 채 수집 측정 후 종료")
+    parser.add_argument("--workers", type=int, default=8, help="[--collect] 동시 수집 작업 수")
+    parser.add_argument("--per-host", type=int, default=4, help="[--collect] 호스트별 동시 요청 수")
+    parser.add_argument("--min-interval", type=float, default=0.0, help="[--collect] 호스트 요청 최소 간격(초)")
+    parser.add_argument("--max-retries", type=int, default=3, help="[--collect] 최대 재시도 횟수")
+    parser.add_argument("--retry-delay", type=float, default=0.05, help="[--collect] 첫 재시도 대기(초)")
+    parser.add_argument("--json", default=None, help="[--collect] 결과를 저장할 JSON 경로")
+    args = parser.parse_args(argv)
+
+    server = NcpmsStubServer(
+        fixtures_dir=args.fixtures,
+        cache_dir=args.cache_dir,
+        host=args.host,
+        port=0 if args.collect else args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        drop_rate=args.drop_rate,
+        fail_first=args.fail_first,
+        fault_services=args.fault_services,
+        image_bytes=args.image_bytes,
+        detail_padding=args.detail_padding,
+        seed=args.seed,
+        verbose=args.verbose
+    )
+
+    if args.collect:
+        with server:
+            report = run_collection(server, args.collect, args)
+        print_summary(report)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"[완료] 결과 저장: {args.json}")
+        return
+
+    print(f"[정보] NCPMS 대체 서버 실행: {server.base_url}")
+    print(f"[정보] 작물: {', '.join(server.fixtures['svc01'])}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\n[정보] 종료")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
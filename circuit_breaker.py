@@ -0,0 +1,174 @@
+"""
+마감 시간(deadline)과 서킷 브레이커
+- 호출마다 마감 시간을 두고, 넘기면 기다리지 않고 대체 응답으로 전환
+- 연속 실패가 쌓이면 회로를 열어 한동안 호출 없이 바로 대체 응답 제공
+- 일정 시간 후 시험 호출 1건으로 회복 여부 확인 (half-open)
+- 대체 응답용 최근 정상 응답 캐시 (AnswerCache)
+"""
+
+import time
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from metrics import inc
+
+
+class DeadlineExceeded(TimeoutError):
+    """마감 시간 안에 호출이 끝나지 않음"""
+
+
+class CircuitOpenError(RuntimeError):
+    """회로가 열려 있어 호출하지 않음"""
+
+
+# 마감 시간 감시용 작업 스레드 (마감을 넘긴 호출은 뒤에서 끝날 때까지 계속 실행됨)
+_EXECUTOR = ThreadPoolExecutor(max_workers=32, thread_name_prefix="deadline")
+
+
+def call_with_deadline(fn: Callable[[], Any], timeout: Optional[float]) -> Any:
+    """
+    fn을 실행하고 timeout초 안에 끝나지 않으면 DeadlineExceeded
+
+    호출 스레드의 컨텍스트(우선순위 차선 등)를 그대로 전달합니다.
+    """
+    if timeout is None:
+        return fn()
+    future = _EXECUTOR.submit(contextvars.copy_context().run, fn)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise DeadlineExceeded(f"{timeout:.1f}초 안에 응답하지 않았습니다.")
+
+
+class CircuitBreaker:
+    """연속 실패 기반 서킷 브레이커 (closed → open → half_open → closed)"""
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        """
+        Args:
+            name: 지표 이름 (circuit.<name>.*)
+            failure_threshold: 회로를 여는 연속 실패 수
+            reset_timeout: 회로를 연 뒤 시험 호출을 허용하기까지 시간(초)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """지금 호출해도 되는지 (half_open에서는 시험 호출 1건만 허용)"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_running = False
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                print(f"[정보] 회로 복구: {self.name}")
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"[경고] 회로 열림: {self.name} (연속 실패 {self.failures}회)")
+                    inc(f"circuit.{self.name}.opened")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def call(self, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        회로 상태를 확인하고 마감 시간 안에서 호출
+
+        Raises:
+            CircuitOpenError: 회로가 열려 있음
+            DeadlineExceeded: 마감 시간 초과 (실패로 기록)
+        """
+        if not self.allow():
+            inc(f"circuit.{self.name}.short_circuited")
+            raise CircuitOpenError(f"'{self.name}' 회로가 열려 있습니다.")
+        try:
+            result = call_with_deadline(fn, timeout)
+        except Exception as e:
+            self.record_failure()
+            inc(f"circuit.{self.name}.{'timeouts' if isinstance(e, DeadlineExceeded) else 'failures'}")
+            raise
+        self.record_success()
+        return result
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """이름별 프로세스 전역 브레이커 (Streamlit 세션 간 공유)"""
+    with _BREAKERS_LOCK:
+        if name not in _BREAKERS:
+            _BREAKERS[name] = CircuitBreaker(name, **kwargs)
+        return _BREAKERS[name]
+
+
+def guarded_call(
+    name: str,
+    fn: Callable[[], Any],
+    timeout: Optional[float],
+    fallback: Callable[[Exception], Any]
+) -> Any:
+    """
+    브레이커 + 마감 시간으로 호출하고, 실패/초과/회로 열림이면 fallback(오류) 결과 반환
+
+    Args:
+        name: 브레이커 이름
+        fn: 실제 호출
+        timeout: 마감 시간(초)
+        fallback: 오류를 받아 대체 응답을 만드는 함수
+    """
+    try:
+        return get_breaker(name).call(fn, timeout)
+    except Exception as e:
+        if not isinstance(e, CircuitOpenError):
+            print(f"[경고] {name} 호출 실패, 대체 응답 사용: {type(e).__name__}: {e}")
+        inc(f"circuit.{name}.fallbacks")
+        return fallback(e)
+
+
+class AnswerCache:
+    """대체 응답용 최근 정상 응답 캐시 (LRU, 스레드 안전)"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
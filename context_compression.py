@@ -0,0 +1,223 @@
+"""
+검색 컨텍스트 압축
+- 이미 가져온 후보 임베딩으로 MMR(최대 한계 관련성) 선택 → 비슷한 청크 중복 제거
+- 청크 분할 overlap으로 겹치는 인접 청크를 하나로 병합
+- 문장 단위 중복 제거
+- 호출별 절약 토큰 수를 metrics 카운터(context_compression.<이름>.*)로 기록
+"""
+
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import inc
+from token_budget import count_tokens
+from vector_index import NumpyVectorIndex
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+def fetch_candidates(
+    store,
+    query_vector,
+    fetch_k: int,
+    where: Optional[Dict] = None
+) -> Tuple[List["Document"], np.ndarray]:
+    """
+    질의 벡터로 후보 문서와 그 임베딩을 함께 가져옴 (재임베딩 없음)
+
+    Args:
+        store: NumpyVectorIndex 또는 langchain Chroma
+        query_vector: 질의 임베딩
+        fetch_k: 가져올 후보 수
+        where: 메타데이터 일치 조건 (예: {"crop_name": "국화"})
+
+    Returns:
+        (유사도 순 문서 목록, (문서 수, 차원) 임베딩 행렬)
+    """
+    from langchain_core.documents import Document
+
+    if isinstance(store, NumpyVectorIndex):
+        # 조건이 있으면 넉넉히 가져온 뒤 메타데이터로 거름
+        hits = store.search_by_vector(query_vector, len(store) if where else fetch_k)
+        positions = [
+            i for i, _ in hits
+            if not where or all(store.metadatas[i].get(key) == value for key, value in where.items())
+        ][:fetch_k]
+        documents = [Document(page_content=store.documents[i], metadata=store.metadatas[i]) for i in positions]
+        vectors = np.asarray(store.vectors[positions], dtype=np.float32)
+        return documents, vectors.reshape(len(positions), -1)
+
+    result = store._collection.query(
+        query_embeddings=[[float(x) for x in query_vector]],
+        n_results=fetch_k,
+        where=where,
+        include=["documents", "metadatas", "embeddings"]
+    )
+    texts = result["documents"][0]
+    metadatas = result["metadatas"][0] if result.get("metadatas") else [None] * len(texts)
+    documents = [
+        Document(page_content=text, metadata=metadata or {})
+        for text, metadata in zip(texts, metadatas)
+    ]
+    vectors = np.asarray(result["embeddings"][0], dtype=np.float32)
+    return documents, vectors.reshape(len(documents), -1)
+
+
+def mmr_select(query_vector, doc_vectors: np.ndarray, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """
+    최대 한계 관련성(MMR) 선택
+
+    질의와 가까우면서 이미 고른 문서와는 덜 비슷한 문서를 차례로 고릅니다.
+
+    Args:
+        query_vector: 질의 임베딩
+        doc_vectors: 후보 임베딩 행렬
+        k: 고를 문서 수
+        lambda_mult: 1에 가까울수록 관련성, 0에 가까울수록 다양성 우선
+
+    Returns:
+        선택한 후보 위치 (선택 순서)
+    """
+    n = len(doc_vectors)
+    if n == 0 or k <= 0:
+        return []
+
+    vectors = np.asarray(doc_vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors = vectors / norms
+    query = np.asarray(query_vector, dtype=np.float32)
+    query = query / (np.linalg.norm(query) or 1.0)
+
+    relevance = vectors @ query
+    similarity = vectors @ vectors.T
+
+    selected = [int(np.argmax(relevance))]
+    while len(selected) < min(k, n):
+        redundancy = similarity[:, selected].max(axis=1)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        selected.append(int(np.argmax(scores)))
+    return selected
+
+
+def _overlap_length(left: str, right: str, min_overlap: int, max_overlap: int) -> int:
+    """left의 끝과 right의 시작이 겹치는 글자 수 (없으면 0)"""
+    longest = min(len(left), len(right), max_overlap)
+    for size in range(longest, min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def merge_overlapping(texts: List[str], min_overlap: int = 20, max_overlap: int = 400) -> List[str]:
+    """
+    분할 overlap으로 겹치는 청크를 이어 붙여 하나로 병합
+
+    한 청크가 다른 청크에 통째로 포함되면 버립니다.
+    병합 결과는 앞쪽 청크 자리에 둡니다 (선택 순서 유지).
+    """
+    merged = [text.strip() for text in texts if text and text.strip()]
+
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(len(merged)):
+                if i == j:
+                    continue
+                left, right = merged[i], merged[j]
+                if right in left:
+                    merged.pop(j)
+                    changed = True
+                    break
+                size = _overlap_length(left, right, min_overlap, max_overlap)
+                if size:
+                    merged[min(i, j)] = left + right[size:]
+                    merged.pop(max(i, j))
+                    changed = True
+                    break
+            if changed:
+                break
+    return merged
+
+
+def _sentence_key(sentence: str) -> str:
+    """공백/문장부호를 무시한 비교용 키"""
+    return re.sub(r'[\W_]+', '', sentence).lower()
+
+
+def dedup_sentences(texts: List[str], min_key_length: int = 8) -> List[str]:
+    """
+    여러 청크에 반복되는 문장을 처음 나온 곳에만 남김
+
+    Args:
+        texts: 청크 목록
+        min_key_length: 이보다 짧은 문장(제목, 항목 기호 등)은 중복이어도 유지
+    """
+    seen = set()
+    deduped = []
+    for text in texts:
+        lines = []
+        for line in text.split("\n"):
+            kept = []
+            for sentence in re.split(r'(?<=[.!?。])\s+', line):
+                key = _sentence_key(sentence)
+                if len(key) >= min_key_length:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                kept.append(sentence)
+            if kept or not line.strip():
+                lines.append(" ".join(kept))
+        result = re.sub(r'\n{3,}', '\n\n', "\n".join(lines)).strip()
+        if result:
+            deduped.append(result)
+    return deduped
+
+
+def compress_documents(
+    documents: List["Document"],
+    doc_vectors: np.ndarray,
+    query_vector,
+    k: int,
+    name: str = "default",
+    lambda_mult: float = 0.5
+) -> Tuple[List[str], Dict[str, int]]:
+    """
+    후보 문서를 MMR 선택 → overlap 병합 → 문장 중복 제거 순서로 압축
+
+    절약 토큰은 같은 k개를 유사도 순으로 그대로 이어 붙였을 때와 비교합니다.
+
+    Args:
+        documents: 유사도 순 후보 문서
+        doc_vectors: 후보 임베딩 행렬
+        query_vector: 질의 임베딩
+        k: 남길 청크 수
+        name: 지표 이름 (context_compression.<name>.*)
+        lambda_mult: MMR 관련성/다양성 가중치
+
+    Returns:
+        (압축된 청크 목록, {"tokens_before", "tokens_after", "tokens_saved"})
+    """
+    texts = [doc.page_content for doc in documents]
+    tokens_before = sum(count_tokens(text) for text in texts[:k])
+
+    selected = mmr_select(query_vector, doc_vectors, k, lambda_mult) if len(texts) > k else list(range(len(texts)))
+    chunks = dedup_sentences(merge_overlapping([texts[i] for i in selected]))
+
+    tokens_after = sum(count_tokens(chunk) for chunk in chunks)
+    stats = {
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": max(0, tokens_before - tokens_after),
+    }
+
+    inc(f"context_compression.{name}.calls")
+    inc(f"context_compression.{name}.tokens_before", tokens_before)
+    inc(f"context_compression.{name}.tokens_after", tokens_after)
+    inc(f"context_compression.{name}.tokens_saved", stats["tokens_saved"])
+    return chunks, stats
@@ -0,0 +1,117 @@
+"""
+마음 일지 재분석 백필 작업
+- 프롬프트/모델 변경 후 저장된 일지를 일괄 재분석
+- MindCoachRAG.analyze_batch 기반 (동시성 제한, 재시도, 체크포인트 재개)
+- 분석 결과를 DiaryStorage에 한 번에 반영
+"""
+
+import os
+import argparse
+from pathlib import Path
+from typing import Dict, Optional
+
+from mind_coach import MindCoachRAG
+from diary_storage import DiaryStorage
+from rate_limiter import lane
+
+
+def reanalyze_diaries(
+    mind_coach: MindCoachRAG,
+    storage: DiaryStorage,
+    plant_name: Optional[str] = None,
+    max_concurrency: int = 4,
+    max_retries: int = 2,
+    checkpoint_path: Optional[str] = None
+) -> Dict[str, int]:
+    """
+    저장된 일지 재분석 후 결과를 일괄 저장
+
+    Args:
+        mind_coach: Vector DB가 초기화된 MindCoachRAG
+        storage: 일지 저장소
+        plant_name: 특정 식물만 재분석 (None이면 전체)
+        max_concurrency: 동시에 실행할 최대 LLM 요청 수
+        max_retries: 항목별 최대 재시도 횟수
+        checkpoint_path: 체크포인트 JSONL 경로 (같은 경로로 다시 실행하면 이어서 처리,
+                         모두 성공하면 삭제)
+
+    Returns:
+        {"total": 대상 수, "succeeded": 분석 성공 수, "failed": 분석 실패 수, "updated": 저장 반영 수}
+    """
+    storage.reload_data()
+    df = storage.df
+    if plant_name is not None:
+        df = df[df['식물이름'] == plant_name]
+
+    if len(df) == 0:
+        print("[정보] 재분석할 일지가 없습니다.")
+        return {"total": 0, "succeeded": 0, "failed": 0, "updated": 0}
+
+    dates = df['날짜'].tolist()
+    contents = df['일지내용'].astype(str).tolist()
+
+    # 백필은 대화형 요청보다 낮은 우선순위로 실행
+    with lane("background"):
+        items = mind_coach.analyze_batch(
+            contents,
+            max_concurrency=max_concurrency,
+            max_retries=max_retries,
+            checkpoint_path=checkpoint_path
+        )
+
+    updates = []
+    for item in items:
+        if item["error"] is not None:
+            print(f"[경고] 재분석 실패 ({dates[item['index']]}): {item['error']}")
+            continue
+        updates.append((dates[item["index"]], contents[item["index"]], item["result"]))
+
+    updated = storage.update_analyses(updates)
+
+    # 전부 성공해 저장까지 끝났으면 체크포인트 정리 (다음 백필은 처음부터)
+    if checkpoint_path and len(updates) == len(items) and Path(checkpoint_path).exists():
+        Path(checkpoint_path).unlink()
+        print(f"[정보] 재분석 완료, 체크포인트 삭제: {checkpoint_path}")
+
+    return {
+        "total": len(items),
+        "succeeded": len(updates),
+        "failed": len(items) - len(updates),
+        "updated": updated
+    }
+
+
+def main():
+    """명령행 실행"""
+    parser = argparse.ArgumentParser(description="저장된 마음 일지 일괄 재분석")
+    parser.add_argument("--plant", default=None, help="재분석할 식물 이름 (생략 시 전체)")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시 LLM 요청 수")
+    parser.add_argument("--retries", type=int, default=2, help="항목별 최대 재시도 횟수")
+    parser.add_argument(
+        "--checkpoint",
+        default="./diary_data/backfill_checkpoint.jsonl",
+        help="체크포인트 파일 경로"
+    )
+    args = parser.parse_args()
+
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    if not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY 환경변수를 설정해주세요.")
+
+    mind_coach = MindCoachRAG(openai_api_key=OPENAI_API_KEY)
+    mind_coach.initialize_vector_dbs()
+    storage = DiaryStorage()
+
+    stats = reanalyze_diaries(
+        mind_coach,
+        storage,
+        plant_name=args.plant,
+        max_concurrency=args.concurrency,
+        max_retries=args.retries,
+        checkpoint_path=args.checkpoint
+    )
+    print(f"[완료] 재분석 결과: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+"""
+지난 일기 기억 인덱스
+- 식물 별명(사용자가 일기를 쓰는 단위)별로 지난 일기 요약의 임베딩을 보관
+- 일지 저장 시점에 한 건씩 추가 (save_diary → add)
+- 임베딩은 추가 전용 파일(vectors.f32 + records.jsonl)에 저장해 재시작 시 다시 임베딩하지 않음
+- 시작 시/재분석 후 CSV와 비교해 빠지거나 바뀐 일기만 한 번의 배치로 임베딩 (catch_up)
+- 검색은 메모리에 올린 정규화 행렬과 내적 한 번 + argpartition (수천 건에서도 수 ms 이내)
+"""
+
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from metrics import inc, span
+
+
+class _PlantMemory:
+    """식물 별명 하나의 기록과 정규화된 임베딩 행렬 (용량을 두 배씩 늘려 추가 비용 상수화)"""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.keys: List[str] = []
+        self.records: List[Dict] = []
+        self.positions: Dict[str, int] = {}
+        self._buffer = np.zeros((16, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._buffer[:len(self.keys)]
+
+    def append(self, key: str, record: Dict, vector: np.ndarray):
+        n = len(self.keys)
+        if n == len(self._buffer):
+            grown = np.zeros((n * 2, self.dim), dtype=np.float32)
+            grown[:n] = self._buffer
+            self._buffer = grown
+        self._buffer[n] = vector
+        self.positions[key] = n
+        self.keys.append(key)
+        self.records.append(record)
+
+
+class DiaryMemoryIndex:
+    """식물 별명별 지난 일기 요약 벡터 인덱스 (스레드 안전)"""
+
+    INFO_FILE = "info.json"
+    VECTORS_FILE = "vectors.f32"
+    RECORDS_FILE = "records.jsonl"
+
+    # 요약이 비어 있을 때 임베딩에 쓰는 일기 본문 앞부분 길이
+    CONTENT_PREVIEW_CHARS = 200
+
+    # 시작 시 빠진 일기를 임베딩하는 배치 크기
+    CATCH_UP_BATCH_SIZE = 256
+
+    def __init__(self, embeddings, index_dir: str = "./diary_data/memory"):
+        """
+        Args:
+            embeddings: 요약 임베딩에 사용할 Embeddings (질의 벡터와 같은 모델이어야 함)
+            index_dir: 인덱스 저장 디렉토리 (식물 별명별 하위 디렉토리)
+        """
+        self.embeddings = embeddings
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.model = getattr(embeddings, "model", None)
+        self.dim: Optional[int] = None
+        self._plants: Dict[str, _PlantMemory] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    # ===== 키 / 경로 =====
+
+    @staticmethod
+    def entry_key(date, content: str) -> str:
+        """일기 식별 키 (DiaryStorage와 같이 날짜 + 일지내용으로 식별)"""
+        stamp = date.isoformat() if hasattr(date, "isoformat") else str(date)
+        return hashlib.sha1(f"{stamp}|{content}".encode("utf-8")).hexdigest()[:16]
+
+    def _plant_dir(self, plant_name: str) -> Path:
+        return self.index_dir / hashlib.sha1(plant_name.encode("utf-8")).hexdigest()[:16]
+
+    def _memory_text(self, summary, content: str) -> str:
+        """임베딩할 텍스트 (AI 요약, 없으면 일기 앞부분)"""
+        if isinstance(summary, str) and summary.strip():
+            return summary.strip()
+        return str(content)[:self.CONTENT_PREVIEW_CHARS]
+
+    # ===== 저장 / 로드 =====
+
+    def _load(self):
+        """저장된 인덱스 로드 (임베딩 모델이 바뀌었으면 비우고 catch_up에서 다시 만듦)"""
+        info_path = self.index_dir / self.INFO_FILE
+        if not info_path.exists():
+            return
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        if info.get("model") != self.model:
+            print(f"[경고] 임베딩 모델 변경({info.get('model')} → {self.model}), 일기 기억 인덱스 재생성")
+            self._reset_files()
+            return
+        self.dim = info["dim"]
+
+        loaded = 0
+        for plant_dir in self.index_dir.iterdir():
+            records_path = plant_dir / self.RECORDS_FILE
+            if not records_path.exists():
+                continue
+            with open(records_path, "r", encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            vectors = np.fromfile(plant_dir / self.VECTORS_FILE, dtype=np.float32)
+            vectors = vectors[:len(vectors) // self.dim * self.dim].reshape(-1, self.dim)
+            if not records:
+                continue
+
+            memory = _PlantMemory(self.dim)
+            # 기록 도중 종료되어 한쪽만 쓰였으면 짝이 맞는 부분까지만 사용
+            count = min(len(records), len(vectors))
+            for record, vector in zip(records[:count], vectors[:count]):
+                memory.append(record["key"], record, vector)
+            plant_name = records[0]["plant"]
+            self._plants[plant_name] = memory
+            if count != len(records) or count != len(vectors):
+                self._rewrite(plant_name)
+            loaded += count
+
+        print(f"[정보] 일기 기억 인덱스 로드: 식물 {len(self._plants)}개, 일기 {loaded}개")
+
+    def _reset_files(self):
+        for path in self.index_dir.glob("*/*"):
+            path.unlink()
+        (self.index_dir / self.INFO_FILE).unlink(missing_ok=True)
+        self._plants = {}
+        self.dim = None
+
+    def _write_info(self):
+        with open(self.index_dir / self.INFO_FILE, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "dim": self.dim}, f)
+
+    def _append_files(self, plant_name: str, records: List[Dict], vectors: np.ndarray):
+        """기록을 파일 끝에 추가 (벡터를 먼저 써서 기록만 남는 경우를 막음)"""
+        plant_dir = self._plant_dir(plant_name)
+        plant_dir.mkdir(exist_ok=True)
+        with open(plant_dir / self.VECTORS_FILE, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(plant_dir / self.RECORDS_FILE, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _rewrite(self, plant_name: str):
+        """식물 하나의 파일을 메모리 내용으로 다시 씀 (삭제 반영용, 재임베딩 없음)"""
+        memory = self._plants.get(plant_name)
+        plant_dir = self._plant_dir(plant_name)
+        plant_dir.mkdir(exist_ok=True)
+        with open(plant_dir / self.VECTORS_FILE, "wb") as f:
+            if memory is not None:
+                f.write(np.ascontiguousarray(memory.matrix).tobytes())
+        with open(plant_dir / self.RECORDS_FILE, "w", encoding="utf-8") as f:
+            for record in (memory.records if memory is not None else []):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    # ===== 추가 / 삭제 =====
+
+    def _add_embedded(self, plant_name: str, records: List[Dict], vectors):
+        """이미 임베딩한 기록들을 메모리와 파일에 추가 (잠금은 호출자가 관리)"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(records), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._write_info()
+        memory = self._plants.setdefault(plant_name, _PlantMemory(self.dim))
+        for record, vector in zip(records, vectors):
+            memory.append(record["key"], record, vector)
+        self._append_files(plant_name, records, vectors)
+        inc("diary_memory.added", len(records))
+
+    def add(self, plant_name: str, date, content: str, summary: str = "", emotion=None) -> bool:
+        """
+        일기 한 건 추가 (DiaryStorage.save_diary에서 호출)
+
+        Args:
+            plant_name: 식물 별명
+            date: 작성 날짜시간
+            content: 일지내용
+            summary: AI 요약 (비어 있으면 일기 앞부분을 임베딩)
+            emotion: 감정점수
+
+        Returns:
+            새로 추가했는지 여부 (이미 있으면 False)
+        """
+        key = self.entry_key(date, content)
+        with self._lock:
+            memory = self._plants.get(plant_name)
+            if memory is not None and key in memory.positions:
+                return False
+
+        text = self._memory_text(summary, content)
+        with span("diary_memory.embed"):
+            vector = self.embeddings.embed_documents([text])
+        record = {
+            "key": key,
+            "plant": plant_name,
+            "date": date.isoformat() if hasattr(date, "isoformat") else str(date),
+            "summary": text,
+            "emotion": None if emotion is None else int(emotion),
+        }
+        with self._lock:
+            memory = self._plants.get(plant_name)
+            if memory is not None and key in memory.positions:
+                return False
+            self._add_embedded(plant_name, [record], vector)
+        return True
+
+    def remove(self, plant_name: str, date, content: str) -> bool:
+        """일기 한 건 삭제 (DiaryStorage.delete_diary에서 호출)"""
+        return self._remove_keys(plant_name, {self.entry_key(date, content)}) > 0
+
+    def _remove_keys(self, plant_name: str, keys) -> int:
+        with self._lock:
+            memory = self._plants.get(plant_name)
+            if memory is None:
+                return 0
+            keep = [i for i, key in enumerate(memory.keys) if key not in keys]
+            removed = len(memory) - len(keep)
+            if not removed:
+                return 0
+            remaining = _PlantMemory(self.dim)
+            for i in keep:
+                remaining.append(memory.keys[i], memory.records[i], memory.matrix[i])
+            self._plants[plant_name] = remaining
+            self._rewrite(plant_name)
+        inc("diary_memory.removed", removed)
+        return removed
+
+    def catch_up(self, storage) -> Dict[str, int]:
+        """
+        저장된 일지와 비교해 빠진 일기와 요약/감정점수가 바뀐 일기만 임베딩하고,
+        지워진 일기는 인덱스에서 제거
+
+        Args:
+            storage: DiaryStorage
+
+        Returns:
+            {"added", "updated", "removed", "kept"}
+        """
+        storage.reload_data()
+        df = storage.df.dropna(subset=['식물이름', '일지내용'])
+
+        wanted: Dict[str, Dict[str, Dict]] = {}
+        for date, plant_name, content, summary, emotion in zip(
+            df['날짜'], df['식물이름'], df['일지내용'], df['요약'], df['감정점수']
+        ):
+            key = self.entry_key(date, content)
+            wanted.setdefault(plant_name, {})[key] = {
+                "key": key,
+                "plant": plant_name,
+                "date": date.isoformat(),
+                "summary": self._memory_text(summary, content),
+                "emotion": None if emotion != emotion else int(emotion),
+            }
+
+        with self._lock:
+            existing = {
+                name: {key: memory.records[i] for i, key in enumerate(memory.keys)}
+                for name, memory in self._plants.items()
+            }
+
+        # 지워진 일기는 제거, 재분석으로 요약/감정점수가 바뀐 일기는 제거 후 다시 임베딩
+        removed = 0
+        changed = 0
+        for plant_name, records in existing.items():
+            current = wanted.get(plant_name, {})
+            stale = set(records) - set(current)
+            outdated = {
+                key for key, record in records.items()
+                if key in current and (
+                    record["summary"] != current[key]["summary"]
+                    or record["emotion"] != current[key]["emotion"]
+                )
+            }
+            if stale:
+                removed += self._remove_keys(plant_name, stale)
+            if outdated:
+                changed += self._remove_keys(plant_name, outdated)
+                for key in outdated:
+                    del records[key]
+
+        missing = [
+            record
+            for plant_name, records in wanted.items()
+            for key, record in records.items()
+            if key not in existing.get(plant_name, {})
+        ]
+        with span("diary_memory.catch_up"):
+            for start in range(0, len(missing), self.CATCH_UP_BATCH_SIZE):
+                batch = missing[start:start + self.CATCH_UP_BATCH_SIZE]
+                vectors = self.embeddings.embed_documents([record["summary"] for record in batch])
+                by_plant: Dict[str, List[int]] = {}
+                for i, record in enumerate(batch):
+                    by_plant.setdefault(record["plant"], []).append(i)
+                with self._lock:
+                    for plant_name, positions in by_plant.items():
+                        self._add_embedded(
+                            plant_name,
+                            [batch[i] for i in positions],
+                            [vectors[i] for i in positions]
+                        )
+
+        stats = {
+            "added": len(missing) - changed,
+            "updated": changed,
+            "removed": removed,
+            "kept": len(df) - len(missing),
+        }
+        print(
+            f"[완료] 일기 기억 인덱스 동기화 - 추가 {stats['added']}, 갱신 {stats['updated']}, "
+            f"삭제 {stats['removed']}, 유지 {stats['kept']}"
+        )
+        return stats
+
+    # ===== 검색 =====
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(memory) for memory in self._plants.values())
+
+    def search(
+        self,
+        plant_name: str,
+        query_vector,
+        k: int = 2,
+        min_score: float = 0.3
+    ) -> List[Dict]:
+        """
+        식물 별명의 지난 일기 중 질의와 비슷한 것 Top-K
+
+        Args:
+            plant_name: 식물 별명
+            query_vector: 질의 임베딩 (인덱스와 같은 모델)
+            k: 가져올 일기 수
+            min_score: 이보다 유사도가 낮은 일기는 제외
+
+        Returns:
+            유사도 내림차순 [{"date", "summary", "emotion", "score"}]
+        """
+        with self._lock:
+            memory = self._plants.get(plant_name)
+            if memory is None or len(memory) == 0 or k <= 0:
+                return []
+            matrix = memory.matrix
+            records = memory.records[:len(matrix)]
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        scores = matrix @ query
+        n = len(scores)
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                "date": records[i]["date"],
+                "summary": records[i]["summary"],
+                "emotion": records[i]["emotion"],
+                "score": float(scores[i]),
+            }
+            for i in top
+            if scores[i] >= min_score
+        ]
@@ -9,7 +9,9 @@ import os
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from metrics import span
 
 
 class DiaryStorage:
@@ -25,6 +27,46 @@ class DiaryStorage:
         
         self.diary_file = self.data_dir / "my_diaries.csv"
         self.df = self._load_or_create_dataframe()
+        
+        # 지난 일기 기억 인덱스 (attach_memory_index로 연결)
+        self.memory_index = None
+    
+    def attach_memory_index(self, memory_index):
+        """
+        일지 저장/삭제 시 함께 갱신할 지난 일기 기억 인덱스 연결
+        
+        Args:
+            memory_index: diary_memory.DiaryMemoryIndex
+        """
+        self.memory_index = memory_index
+    
+    def _remember(self, plant_name: str, date, content: str, summary: str, emotion):
+        """기억 인덱스에 일기 추가 (실패해도 저장은 유지, 다음 시작 시 catch_up에서 보충)"""
+        if self.memory_index is None:
+            return
+        try:
+            with span("diary_storage.memory_add"):
+                self.memory_index.add(plant_name, date, content, summary, emotion)
+        except Exception as e:
+            print(f"[경고] 일기 기억 인덱스 추가 실패: {e}")
+    
+    def _forget(self, plant_name: str, date, content: str):
+        """기억 인덱스에서 일기 제거 (실패해도 삭제는 유지, 다음 시작 시 catch_up에서 정리)"""
+        if self.memory_index is None:
+            return
+        try:
+            self.memory_index.remove(plant_name, date, content)
+        except Exception as e:
+            print(f"[경고] 일기 기억 인덱스 삭제 실패: {e}")
+    
+    def _refresh_memory(self):
+        """재분석으로 바뀐 요약/감정점수를 기억 인덱스에 반영 (실패해도 갱신은 유지, 다음 catch_up에서 보충)"""
+        if self.memory_index is None:
+            return
+        try:
+            self.memory_index.catch_up(self)
+        except Exception as e:
+            print(f"[경고] 일기 기억 인덱스 갱신 실패: {e}")
     
     def _load_or_create_dataframe(self) -> pd.DataFrame:
         """데이터프레임 로드 또는 생성"""
@@ -51,6 +93,17 @@ class DiaryStorage:
         print("[정보] 새 일지 데이터프레임 생성")
         return df
     
+    @staticmethod
+    def _analysis_to_columns(analysis_result: Dict) -> Dict:
+        """mind_coach 분석 결과를 AI 분석 컬럼 값으로 변환"""
+        return {
+            '요약': analysis_result.get('summary', ''),
+            '감정점수': analysis_result.get('emotion', 50),
+            '감정라벨': analysis_result.get('emotion_label', '중립적'),
+            '응원메시지': analysis_result.get('cheer', ''),
+            '식물조언': analysis_result.get('plant_advice', ''),
+        }
+    
     def save_diary(
         self,
         plant_name: str,
@@ -69,28 +122,34 @@ class DiaryStorage:
             성공 여부
         """
         try:
-            # 새 항목 데이터
-            new_data = {
-                '날짜': datetime.now(),
-                '식물이름': plant_name,
-                '일지내용': diary_content,
-                '요약': analysis_result.get('summary', ''),
-                '감정점수': analysis_result.get('emotion', 50),
-                '감정라벨': analysis_result.get('emotion_label', '중립적'),
-                '응원메시지': analysis_result.get('cheer', ''),
-                '식물조언': analysis_result.get('plant_advice', ''),
-            }
-            
-            # 빈 데이터프레임인 경우
-            if len(self.df) == 0:
-                self.df = pd.DataFrame([new_data])
-            else:
-                # 기존 데이터가 있는 경우
-                new_entry = pd.DataFrame([new_data])
-                self.df = pd.concat([self.df, new_entry], ignore_index=True)
+            with span("diary_storage.save"):
+                # 새 항목 데이터
+                new_data = {
+                    '날짜': datetime.now(),
+                    '식물이름': plant_name,
+                    '일지내용': diary_content,
+                    **self._analysis_to_columns(analysis_result),
+                }
+                
+                # 빈 데이터프레임인 경우
+                if len(self.df) == 0:
+                    self.df = pd.DataFrame([new_data])
+                else:
+                    # 기존 데이터가 있는 경우
+                    new_entry = pd.DataFrame([new_data])
+                    self.df = pd.concat([self.df, new_entry], ignore_index=True)
+                
+                # CSV 저장
+                with span("diary_storage.csv_write"):
+                    self.df.to_csv(self.diary_file, index=False, encoding='utf-8-sig')
             
-            # CSV 저장
-            self.df.to_csv(self.diary_file, index=False, encoding='utf-8-sig')
+            self._remember(
+                plant_name,
+                new_data['날짜'],
+                diary_content,
+                new_data['요약'],
+                new_data['감정점수']
+            )
             
             print(f"[완료] 일지 저장: {plant_name}")
             return True
@@ -99,6 +158,60 @@ class DiaryStorage:
             print(f"[오류] 일지 저장 실패: {e}")
             return False
     
+    def update_analyses(
+        self,
+        updates: List[Tuple[datetime, str, Dict]]
+    ) -> int:
+        """
+        기존 일지들의 AI 분석 결과를 한 번에 갱신 (재분석 백필용)
+        
+        일지는 delete_diary와 같이 (날짜, 일지내용)으로 식별하며,
+        모든 항목을 반영한 뒤 CSV를 한 번만 저장하고, 기억 인덱스가 연결되어 있으면
+        바뀐 요약/감정점수를 다시 임베딩합니다.
+        
+        Args:
+            updates: [(날짜, 일지내용, mind_coach.get_full_response() 결과)] 목록
+        
+        Returns:
+            갱신된 일지 수
+        """
+        try:
+            # 백필 도중 추가/삭제된 일지를 반영하기 위해 최신 데이터 기준으로 갱신
+            self.reload_data()
+            if len(self.df) == 0 or not updates:
+                return 0
+            
+            row_lookup = {
+                (date, content): idx
+                for idx, date, content in zip(self.df.index, self.df['날짜'], self.df['일지내용'])
+            }
+            
+            # 빈 값만 있던 텍스트 컬럼은 float로 로드되므로 object로 맞춤
+            for column in ['요약', '감정라벨', '응원메시지', '식물조언']:
+                self.df[column] = self.df[column].astype(object)
+            
+            updated = 0
+            for date, content, analysis_result in updates:
+                idx = row_lookup.get((pd.Timestamp(date), content))
+                if idx is None:
+                    continue
+                for column, value in self._analysis_to_columns(analysis_result).items():
+                    self.df.at[idx, column] = value
+                updated += 1
+            
+            if updated:
+                self.df.to_csv(self.diary_file, index=False, encoding='utf-8-sig')
+            
+            print(f"[완료] 일지 분석 결과 일괄 갱신: {updated}/{len(updates)}개")
+        
+        except Exception as e:
+            print(f"[오류] 일괄 갱신 실패: {e}")
+            return 0
+        
+        if updated:
+            self._refresh_memory()
+        return updated
+    
     def reload_data(self):
         """CSV 파일에서 데이터 다시 로드"""
         self.df = self._load_or_create_dataframe()
@@ -198,6 +311,8 @@ class DiaryStorage:
             self.df = self.df[~mask]
             self.df.to_csv(self.diary_file, index=False, encoding='utf-8-sig')
             
+            self._forget(plant_name, date_to_delete, content_to_delete)
+            
             print("[완료] 일지 삭제")
             return True
         
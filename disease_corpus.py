@@ -0,0 +1,127 @@
+"""
+병해충 원본 코퍼스 저장소
+- collect_all_data 결과(정제된 필드, sickKey, 이미지 경로)를 작물별 JSONL로 보관
+- 수집할 때마다 새 버전으로 저장하고, 내용이 같으면 버전을 늘리지 않음
+- 인덱스 재생성(문서 템플릿/청크/임베딩 모델 변경)은 NCPMS 재수집 없이 코퍼스에서 수행
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class DiseaseCorpus:
+    """작물별 버전 관리 JSONL 코퍼스 ({base_dir}/{작물 디렉토리}/v0001.jsonl + manifest.json)"""
+
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, base_dir: str = "./disease_corpus", keep_versions: int = 5):
+        """
+        Args:
+            base_dir: 코퍼스 저장 디렉토리
+            keep_versions: 작물별로 남겨둘 최근 버전 수
+        """
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+
+    def _crop_dir(self, crop_name: str) -> Path:
+        """작물 디렉토리 (한글 작물명을 그대로 쓰지 않도록 해시 접미사 사용)"""
+        digest = hashlib.sha1(crop_name.encode("utf-8")).hexdigest()[:12]
+        return self.base_dir / f"crop_{digest}"
+
+    @staticmethod
+    def content_hash(diseases: List[Dict]) -> str:
+        """코퍼스 내용 해시 (필드 순서와 무관)"""
+        payload = json.dumps(diseases, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def read_manifest(self, crop_name: str) -> Dict:
+        """작물 코퍼스 매니페스트 ({"crop_name", "latest", "versions": [...]})"""
+        manifest_path = self._crop_dir(crop_name) / self.MANIFEST_FILE
+        if not manifest_path.exists():
+            return {"crop_name": crop_name, "latest": None, "versions": []}
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self, crop_name: str, manifest: Dict):
+        crop_dir = self._crop_dir(crop_name)
+        tmp_path = crop_dir / f"{self.MANIFEST_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, crop_dir / self.MANIFEST_FILE)
+
+    def exists(self, crop_name: str) -> bool:
+        """저장된 코퍼스가 있는지 확인"""
+        return self.read_manifest(crop_name)["latest"] is not None
+
+    def save(self, crop_name: str, diseases: List[Dict]) -> int:
+        """
+        수집 결과를 새 버전으로 저장 (최신 버전과 내용이 같으면 그 버전 번호 반환)
+
+        Args:
+            crop_name: 작물명 (한글)
+            diseases: collect_all_data 결과
+
+        Returns:
+            저장된(또는 같은 내용의) 버전 번호
+        """
+        digest = self.content_hash(diseases)
+        with self._lock:
+            crop_dir = self._crop_dir(crop_name)
+            crop_dir.mkdir(exist_ok=True)
+            manifest = self.read_manifest(crop_name)
+
+            versions = manifest["versions"]
+            if versions and versions[-1]["sha256"] == digest:
+                print(f"[정보] '{crop_name}' 코퍼스 변경 없음 (v{manifest['latest']})")
+                return manifest["latest"]
+
+            version = (manifest["latest"] or 0) + 1
+            file_name = f"v{version:04d}.jsonl"
+            tmp_path = crop_dir / f"{file_name}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for disease in diseases:
+                    f.write(json.dumps(disease, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, crop_dir / file_name)
+
+            versions.append({
+                "version": version,
+                "file": file_name,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "count": len(diseases),
+                "sha256": digest,
+            })
+            # 오래된 버전 정리
+            for old in versions[:-self.keep_versions]:
+                (crop_dir / old["file"]).unlink(missing_ok=True)
+            manifest["versions"] = versions[-self.keep_versions:]
+            manifest["latest"] = version
+            self._write_manifest(crop_name, manifest)
+
+        print(f"[완료] '{crop_name}' 코퍼스 저장 v{version} ({len(diseases)}개 병해충)")
+        return version
+
+    def load(self, crop_name: str, version: Optional[int] = None) -> List[Dict]:
+        """
+        코퍼스 로드
+
+        Args:
+            crop_name: 작물명 (한글)
+            version: 버전 번호 (생략 시 최신)
+
+        Raises:
+            FileNotFoundError: 코퍼스(또는 해당 버전)가 없음
+        """
+        manifest = self.read_manifest(crop_name)
+        version = version or manifest["latest"]
+        entry = next((v for v in manifest["versions"] if v["version"] == version), None)
+        if entry is None:
+            raise FileNotFoundError(f"'{crop_name}' 코퍼스 v{version}이 없습니다.")
+        with open(self._crop_dir(crop_name) / entry["file"], "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
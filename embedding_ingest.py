@@ -0,0 +1,309 @@
+"""
+임베딩 일괄 적재 파이프라인
+- tiktoken 토큰 수 기준으로 청크를 요청 배치로 묶음
+- 제한된 수의 배치를 동시에 임베딩 (실패 시 지수 백오프 재시도)
+- 배치가 끝나는 대로 벡터 스토어(Chroma)에 upsert
+- 스트리밍 모드: 생산 단계(수집 등)와 제한된 크기의 큐로 연결해 문서가 도착하는 대로 배치 임베딩
+"""
+
+import time
+import uuid
+import queue
+import random
+import threading
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional
+
+from token_budget import count_tokens
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+# 스트리밍 생산 스레드가 끝났음을 알리는 표식
+_END = object()
+
+
+class EmbeddingIngestor:
+    """토큰 기준 배치 + 병렬 임베딩 + 점진적 upsert"""
+
+    def __init__(
+        self,
+        embeddings,
+        max_batch_tokens: int = 8000,
+        max_batch_size: int = 256,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        retry_delay: float = 1.0
+    ):
+        """
+        Args:
+            embeddings: embed_documents를 제공하는 임베딩 객체
+            max_batch_tokens: 요청 1회에 담을 최대 토큰 수
+            max_batch_size: 요청 1회에 담을 최대 청크 수
+            max_concurrency: 동시에 진행할 최대 임베딩 요청 수
+            max_retries: 배치별 최대 재시도 횟수
+            retry_delay: 첫 재시도 대기 시간(초), 재시도마다 2배씩 증가
+        """
+        self.embeddings = embeddings
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+    def make_batches(self, token_counts: List[int]) -> List[List[int]]:
+        """
+        텍스트별 토큰 수를 기준으로 순서대로 묶음
+
+        Returns:
+            배치별 텍스트 인덱스 목록 (한도를 넘는 단일 텍스트는 단독 배치)
+        """
+        batches = []
+        current, current_tokens = [], 0
+
+        for i, tokens in enumerate(token_counts):
+            if current and (
+                current_tokens + tokens > self.max_batch_tokens
+                or len(current) >= self.max_batch_size
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_with_retry(self, texts: List[str]) -> List[List[float]]:
+        """배치 임베딩 (지터를 더한 지수 백오프 재시도)"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_delay * (2 ** attempt) * (0.5 + random.random())
+                print(f"[경고] 임베딩 요청 실패 ({len(texts)}개), {delay:.1f}초 후 재시도: {e}")
+                time.sleep(delay)
+
+    @staticmethod
+    def _upsert(vectorstore, ids: List[str], embeddings: List[List[float]], documents: List["Document"]):
+        """미리 계산한 임베딩으로 Chroma 컬렉션에 upsert (재임베딩 없음)"""
+        metadatas = [doc.metadata or None for doc in documents]
+        vectorstore._collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=[doc.page_content for doc in documents],
+            metadatas=metadatas if any(m is not None for m in metadatas) else None
+        )
+
+    def ingest(
+        self,
+        vectorstore,
+        documents: List["Document"],
+        ids: Optional[List[str]] = None
+    ) -> Dict[str, float]:
+        """
+        문서를 배치 단위로 임베딩하여 벡터 스토어에 적재
+
+        Args:
+            vectorstore: langchain Chroma 인스턴스
+            documents: 적재할 문서 목록
+            ids: 문서 ID 목록 (생략 시 uuid4)
+
+        Returns:
+            {"documents", "batches", "tokens", "seconds"} 적재 통계
+        """
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in documents]
+
+        texts = [doc.page_content for doc in documents]
+        token_counts = [count_tokens(text) for text in texts]
+        batches = self.make_batches(token_counts)
+        total_tokens = sum(token_counts)
+        started = time.perf_counter()
+        failed = []
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            # 호출 스레드의 컨텍스트(우선순위 차선 등)를 작업 스레드에 그대로 전달
+            futures = {
+                executor.submit(
+                    contextvars.copy_context().run, self._embed_with_retry, [texts[i] for i in batch]
+                ): batch
+                for batch in batches
+            }
+            # 끝난 배치부터 바로 upsert (벡터 스토어 쓰기는 이 스레드에서만)
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    vectors = future.result()
+                except Exception as e:
+                    print(f"[오류] 임베딩 배치 실패 ({len(batch)}개): {e}")
+                    failed.append(batch)
+                    continue
+                self._upsert(
+                    vectorstore,
+                    [ids[i] for i in batch],
+                    vectors,
+                    [documents[i] for i in batch]
+                )
+
+        elapsed = time.perf_counter() - started
+        if failed:
+            raise RuntimeError(
+                f"임베딩 적재 실패: {sum(len(b) for b in failed)}/{len(documents)}개 문서 "
+                f"({len(failed)}개 배치)"
+            )
+
+        print(
+            f"[완료] 임베딩 적재 {len(documents)}개 ({len(batches)}개 배치, {total_tokens} 토큰, {elapsed:.1f}초)"
+        )
+        return {
+            "documents": len(documents),
+            "batches": len(batches),
+            "tokens": total_tokens,
+            "seconds": round(elapsed, 3)
+        }
+
+    def ingest_stream(
+        self,
+        vectorstore,
+        documents: Iterable["Document"],
+        id_of: Optional[Callable[["Document"], str]] = None,
+        queue_size: int = 64,
+        max_batch_wait: float = 0.5
+    ) -> Dict[str, float]:
+        """
+        문서 이터레이터(제너레이터)를 소비하면서 배치 임베딩과 upsert를 동시에 진행
+
+        이터레이터는 별도 스레드에서 돌며 크기가 제한된 큐로 문서를 넘깁니다.
+        큐가 차면 생산 단계가 멈추고, 진행 중인 임베딩 요청도 max_concurrency개로 제한되므로
+        문서 수와 관계없이 메모리에 올라가는 문서/벡터 수가 일정합니다.
+        배치가 다 차지 않아도 첫 문서가 max_batch_wait초 기다렸으면 바로 임베딩합니다.
+
+        Args:
+            vectorstore: langchain Chroma 인스턴스
+            documents: 적재할 문서 이터레이터 (예: 수집 결과를 문서로 바꾸는 제너레이터)
+            id_of: 문서 → ID 함수 (생략 시 uuid4)
+            queue_size: 생산 단계와 임베딩 단계 사이 큐 크기
+            max_batch_wait: 덜 찬 배치를 임베딩하기 전 최대 대기 시간(초)
+
+        Returns:
+            {"documents", "batches", "tokens", "seconds"} 적재 통계
+        """
+        handoff: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        producer_errors: List[BaseException] = []
+
+        def offer(item) -> bool:
+            """큐가 비기를 기다려 넣기 (소비 쪽이 먼저 중단되면 False)"""
+            while not stop.is_set():
+                try:
+                    handoff.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for doc in documents:
+                    if not offer(doc):
+                        return
+            except BaseException as e:
+                producer_errors.append(e)
+            finally:
+                offer(_END)
+
+        producer = threading.Thread(
+            target=contextvars.copy_context().run, args=(produce,), name="ingest-producer", daemon=True
+        )
+
+        stats = {"documents": 0, "batches": 0, "tokens": 0}
+        failed = []
+        batch: List["Document"] = []
+        batch_tokens = 0
+        batch_started = 0.0
+        in_flight = {}
+        started = time.perf_counter()
+
+        def collect(done):
+            """끝난 배치 upsert (벡터 스토어 쓰기는 호출 스레드에서만)"""
+            for future in done:
+                batch_docs = in_flight.pop(future)
+                try:
+                    vectors = future.result()
+                except Exception as e:
+                    print(f"[오류] 임베딩 배치 실패 ({len(batch_docs)}개): {e}")
+                    failed.append(len(batch_docs))
+                    continue
+                ids = [id_of(doc) if id_of else str(uuid.uuid4()) for doc in batch_docs]
+                self._upsert(vectorstore, ids, vectors, batch_docs)
+
+        def submit(executor):
+            nonlocal batch, batch_tokens
+            # 진행 중인 요청이 한도에 닿으면 하나가 끝날 때까지 대기 (임베딩 단계 역압)
+            while len(in_flight) >= self.max_concurrency:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = executor.submit(
+                contextvars.copy_context().run, self._embed_with_retry, [doc.page_content for doc in batch]
+            )
+            in_flight[future] = batch
+            stats["batches"] += 1
+            batch, batch_tokens = [], 0
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            producer.start()
+            try:
+                while True:
+                    timeout = None
+                    if batch:
+                        timeout = max(0.0, batch_started + max_batch_wait - time.perf_counter())
+                    try:
+                        doc = handoff.get(timeout=timeout)
+                    except queue.Empty:
+                        submit(executor)
+                        continue
+                    if doc is _END:
+                        break
+
+                    tokens = count_tokens(doc.page_content)
+                    if batch and (
+                        batch_tokens + tokens > self.max_batch_tokens
+                        or len(batch) >= self.max_batch_size
+                    ):
+                        submit(executor)
+                    if not batch:
+                        batch_started = time.perf_counter()
+                    batch.append(doc)
+                    batch_tokens += tokens
+                    stats["documents"] += 1
+                    stats["tokens"] += tokens
+
+                    # 기다리지 않고 끝난 배치부터 upsert
+                    collect([future for future in in_flight if future.done()])
+
+                if batch:
+                    submit(executor)
+                collect(list(in_flight))
+            finally:
+                stop.set()
+                producer.join()
+
+        elapsed = time.perf_counter() - started
+        if producer_errors:
+            raise producer_errors[0]
+        if failed:
+            raise RuntimeError(
+                f"임베딩 적재 실패: {sum(failed)}/{stats['documents']}개 문서 ({len(failed)}개 배치)"
+            )
+
+        print(
+            f"[완료] 스트리밍 임베딩 적재 {stats['documents']}개 "
+            f"({stats['batches']}개 배치, {stats['tokens']} 토큰, {elapsed:.1f}초)"
+        )
+        return {**stats, "seconds": round(elapsed, 3)}
@@ -0,0 +1,199 @@
+"""
+병해충 이미지 저장소 (내용 주소 방식)
+- 응답을 메모리에 모으지 않고 청크 단위로 디스크에 쓰면서 sha256 계산
+- 파일명은 내용 해시 + 원본 형식 확장자 (GIF/JPEG/PNG 재인코딩 없음)
+- 여러 작물이 같은 이미지를 쓰면 파일 하나만 저장
+- 원본 URL → 파일 매핑과 사용하는 작물 목록을 index.json에 기록
+- PIL은 선택적인 썸네일 생성에만 사용
+"""
+
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+from metrics import inc
+
+
+# 파일 앞부분(매직 바이트)으로 판별하는 이미지 형식
+_MAGIC_EXTENSIONS = [
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"BM", ".bmp"),
+]
+
+_CONTENT_TYPE_EXTENSIONS = {
+    "image/gif": ".gif",
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/bmp": ".bmp",
+    "image/webp": ".webp",
+}
+
+
+def guess_extension(head: bytes, content_type: Optional[str] = None, url: str = "") -> str:
+    """매직 바이트 → Content-Type → URL 확장자 순서로 이미지 확장자 판별"""
+    for magic, extension in _MAGIC_EXTENSIONS:
+        if head.startswith(magic):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if content_type:
+        extension = _CONTENT_TYPE_EXTENSIONS.get(content_type.split(";")[0].strip().lower())
+        if extension:
+            return extension
+    suffix = Path(urlsplit(url).path).suffix.lower()
+    return ".jpg" if suffix == ".jpeg" else (suffix or ".bin")
+
+
+class ImageStore:
+    """내용 해시 기반 이미지 저장소 (스레드 안전)"""
+
+    INDEX_FILE = "index.json"
+    THUMBNAIL_DIR = "thumbs"
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, image_dir: str = "./crop_images"):
+        """
+        Args:
+            image_dir: 이미지 저장 디렉토리
+        """
+        self.image_dir = Path(image_dir)
+        self.image_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    def _load_index(self) -> Dict[str, Dict]:
+        index_path = self.image_dir / self.INDEX_FILE
+        if not index_path.exists():
+            return {}
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[경고] 이미지 인덱스 로드 실패, 새로 생성: {e}")
+            return {}
+
+    def _save_index(self):
+        """매핑 저장 (잠금은 호출자가 관리)"""
+        tmp_path = self.image_dir / f"{self.INDEX_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.image_dir / self.INDEX_FILE)
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """
+        이미 저장한 URL의 매핑 ({"file", "sha256", "bytes", "content_type", "crops"})
+
+        파일이 지워졌으면 None을 반환합니다.
+        """
+        with self._lock:
+            record = self._index.get(url)
+        if record is None or not (self.image_dir / record["file"]).exists():
+            return None
+        return dict(record)
+
+    def path_of(self, record: Dict) -> str:
+        return str(self.image_dir / record["file"])
+
+    def add_crop(self, url: str, crop_name: str):
+        """기존 매핑에 사용 작물 추가"""
+        with self._lock:
+            record = self._index.get(url)
+            if record is not None and crop_name not in record["crops"]:
+                record["crops"].append(crop_name)
+                self._save_index()
+
+    def store_stream(
+        self,
+        url: str,
+        chunks: Iterable[bytes],
+        crop_name: str,
+        content_type: Optional[str] = None
+    ) -> Dict:
+        """
+        청크를 임시 파일에 쓰면서 해시를 계산한 뒤 내용 해시 파일명으로 저장
+
+        같은 내용의 파일이 이미 있으면 임시 파일을 지우고 기존 파일을 사용합니다.
+
+        Args:
+            url: 원본 URL
+            chunks: 응답 본문 청크 (예: response.iter_content)
+            crop_name: 이미지를 사용하는 작물명
+            content_type: 응답 Content-Type (형식 판별 보조)
+
+        Returns:
+            매핑 레코드
+        """
+        digest = hashlib.sha256()
+        head = b""
+        size = 0
+        tmp_path = self.image_dir / f".download.{threading.get_ident()}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if len(head) < 16:
+                        head += chunk[:16 - len(head)]
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            if size == 0:
+                raise ValueError("빈 이미지 응답")
+
+            sha256 = digest.hexdigest()
+            file_name = f"{sha256[:32]}{guess_extension(head, content_type, url)}"
+            target = self.image_dir / file_name
+
+            with self._lock:
+                if target.exists():
+                    inc("image_store.dedup_hits")
+                else:
+                    os.replace(tmp_path, target)
+                    inc("image_store.bytes_written", size)
+                record = self._index.get(url)
+                crops = record["crops"] if record is not None and record["sha256"] == sha256 else []
+                if crop_name not in crops:
+                    crops.append(crop_name)
+                record = {
+                    "file": file_name,
+                    "sha256": sha256,
+                    "bytes": size,
+                    "content_type": content_type,
+                    "crops": crops,
+                }
+                self._index[url] = record
+                self._save_index()
+            return dict(record)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def make_thumbnail(self, record: Dict, size: Tuple[int, int] = (256, 256)) -> Optional[str]:
+        """
+        썸네일 생성 (PIL 사용, 이미 있으면 재사용)
+
+        Returns:
+            썸네일 경로 (실패 시 None)
+        """
+        thumb_dir = self.image_dir / self.THUMBNAIL_DIR
+        thumb_path = thumb_dir / f"{record['sha256'][:32]}_{size[0]}x{size[1]}.png"
+        if thumb_path.exists():
+            return str(thumb_path)
+        try:
+            from PIL import Image
+
+            thumb_dir.mkdir(exist_ok=True)
+            with Image.open(self.image_dir / record["file"]) as img:
+                img.thumbnail(size)
+                img.save(thumb_path)
+            return str(thumb_path)
+        except Exception as e:
+            print(f"    [경고] 썸네일 생성 실패 ({record['file']}): {e}")
+            return None
@@ -0,0 +1,274 @@
+"""
+작물 병해충 인덱스 일괄 생성 작업
+- 여러 작물(기본: PlantDiseaseRAG.CROP_NAME_MAP 전체)을 작업 풀 하나로 함께 수집
+- 작물/sickKey 단위 체크포인트(JSONL) - 중단 후 같은 경로로 다시 실행하면 이어서 처리
+- 수집이 끝난 작물부터 코퍼스 저장 및 인덱스 생성
+- 작물별/전체 처리량 요약 출력
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from plant_doctor import PlantDiseaseCollector, PlantDiseaseRAG
+from disease_corpus import DiseaseCorpus
+from ncpms_cache import NcpmsResponseCache
+from metrics import REGISTRY
+
+
+class IngestCheckpoint:
+    """
+    작물/sickKey 단위 진행 기록 (JSONL, 한 줄씩 추가)
+
+    - {"crop", "sickKey", "detail"}: 상세 정보 수집 완료
+    - {"crop", "done": true}: 작물 인덱스(또는 코퍼스) 생성 완료
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.details: Dict[str, Dict[str, Dict]] = {}
+        self.done = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 중단 시 마지막 줄이 잘린 경우 무시
+                    continue
+                if record.get("done"):
+                    self.done.add(record["crop"])
+                elif record.get("detail"):
+                    self.details.setdefault(record["crop"], {})[record["sickKey"]] = record["detail"]
+
+    def _append(self, record: Dict):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def record_detail(self, crop_name: str, sick_key: str, detail: Dict):
+        self.details.setdefault(crop_name, {})[sick_key] = detail
+        self._append({"crop": crop_name, "sickKey": sick_key, "detail": detail})
+
+    def mark_done(self, crop_name: str):
+        self.done.add(crop_name)
+        self._append({"crop": crop_name, "done": True})
+
+
+def ingest_crops(
+    collector: PlantDiseaseCollector,
+    crops: List[str],
+    checkpoint_path: str,
+    rag_system: Optional[PlantDiseaseRAG] = None,
+    corpus: Optional[DiseaseCorpus] = None,
+    max_workers: int = 8,
+    sync_existing: bool = False
+) -> Dict[str, Dict]:
+    """
+    여러 작물의 병해충 데이터를 작업 풀 하나로 수집하고 작물별 인덱스 생성
+
+    Args:
+        collector: 수집기 (호스트별 동시 요청 제한은 수집기의 HostThrottle이 담당)
+        crops: 작물명 목록 (한글)
+        checkpoint_path: 체크포인트 JSONL 경로
+        rag_system: 인덱스를 생성할 RAG 시스템 (None이면 코퍼스만 저장)
+        corpus: rag_system이 없을 때 수집 결과를 저장할 코퍼스
+        max_workers: 작물 전체가 함께 쓰는 최대 동시 수집 작업 수
+        sync_existing: 이미 인덱스가 있는 작물도 sync_crop_index로 증분 동기화
+
+    Returns:
+        작물별 {"status", "diseases", "fetched", "resumed", "failed", "seconds"}
+    """
+    checkpoint = IngestCheckpoint(checkpoint_path)
+    corpus = corpus or (rag_system.corpus if rag_system is not None else DiseaseCorpus())
+    stats: Dict[str, Dict] = {}
+    started = time.perf_counter()
+
+    pending = []
+    for crop_name in crops:
+        index_exists = rag_system is not None and rag_system.index_ready(crop_name)
+        # --collect-only로 끝난 작물은 인덱스가 없으면 체크포인트의 상세 정보로 인덱스만 생성
+        if (crop_name in checkpoint.done and (rag_system is None or index_exists)) or (index_exists and not sync_existing):
+            print(f"[정보] '{crop_name}' 이미 완료 - 건너뜀")
+            stats[crop_name] = {"status": "skipped"}
+        elif index_exists:
+            crop_started = time.perf_counter()
+            try:
+                result = rag_system.sync_crop_index(crop_name, collector)
+                checkpoint.mark_done(crop_name)
+                stats[crop_name] = {"status": "synced", **result, "seconds": time.perf_counter() - crop_started}
+            except Exception as e:
+                print(f"[오류] '{crop_name}' 동기화 실패: {e}")
+                stats[crop_name] = {"status": "error", "error": str(e)}
+        else:
+            pending.append(crop_name)
+
+    if not pending:
+        return stats
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest") as executor:
+        # 1. 작물별 SVC01 목록
+        lists = dict(zip(pending, executor.map(collector.get_crop_diseases, pending)))
+
+        # 2. 체크포인트에 없는 sickKey만 작물 구분 없이 같은 풀에 제출
+        futures = {}
+        progress: Dict[str, Dict] = {}
+        for crop_name in pending:
+            disease_list = [item for item in lists[crop_name] if item.get("sickKey")]
+            if not disease_list:
+                print(f"[경고] '{crop_name}' 병해충 목록을 가져오지 못했습니다.")
+                stats[crop_name] = {"status": "error", "error": "빈 목록"}
+                continue
+            done_keys = checkpoint.details.get(crop_name, {})
+            todo = [item for item in disease_list if item["sickKey"] not in done_keys]
+            progress[crop_name] = {
+                "list": disease_list,
+                "remaining": len(todo),
+                "resumed": len(disease_list) - len(todo),
+                "failed": 0,
+                "started": time.perf_counter(),
+            }
+            print(f"[정보] '{crop_name}' 병해충 {len(disease_list)}개 (체크포인트 {len(disease_list) - len(todo)}개 재사용)")
+            for idx, item in enumerate(todo, 1):
+                future = executor.submit(collector.collect_one, crop_name, idx, len(todo), item)
+                futures[future] = (crop_name, item["sickKey"])
+
+        def finish(crop_name: str):
+            """수집이 끝난 작물의 코퍼스/인덱스 생성"""
+            state = progress[crop_name]
+            details = [
+                checkpoint.details[crop_name][item["sickKey"]]
+                for item in state["list"]
+                if item["sickKey"] in checkpoint.details.get(crop_name, {})
+            ]
+            stats[crop_name] = {
+                "status": "partial" if state["failed"] else "ok",
+                "diseases": len(details),
+                "fetched": len(details) - state["resumed"],
+                "resumed": state["resumed"],
+                "failed": state["failed"],
+            }
+            try:
+                if rag_system is not None:
+                    rag_system.create_crop_index(crop_name, details)
+                else:
+                    corpus.save(crop_name, details)
+            except Exception as e:
+                print(f"[오류] '{crop_name}' 인덱스 생성 실패: {e}")
+                stats[crop_name]["status"] = "error"
+                stats[crop_name]["error"] = str(e)
+                return
+            # 실패한 sickKey가 있으면 다음 실행에서 그 항목만 다시 수집
+            if not state["failed"]:
+                checkpoint.mark_done(crop_name)
+            stats[crop_name]["seconds"] = time.perf_counter() - state["started"]
+
+        for crop_name, state in progress.items():
+            if state["remaining"] == 0:
+                finish(crop_name)
+
+        # 3. 끝난 항목부터 체크포인트 기록, 작물의 마지막 항목이 끝나면 바로 인덱스 생성
+        for future in as_completed(futures):
+            crop_name, sick_key = futures[future]
+            state = progress[crop_name]
+            detail, failure = future.result()
+            if detail is not None:
+                checkpoint.record_detail(crop_name, sick_key, detail)
+            else:
+                state["failed"] += 1
+            state["remaining"] -= 1
+            if state["remaining"] == 0:
+                finish(crop_name)
+
+    elapsed = time.perf_counter() - started
+    fetched = sum(s.get("fetched", 0) for s in stats.values())
+    print(f"[완료] 작물 {len(crops)}개 처리 {elapsed:.1f}초, 새로 수집 {fetched}개 ({fetched / elapsed if elapsed else 0:.1f}개/초)")
+    return stats
+
+
+def print_summary(stats: Dict[str, Dict]):
+    """작물별 처리량 요약"""
+    print("=" * 72)
+    print(f"{'작물':<12}{'상태':<10}{'병해충':>8}{'수집':>8}{'재개':>8}{'실패':>8}{'초':>10}{'개/초':>10}")
+    print("-" * 72)
+    for crop_name, s in stats.items():
+        seconds = s.get("seconds")
+        rate = s.get("fetched", 0) / seconds if seconds else 0
+        print(
+            f"{crop_name:<12}{s['status']:<10}{s.get('diseases', s.get('listed', '-')):>8}"
+            f"{s.get('fetched', '-'):>8}{s.get('resumed', '-'):>8}{s.get('failed', '-'):>8}"
+            f"{'-' if seconds is None else round(seconds, 1):>10}{rate:>10.1f}"
+        )
+    print("=" * 72)
+    REGISTRY.log_summary()
+
+
+def main():
+    """명령행 실행"""
+    parser = argparse.ArgumentParser(description="작물 병해충 인덱스 일괄 생성")
+    parser.add_argument(
+        "--crops",
+        nargs="*",
+        default=None,
+        help=f"작물명 목록 (생략 시 전체: {', '.join(PlantDiseaseRAG.get_supported_crops())})"
+    )
+    parser.add_argument("--workers", type=int, default=8, help="작물 전체가 함께 쓰는 동시 수집 작업 수")
+    parser.add_argument("--per-host", type=int, default=4, help="호스트별 동시 요청 수")
+    parser.add_argument("--base-url", default=None, help="NCPMS 서비스 URL (로컬 대체 서버 등)")
+    parser.add_argument(
+        "--checkpoint",
+        default="./disease_corpus/ingest_checkpoint.jsonl",
+        help="체크포인트 파일 경로"
+    )
+    parser.add_argument("--collect-only", action="store_true", help="인덱스 없이 코퍼스만 저장 (OpenAI 키 불필요)")
+    parser.add_argument("--sync-existing", action="store_true", help="이미 있는 인덱스도 증분 동기화")
+    parser.add_argument("--offline", action="store_true", help="NCPMS 응답 캐시만 사용")
+    args = parser.parse_args()
+
+    crops = args.crops or PlantDiseaseRAG.get_supported_crops()
+    unsupported = [crop for crop in crops if not PlantDiseaseRAG.is_supported_crop(crop)]
+    if unsupported:
+        raise ValueError(f"지원하지 않는 작물: {', '.join(unsupported)}")
+
+    NCPMS_API_KEY = os.getenv("NCPMS_API_KEY")
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    if not args.collect_only and not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY 환경변수를 설정해주세요. (코퍼스만 저장하려면 --collect-only)")
+
+    collector_kwargs = {"base_url": args.base_url} if args.base_url else {}
+    collector = PlantDiseaseCollector(
+        api_key=NCPMS_API_KEY,
+        max_workers=args.workers,
+        per_host_limit=args.per_host,
+        cache=NcpmsResponseCache(offline=args.offline or None),
+        **collector_kwargs
+    )
+    rag_system = None if args.collect_only else PlantDiseaseRAG(openai_api_key=OPENAI_API_KEY)
+
+    stats = ingest_crops(
+        collector,
+        crops,
+        args.checkpoint,
+        rag_system=rag_system,
+        max_workers=args.workers,
+        sync_existing=args.sync_existing
+    )
+    print_summary(stats)
+
+
+if __name__ == "__main__":
+    main()
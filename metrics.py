@@ -0,0 +1,175 @@
+"""
+단계별 지연 시간 계측
+- 이름 붙은 span으로 단계별 소요 시간 측정
+- 프로세스 내 히스토그램 (p50/p95/p99) 및 카운터
+- 로그 요약 출력 및 Prometheus 텍스트 형식 내보내기
+"""
+
+import re
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+
+
+class Histogram:
+    """최근 샘플을 보관하는 지연 시간 히스토그램 (분위수 계산용)"""
+
+    def __init__(self, max_samples: int = 2048):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q: float) -> float:
+        """최근 샘플 기준 분위수 (q: 0-100)"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        rank = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+        return ordered[rank]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 4) if self.count else 0.0,
+            "p50": round(self.percentile(50), 4),
+            "p95": round(self.percentile(95), 4),
+            "p99": round(self.percentile(99), 4),
+        }
+
+
+class Span:
+    """span 하나의 측정 결과"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+
+
+class MetricsRegistry:
+    """프로세스 전역 지표 저장소 (스레드 안전)"""
+
+    def __init__(self, max_samples: int = 2048):
+        self.max_samples = max_samples
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        """단계 소요 시간 기록"""
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(self.max_samples)
+            self.histograms[name].observe(seconds)
+
+    def inc(self, name: str, value: float = 1):
+        """카운터 증가"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        블록 소요 시간을 name 히스토그램에 기록 (예외 시 name.errors 카운터 증가)
+
+        사용 예:
+            with REGISTRY.span("mind_coach.retrieval") as s:
+                ...
+            print(s.seconds)
+        """
+        current = Span(name)
+        started = time.perf_counter()
+        try:
+            yield current
+        except Exception:
+            self.inc(f"{name}.errors")
+            raise
+        finally:
+            current.seconds = time.perf_counter() - started
+            self.observe(name, current.seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """단계별 요약 {이름: {count, avg, p50, p95, p99}}"""
+        with self._lock:
+            return {name: hist.summary() for name, hist in sorted(self.histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    # ===== 내보내기 =====
+
+    def log_summary(self):
+        """단계별 지연 시간 요약을 로그로 출력"""
+        for name, stats in self.summary().items():
+            print(
+                f"[지연] {name}: n={stats['count']} avg={stats['avg']:.3f}s "
+                f"p50={stats['p50']:.3f}s p95={stats['p95']:.3f}s p99={stats['p99']:.3f}s"
+            )
+        with self._lock:
+            counters = dict(self.counters)
+        for name, value in sorted(counters.items()):
+            print(f"[카운터] {name}: {value:g}")
+
+    @staticmethod
+    def _metric_name(name: str) -> str:
+        return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+    def to_prometheus(self, prefix: str = "mygreen") -> str:
+        """Prometheus 텍스트 형식으로 변환"""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Stage latency in seconds",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        with self._lock:
+            histograms = {name: (hist.summary(), hist.total) for name, hist in sorted(self.histograms.items())}
+            counters = dict(sorted(self.counters.items()))
+
+        for name, (stats, total) in histograms.items():
+            for quantile in ("0.5", "0.95", "0.99"):
+                key = {"0.5": "p50", "0.95": "p95", "0.99": "p99"}[quantile]
+                lines.append(f'{prefix}_stage_seconds{{stage="{name}",quantile="{quantile}"}} {stats[key]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+
+        for name, value in counters.items():
+            metric = f"{prefix}_{self._metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, prefix: str = "mygreen"):
+        """Prometheus 텍스트 파일로 저장 (node_exporter textfile collector 용)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(self.to_prometheus(prefix), encoding="utf-8")
+        tmp_path.replace(path)
+
+
+# 프로세스 전역 저장소
+REGISTRY = MetricsRegistry()
+
+
+def span(name: str):
+    """전역 저장소에 기록하는 span"""
+    return REGISTRY.span(name)
+
+
+def inc(name: str, value: float = 1):
+    """전역 저장소의 카운터 증가"""
+    REGISTRY.inc(name, value)
+
+
+def observe(name: str, seconds: float):
+    """전역 저장소에 소요 시간 기록"""
+    REGISTRY.observe(name, seconds)
@@ -6,56 +6,333 @@
 """
 
 import os
+import re
 import json
+import zlib
+import asyncio
+import hashlib
+import threading
 from pathlib import Path
-from typing import Dict, Optional, Tuple, List
+from typing import TYPE_CHECKING, Dict, Optional, Tuple, List
 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
+import numpy as np
+
+# langchain/chromadb/openai는 무거우므로 실제로 사용할 때 import (페이지 시작 시간 단축)
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
+
+from vector_index import NumpyVectorIndex
+from embedding_ingest import EmbeddingIngestor
+from metrics import span
+from token_budget import PROMPT_BUDGETS, fit_context, summarize_to_budget
+from context_compression import fetch_candidates, compress_documents
+from openai_gateway import CLIENT_MAX_RETRIES, CoalescedEmbeddings, coalesce_chat
+from rate_limiter import lane
+from circuit_breaker import AnswerCache, guarded_call
+from diary_memory import DiaryMemoryIndex
+
+
+# 식물 조언 생성 실패 시 사용하는 기본 메시지
+DEFAULT_PLANT_ADVICE = "오늘도 당신의 마음에 귀 기울여주셔서 감사합니다. 식물처럼 천천히, 자신만의 속도로 성장하고 계신 거예요. 🌱"
+
+# 로컬 감정 분석 시 사용하는 기본 응원 메시지
+DEFAULT_CHEER = "오늘 하루도 수고 많으셨어요. 편안한 밤 보내세요."
+
+
+def emotion_label_for(emotion_score: int) -> Tuple[str, str]:
+    """감정 점수로부터 (감정 라벨, 색상) 결정"""
+    if emotion_score >= 70:
+        return "긍정적", ""
+    elif emotion_score >= 40:
+        return "중립적", ""
+    return "부정적", ""
+
+
+class EmotionPreScorer:
+    """
+    LLM 호출 없이 감정 점수(0-100)를 추정하는 로컬 점수기
+    - 한국어 감정 사전 기반 특징 + 문자 bigram 해싱 특징
+    - NumPy 로지스틱 회귀 (DiaryStorage의 감정점수로 학습)
+    - 학습 전에는 감정 사전 가중치만으로 점수 산출
+    """
+    
+    POSITIVE_WORDS = (
+        '행복', '기쁘', '기뻤', '기뻐', '좋았', '좋아', '좋은', '즐거', '신나', '신났', '설레',
+        '감사', '고마', '뿌듯', '사랑', '웃', '만족', '편안', '성공', '승진', '축하', '최고',
+        '완벽', '기대', '재밌', '재미있', '희망', '다행', '상쾌', '힐링', '칭찬', '멋지', '예쁘',
+    )
+    NEGATIVE_WORDS = (
+        '힘들', '힘든', '힘드', '슬프', '슬펐', '슬픈', '우울', '짜증', '화나', '화가', '불안',
+        '걱정', '외로', '피곤', '지치', '지쳤', '스트레스', '아프', '아팠', '실패', '혼났', '싫',
+        '괴롭', '눈물', '울었', '후회', '답답', '무서', '두렵', '서운', '속상', '최악', '포기',
+    )
+    INTENSIFIERS = ('정말', '너무', '진짜', '매우', '엄청', '완전', '아주', '무척', '가장')
+    NEGATIONS = ('안 ', '못 ', '않', '없')
+    POSITIVE_EMOTICONS = ('ㅋㅋ', 'ㅎㅎ', '^^', ':)', '😊', '😀', '😄', '🥰', '❤')
+    NEGATIVE_EMOTICONS = ('ㅠ', 'ㅜ', ':(', '😢', '😭', '😞')
+    
+    # 감정 사전 특징 가중치 (학습 전 기본값)
+    LEXICON_PRIOR = np.array(
+        [0.6, -0.7, -0.5, 0.4, 0.3, -0.3, 0.5, -0.6, 0.1, 0.0],
+        dtype=np.float64
+    )
+    HASH_DIM = 256
+    
+    def __init__(self):
+        self.weights = np.concatenate([self.LEXICON_PRIOR, np.zeros(self.HASH_DIM)])
+        self.bias = 0.0
+        self.trained_samples = 0
+        
+        # LLM 점수와의 일치도 누적 (온라인)
+        self._lock = threading.Lock()
+        self._agreement = {"count": 0, "abs_error": 0.0, "routing_match": 0, "label_match": 0}
+    
+    def _features(self, text: str) -> np.ndarray:
+        """일기 텍스트를 특징 벡터로 변환"""
+        lexicon = np.zeros(len(self.LEXICON_PRIOR))
+        text = text or ""
+        
+        # 문장 단위로 부정어가 있으면 극성을 뒤집어 별도 특징으로 집계
+        for sentence in re.split(r'[.!?\n]+', text):
+            if not sentence.strip():
+                continue
+            pos = sum(sentence.count(w) for w in self.POSITIVE_WORDS)
+            neg = sum(sentence.count(w) for w in self.NEGATIVE_WORDS)
+            intense = any(w in sentence for w in self.INTENSIFIERS)
+            negated = any(w in sentence for w in self.NEGATIONS)
+            
+            if negated:
+                lexicon[2] += pos
+                lexicon[3] += neg
+            else:
+                lexicon[0] += pos
+                lexicon[1] += neg
+                if intense:
+                    lexicon[4] += pos
+                    lexicon[5] += neg
+        
+        lexicon[6] = sum(text.count(e) for e in self.POSITIVE_EMOTICONS)
+        lexicon[7] = sum(text.count(e) for e in self.NEGATIVE_EMOTICONS)
+        lexicon[8] = min(text.count('!'), 5)
+        lexicon[9] = np.log1p(len(text)) / 10
+        
+        # 문자 bigram 해싱 (학습 데이터가 있을 때만 가중치가 생김)
+        hashed = np.zeros(self.HASH_DIM)
+        compact = re.sub(r'\s+', '', text)
+        if len(compact) >= 2:
+            for i in range(len(compact) - 1):
+                bucket = zlib.crc32(compact[i:i + 2].encode('utf-8')) % self.HASH_DIM
+                hashed[bucket] += 1
+            hashed /= (len(compact) - 1)
+        
+        return np.concatenate([lexicon, hashed])
+    
+    def predict(self, text: str) -> int:
+        """감정 점수 추정 (0-100 정수)"""
+        logit = float(self._features(text) @ self.weights + self.bias)
+        return int(round(100 / (1 + np.exp(-logit))))
+    
+    def fit(
+        self,
+        texts: List[str],
+        scores: List[float],
+        epochs: int = 300,
+        lr: float = 0.5,
+        l2: float = 1e-3
+    ) -> "EmotionPreScorer":
+        """
+        저장된 감정 점수로 로지스틱 회귀 학습 (점수/100을 소프트 라벨로 사용)
+        
+        Args:
+            texts: 일기 목록
+            scores: 각 일기의 LLM 감정 점수 (0-100)
+            epochs: 경사하강 반복 횟수
+            lr: 학습률
+            l2: L2 정규화 계수
+        """
+        X = np.stack([self._features(t) for t in texts])
+        y = np.clip(np.asarray(scores, dtype=np.float64) / 100, 0, 1)
+        
+        w = np.concatenate([self.LEXICON_PRIOR, np.zeros(self.HASH_DIM)])
+        b = 0.0
+        n = len(y)
+        
+        for _ in range(epochs):
+            p = 1 / (1 + np.exp(-(X @ w + b)))
+            grad = p - y
+            w -= lr * (X.T @ grad / n + l2 * w)
+            b -= lr * grad.mean()
+        
+        self.weights = w
+        self.bias = b
+        self.trained_samples = n
+        return self
+    
+    def fit_from_storage(self, storage, holdout: float = 0.2) -> Dict[str, float]:
+        """
+        DiaryStorage에 저장된 일지내용/감정점수로 학습
+        
+        Args:
+            storage: DiaryStorage
+            holdout: 일치도 평가용으로 떼어둘 비율 (최신 일지 기준)
+        
+        Returns:
+            홀드아웃 구간의 LLM 점수 일치도 (agreement 결과)
+        """
+        storage.reload_data()
+        df = storage.df.dropna(subset=['일지내용', '감정점수']).sort_values('날짜')
+        texts = df['일지내용'].astype(str).tolist()
+        scores = df['감정점수'].astype(float).tolist()
+        
+        if len(texts) < 10:
+            print(f"[정보] 학습용 일지가 부족하여 감정 사전만 사용합니다 ({len(texts)}개)")
+            return self.agreement(texts, scores)
+        
+        split = max(1, int(len(texts) * (1 - holdout)))
+        self.fit(texts[:split], scores[:split])
+        report = self.agreement(texts[split:], scores[split:])
+        print(f"[완료] 로컬 감정 점수기 학습 ({split}개) - 홀드아웃 일치도: {report}")
+        return report
+    
+    @staticmethod
+    def _compare(pre_scores: np.ndarray, llm_scores: np.ndarray) -> Dict[str, float]:
+        """로컬 점수와 LLM 점수의 일치도 지표 계산"""
+        if len(llm_scores) == 0:
+            return {"count": 0, "mae": 0.0, "routing_agreement": 0.0, "label_agreement": 0.0}
+        
+        bins = [40, 70]
+        return {
+            "count": int(len(llm_scores)),
+            "mae": round(float(np.abs(pre_scores - llm_scores).mean()), 2),
+            "routing_agreement": round(float(((pre_scores >= 70) == (llm_scores >= 70)).mean()), 3),
+            "label_agreement": round(float(
+                (np.digitize(pre_scores, bins) == np.digitize(llm_scores, bins)).mean()
+            ), 3)
+        }
+    
+    def agreement(self, texts: List[str], llm_scores: List[float]) -> Dict[str, float]:
+        """
+        일기 목록에 대해 로컬 점수와 LLM 점수 일치도 계산
+        
+        Returns:
+            {"count", "mae", "routing_agreement"(db_high/db_low 선택 일치율), "label_agreement"}
+        """
+        pre = np.array([self.predict(t) for t in texts], dtype=np.float64)
+        return self._compare(pre, np.asarray(llm_scores, dtype=np.float64))
+    
+    def record(self, pre_score: int, llm_score: int):
+        """실서비스에서 나온 (로컬 점수, LLM 점수) 쌍을 누적"""
+        pre_label, _ = emotion_label_for(pre_score)
+        llm_label, _ = emotion_label_for(llm_score)
+        with self._lock:
+            self._agreement["count"] += 1
+            self._agreement["abs_error"] += abs(pre_score - llm_score)
+            self._agreement["routing_match"] += int((pre_score >= 70) == (llm_score >= 70))
+            self._agreement["label_match"] += int(pre_label == llm_label)
+    
+    def agreement_report(self) -> Dict[str, float]:
+        """누적된 LLM 점수 일치도 요약"""
+        with self._lock:
+            count = self._agreement["count"]
+            if count == 0:
+                return {"count": 0, "mae": 0.0, "routing_agreement": 0.0, "label_agreement": 0.0}
+            return {
+                "count": count,
+                "mae": round(self._agreement["abs_error"] / count, 2),
+                "routing_agreement": round(self._agreement["routing_match"] / count, 3),
+                "label_agreement": round(self._agreement["label_match"] / count, 3)
+            }
+    
+    def can_skip_llm(self, min_samples: int = 200, min_routing_agreement: float = 0.95) -> bool:
+        """누적 일치도가 기준 이상이면 라우팅용 LLM 호출을 생략해도 되는지 판단"""
+        report = self.agreement_report()
+        return report["count"] >= min_samples and report["routing_agreement"] >= min_routing_agreement
 
 
 class MindCoachRAG:
     """마음 건강 RAG 시스템"""
     
-    def __init__(self, openai_api_key: str, data_dir: str = "./data", db_dir: str = "./mind_db"):
+    EMBEDDING_MODEL = "text-embedding-3-small"
+    CHUNK_SIZE = 800
+    CHUNK_OVERLAP = 100
+    MANIFEST_FILE = "manifest.json"
+    
+    # 호출별 마감 시간(초) - 넘기면 기다리지 않고 대체 응답 사용
+    EMOTION_TIMEOUT = 20.0
+    ADVICE_TIMEOUT = 15.0
+    RETRIEVAL_TIMEOUT = 5.0
+    
+    # 조언에 함께 넣는 비슷한 지난 일기 수
+    MEMORY_TOP_K = 2
+    
+    def __init__(
+        self,
+        openai_api_key: str,
+        data_dir: str = "./data",
+        db_dir: str = "./mind_db",
+        use_numpy_index: bool = False,
+        llm=None,
+        embeddings=None
+    ):
         """
         Args:
             openai_api_key: OpenAI API 키
             data_dir: PDF 파일이 저장된 디렉토리
             db_dir: ChromaDB가 저장될 디렉토리
+            use_numpy_index: True면 Chroma 대신 인메모리 NumPy 인덱스로 검색
+                             ({db_dir}/db_high_index, db_low_index에 .npy로 저장)
+            llm: 사용할 채팅 모델 (생략 시 gpt-4o-mini ChatOpenAI, 벤치마크/테스트용 대체)
+            embeddings: 사용할 임베딩 (생략 시 OpenAIEmbeddings, 벤치마크/테스트용 대체)
         """
         self.openai_api_key = openai_api_key
         self.data_dir = Path(data_dir)
         self.db_dir = Path(db_dir)
+        self.use_numpy_index = use_numpy_index
         
         # 디렉토리 생성
         self.data_dir.mkdir(exist_ok=True)
         self.db_dir.mkdir(exist_ok=True)
         
         # LLM 및 임베딩 초기화
-        self.llm = ChatOpenAI(
+        if llm is None or embeddings is None:
+            from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+        
+        self.llm = llm if llm is not None else ChatOpenAI(
             model="gpt-4o-mini",
             temperature=0.7,
-            openai_api_key=openai_api_key
-        )
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            openai_api_key=openai_api_key
+            openai_api_key=openai_api_key,
+            max_retries=CLIENT_MAX_RETRIES
         )
+        if embeddings is None:
+            embeddings = OpenAIEmbeddings(
+                model=self.EMBEDDING_MODEL,
+                openai_api_key=openai_api_key,
+                max_retries=CLIENT_MAX_RETRIES
+            )
+        # 같은 요청이 동시에 들어오면 한 번만 호출 (세션 간 공유)
+        self.embeddings = CoalescedEmbeddings(embeddings)
+        self.ingestor = EmbeddingIngestor(self.embeddings)
         
         # Vector DB 초기화 (70점 이상/이하)
         self.db_high = None
         self.db_low = None
         
+        # LLM 없이 감정 점수를 추정하는 로컬 점수기
+        self.pre_scorer = EmotionPreScorer()
+        
+        # 장애 시 대체 응답용 최근 조언 캐시
+        self.advice_cache = AnswerCache()
+        
+        # 식물 별명별 지난 일기 기억 인덱스 (attach_memory_index로 연결)
+        self.memory_index: Optional[DiaryMemoryIndex] = None
+        
         # 프롬프트 설정
         self._setup_prompts()
     
     def _setup_prompts(self):
         """프롬프트 템플릿 설정"""
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_core.output_parsers import StrOutputParser
         
         # 감정 분석 프롬프트
         self.emotion_prompt = ChatPromptTemplate.from_template("""
@@ -93,14 +370,30 @@ JSON 형식으로만 응답해줘.
 참고할 식물 관련 위로 메시지:
 {context}
 
+사용자가 예전에 쓴 비슷한 일기:
+{past_entries}
+
 위 정보를 바탕으로, 식물의 성장 과정이나 특성을 메타포로 사용하여 
 사용자에게 따뜻하고 희망적인 조언을 2-3 문장으로 작성해줘.
 반드시 식물과 관련된 비유나 이야기를 포함할 것.
+예전 일기가 있다면 그때와 지금을 자연스럽게 이어서 말해줘.
+""")
+        
+        # 긴 일기 조각 요약 프롬프트 (토큰 예산 초과 시 map-reduce 요약)
+        self.diary_summary_prompt = ChatPromptTemplate.from_template("""
+다음은 사용자가 쓴 긴 일기의 일부야.
+감정 분석에 필요한 사건, 감정 표현, 감정의 강도가 빠지지 않도록
+원문의 말투를 살려 짧게 요약해줘. 요약문만 출력해.
+
+일기 일부:
+{diary_piece}
 """)
         
-        # 체인 생성
-        self.emotion_chain = self.emotion_prompt | self.llm | StrOutputParser()
-        self.plant_advice_chain = self.plant_advice_prompt | self.llm | StrOutputParser()
+        # 체인 생성 (동시에 들어온 같은 프롬프트는 LLM 호출 하나로 합침)
+        llm = coalesce_chat(self.llm)
+        self.emotion_chain = self.emotion_prompt | llm | StrOutputParser()
+        self.plant_advice_chain = self.plant_advice_prompt | llm | StrOutputParser()
+        self.diary_summary_chain = self.diary_summary_prompt | llm | StrOutputParser()
     
     def initialize_vector_dbs(self, pdf_high: str = None, pdf_low: str = None) -> Tuple[bool, bool]:
         """
@@ -125,7 +418,7 @@ JSON 형식으로만 응답해줘.
         # 70점 이상 DB
         success_high = False
         try:
-            self.db_high = self._load_or_create_db(
+            self.db_high = self._load_db(
                 db_path=str(db_high_path),
                 doc_path=str(pdf_high),
                 label="70점 이상"
@@ -137,7 +430,7 @@ JSON 형식으로만 응답해줘.
         # 70점 이하 DB
         success_low = False
         try:
-            self.db_low = self._load_or_create_db(
+            self.db_low = self._load_db(
                 db_path=str(db_low_path),
                 doc_path=str(pdf_low),
                 label="70점 이하"
@@ -148,54 +441,378 @@ JSON 형식으로만 응답해줘.
         
         return success_high, success_low
     
+    def _load_db(self, db_path: str, doc_path: str, label: str):
+        """설정에 따라 Chroma DB 또는 NumPy 인덱스 로드"""
+        if not self.use_numpy_index:
+            return self._load_or_create_db(db_path=db_path, doc_path=doc_path, label=label)
+        
+        # 저장된 NumPy 인덱스가 최신이면 Chroma를 열지 않고 바로 사용
+        index_dir = f"{db_path}_index"
+        if NumpyVectorIndex.exists(index_dir):
+            index = NumpyVectorIndex.load(index_dir, embedding_function=self.embeddings)
+            manifest = self._read_manifest(db_path)
+            source_changed = (
+                os.path.exists(doc_path)
+                and not self._manifest_is_current(manifest, self._file_hash(doc_path))
+            )
+            if not source_changed and index.info.get("file_hash") == (manifest or {}).get("file_hash"):
+                print(f"[정보] {label} NumPy 인덱스 로드 완료: {index_dir} ({len(index)}개 청크)")
+                return index
+            print(f"[정보] {label} 원본 변경 감지 - NumPy 인덱스 재생성")
+        
+        # 없거나 오래되었으면 Chroma를 동기화한 뒤 임베딩을 그대로 내보내서 생성 (재임베딩 없음)
+        db = self._load_or_create_db(db_path=db_path, doc_path=doc_path, label=label)
+        if db is None:
+            return None
+        manifest = self._read_manifest(db_path) or {}
+        index = NumpyVectorIndex.from_chroma(
+            db,
+            embedding_function=self.embeddings,
+            info={"file_hash": manifest.get("file_hash"), "embedding_model": self.EMBEDDING_MODEL}
+        )
+        index.save(index_dir)
+        print(f"[완료] {label} NumPy 인덱스 생성 완료: {index_dir} ({len(index)}개 청크)")
+        return index
+    
+    # ===== 매니페스트 (원본 해시 기반 증분 재구축) =====
+    
+    @staticmethod
+    def _text_hash(text: str) -> str:
+        """텍스트 내용 해시"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _file_hash(path: str) -> str:
+        """파일 내용 해시"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _read_manifest(self, db_path: str) -> Optional[Dict]:
+        """DB 디렉토리의 매니페스트 로드 (없거나 손상되면 None)"""
+        manifest_path = Path(db_path) / self.MANIFEST_FILE
+        if not manifest_path.exists():
+            return None
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[경고] 매니페스트 로드 실패, 무시합니다: {e}")
+            return None
+    
+    def _write_manifest(self, db_path: str, manifest: Dict):
+        """매니페스트 저장 (임시 파일에 쓴 뒤 교체)"""
+        manifest_path = Path(db_path) / self.MANIFEST_FILE
+        tmp_path = manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, manifest_path)
+    
+    def _manifest_is_current(self, manifest: Optional[Dict], file_hash: str) -> bool:
+        """원본 PDF, 임베딩 모델, 분할 설정이 매니페스트와 모두 같은지 확인"""
+        return bool(manifest) and (
+            manifest.get("file_hash") == file_hash
+            and manifest.get("embedding_model") == self.EMBEDDING_MODEL
+            and manifest.get("chunk_size") == self.CHUNK_SIZE
+            and manifest.get("chunk_overlap") == self.CHUNK_OVERLAP
+        )
+    
     def _load_or_create_db(
         self,
         db_path: str,
         doc_path: str,
         label: str
-    ) -> Optional[Chroma]:
-        """DB 로드 또는 생성"""
+    ) -> Optional["Chroma"]:
+        """
+        DB 로드 또는 생성
+        
+        매니페스트의 원본 해시/임베딩 모델이 현재와 같으면 바로 로드하고,
+        다르면 변경된 청크만 임베딩하여 동기화합니다.
+        """
+        from langchain_community.vectorstores import Chroma
+        
+        has_db = os.path.exists(db_path) and any(
+            name != self.MANIFEST_FILE for name in os.listdir(db_path)
+        )
         
-        # 이미 DB가 존재하면 로드
-        if os.path.exists(db_path) and os.listdir(db_path):
+        # 문서 확인
+        if not os.path.exists(doc_path):
+            if has_db:
+                # 원본이 없으면 변경 여부를 알 수 없으므로 기존 DB 사용
+                print(f"[정보] {label} DB 로드 완료: {db_path} (원본 PDF 없음)")
+                return Chroma(
+                    persist_directory=db_path,
+                    embedding_function=self.embeddings
+                )
+            print(f"[경고] PDF 파일을 찾을 수 없습니다: {doc_path}")
+            return None
+        
+        file_hash = self._file_hash(doc_path)
+        manifest = self._read_manifest(db_path) if has_db else None
+        
+        # 원본과 설정이 그대로면 바로 로드
+        if has_db and self._manifest_is_current(manifest, file_hash):
             print(f"[정보] {label} DB 로드 완료: {db_path}")
             return Chroma(
                 persist_directory=db_path,
                 embedding_function=self.embeddings
             )
         
-        # 문서 확인
-        if not os.path.exists(doc_path):
-            print(f"[경고] PDF 파일을 찾을 수 없습니다: {doc_path}")
+        try:
+            print(f"[정보] {label} DB {'동기화' if has_db else '생성'} 시작...")
+            return self._sync_db(db_path, doc_path, file_hash, manifest, label)
+        
+        except Exception as e:
+            if has_db:
+                # 동기화에 실패해도 디스크에 있는 기존 DB는 그대로 사용
+                print(f"[경고] {label} DB 동기화 실패, 기존 DB 사용: {str(e)}")
+                return Chroma(
+                    persist_directory=db_path,
+                    embedding_function=self.embeddings
+                )
+            print(f"[오류] {label} DB 생성 중 오류 발생: {str(e)}")
             return None
+    
+    def _sync_db(
+        self,
+        db_path: str,
+        doc_path: str,
+        file_hash: str,
+        manifest: Optional[Dict],
+        label: str
+    ) -> "Chroma":
+        """
+        PDF와 DB를 청크 해시 기준으로 동기화
+        - 내용이 같은 페이지는 분할 없이 기존 청크 재사용
+        - 새로 생긴 청크만 임베딩하여 추가, 사라진 청크는 삭제
+        - 매니페스트 없이 만들어진 기존 DB는 같은 내용의 임베딩을 복사해 재사용
+        """
+        from langchain_community.vectorstores import Chroma
+        from langchain_community.document_loaders import PyPDFLoader
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
         
-        try:
-            print(f"[정보] {label} DB 생성 시작...")
+        db = Chroma(persist_directory=db_path, embedding_function=self.embeddings)
+        
+        # 임베딩 모델이 바뀌면 기존 벡터는 재사용할 수 없음
+        if manifest and manifest.get("embedding_model") != self.EMBEDDING_MODEL:
+            print(f"[정보] 임베딩 모델 변경 ({manifest.get('embedding_model')} → {self.EMBEDDING_MODEL}) - 전체 재임베딩")
+            db.delete_collection()
+            db = Chroma(persist_directory=db_path, embedding_function=self.embeddings)
+            manifest = None
+        
+        existing = db.get(include=["documents"])
+        existing_ids = set(existing["ids"])
+        
+        # 분할 설정이 같을 때만 페이지 단위 재사용
+        same_split = bool(manifest) and (
+            manifest.get("chunk_size") == self.CHUNK_SIZE
+            and manifest.get("chunk_overlap") == self.CHUNK_OVERLAP
+        )
+        old_pages = {}
+        if same_split:
+            for page in manifest.get("pages", []):
+                # 청크가 DB에 모두 남아 있는 페이지만 재사용
+                if all(cid in existing_ids for cid in page["chunks"]):
+                    old_pages[page["hash"]] = page
+        
+        # 문서 로드 및 페이지별 분할
+        docs = PyPDFLoader(doc_path).load()
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.CHUNK_SIZE,
+            chunk_overlap=self.CHUNK_OVERLAP
+        )
+        
+        pages = []
+        chunks_meta = {}
+        new_chunks = {}
+        metadata_updates = {}
+        taken = set()
+        
+        for page_no, doc in enumerate(docs):
+            page_hash = self._text_hash(doc.page_content)
+            old_page = old_pages.pop(page_hash, None)
             
-            # 문서 로드
-            loader = PyPDFLoader(doc_path)
-            docs = loader.load()
+            if old_page is not None:
+                # 같은 내용의 페이지: 청크 재사용 (위치만 바뀌었으면 메타데이터만 갱신)
+                chunk_ids = old_page["chunks"]
+                if old_page["page"] != page_no:
+                    for cid in chunk_ids:
+                        metadata_updates[cid] = dict(doc.metadata)
+                for cid in chunk_ids:
+                    chunks_meta[cid] = {"page": page_no, "hash": manifest["chunks"][cid]["hash"]}
+            else:
+                chunk_ids = []
+                for chunk in splitter.split_documents([doc]):
+                    chunk_hash = self._text_hash(chunk.page_content)
+                    cid = chunk_hash[:32]
+                    suffix = 1
+                    while cid in taken or cid in new_chunks:
+                        cid = f"{chunk_hash[:32]}-{suffix}"
+                        suffix += 1
+                    new_chunks[cid] = chunk
+                    chunks_meta[cid] = {"page": page_no, "hash": chunk_hash}
+                    chunk_ids.append(cid)
             
-            # 문서 분할
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=800,
-                chunk_overlap=100
+            taken.update(chunk_ids)
+            pages.append({"page": page_no, "hash": page_hash, "chunks": chunk_ids})
+        
+        # 이미 DB에 있는 청크 ID는 임베딩 불필요
+        to_embed = {cid: chunk for cid, chunk in new_chunks.items() if cid not in existing_ids}
+        
+        # 매니페스트 이전 DB: 같은 본문의 임베딩을 새 ID로 복사
+        by_content = {}
+        for eid, text in zip(existing["ids"], existing["documents"]):
+            by_content.setdefault(text, eid)
+        to_copy = {
+            cid: by_content[chunk.page_content]
+            for cid, chunk in to_embed.items()
+            if chunk.page_content in by_content
+        }
+        if to_copy:
+            source = db.get(ids=list(set(to_copy.values())), include=["embeddings"])
+            source_embeddings = dict(zip(source["ids"], source["embeddings"]))
+            db._collection.upsert(
+                ids=list(to_copy),
+                embeddings=[source_embeddings[eid] for eid in to_copy.values()],
+                documents=[to_embed[cid].page_content for cid in to_copy],
+                metadatas=[to_embed[cid].metadata for cid in to_copy]
             )
-            chunks = splitter.split_documents(docs)
-            
-            # 임베딩 및 DB 생성
-            db = Chroma.from_documents(
-                chunks,
-                self.embeddings,
-                persist_directory=db_path
+            for cid in to_copy:
+                del to_embed[cid]
+        
+        if to_embed:
+            # 인덱스 생성은 대화형 요청보다 낮은 우선순위로 임베딩
+            with lane("background"):
+                self.ingestor.ingest(db, list(to_embed.values()), ids=list(to_embed))
+        
+        if metadata_updates:
+            db._collection.update(
+                ids=list(metadata_updates),
+                metadatas=list(metadata_updates.values())
             )
-            
-            print(f"[완료] {label} DB 생성 완료 ({len(chunks)}개 청크)")
-            return db
         
-        except Exception as e:
-            print(f"[오류] {label} DB 생성 중 오류 발생: {str(e)}")
-            return None
+        to_delete = existing_ids - taken
+        if to_delete:
+            db.delete(ids=list(to_delete))
+        
+        self._write_manifest(db_path, {
+            "source": doc_path,
+            "file_hash": file_hash,
+            "embedding_model": self.EMBEDDING_MODEL,
+            "chunk_size": self.CHUNK_SIZE,
+            "chunk_overlap": self.CHUNK_OVERLAP,
+            "pages": pages,
+            "chunks": chunks_meta
+        })
+        
+        print(
+            f"[완료] {label} DB 동기화 완료 ({len(taken)}개 청크 - "
+            f"임베딩 {len(to_embed)}개, 재사용 {len(taken) - len(to_embed)}개, 삭제 {len(to_delete)}개)"
+        )
+        return db
+    
+    @staticmethod
+    def _parse_emotion_response(response: str) -> Dict[str, any]:
+        """감정 분석 LLM 응답(JSON)을 결과 딕셔너리로 변환"""
+        emotion_data = json.loads(response)
+        emotion_score = emotion_data["emotion"]
+        
+        # 감정 라벨 및 색상 결정
+        emotion_label, emotion_color = emotion_label_for(emotion_score)
+        
+        return {
+            "summary": emotion_data["summary"],
+            "cheer": emotion_data["cheer"],
+            "emotion": emotion_score,
+            "emotion_label": emotion_label,
+            "emotion_color": emotion_color
+        }
+    
+    @staticmethod
+    def _build_emotion_summary(emotion_result: Dict[str, any]) -> str:
+        """식물 조언 프롬프트에 들어갈 감정 요약 문자열 생성"""
+        return (
+            f"요약: {emotion_result['summary']}\n"
+            f"감정 점수: {emotion_result['emotion']}점 ({emotion_result['emotion_label']})"
+        )
+    
+    def _select_db(self, emotion_score: int) -> Tuple[Optional["Chroma"], str]:
+        """감정 점수에 따라 검색할 DB와 라벨 선택"""
+        if emotion_score >= 70:
+            return self.db_high, "긍정 메시지"
+        return self.db_low, "위로 메시지"
+    
+    def _summarize_diary_pieces(self, pieces: List[str]) -> List[str]:
+        """일기 조각들을 한 번의 batch 요청으로 요약 (map 단계)"""
+        return self.diary_summary_chain.batch([{"diary_piece": piece} for piece in pieces])
+    
+    def _fit_diary(self, diary_text: str) -> str:
+        """일기가 토큰 예산을 넘으면 map-reduce 요약본으로 대체"""
+        return summarize_to_budget(
+            diary_text,
+            PROMPT_BUDGETS["mind_coach.diary"],
+            self._summarize_diary_pieces,
+            name="mind_coach.diary"
+        )
+    
+    def _retrieve_context(
+        self,
+        selected_db,
+        query: str,
+        top_k: int,
+        fetch_k: Optional[int] = None,
+        query_vector=None
+    ) -> str:
+        """
+        조언용 컨텍스트 검색 및 압축
+        
+        후보를 top_k보다 넉넉히 가져와 MMR로 고른 뒤, 분할 overlap으로 겹치는 청크를
+        병합하고 반복 문장을 제거한 다음 토큰 예산에 맞춥니다.
+        """
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+        documents, vectors = fetch_candidates(selected_db, query_vector, fetch_k or top_k * 4)
+        chunks, _ = compress_documents(documents, vectors, query_vector, top_k, name="mind_coach.advice")
+        return fit_context(
+            chunks,
+            PROMPT_BUDGETS["mind_coach.advice_context"],
+            name="mind_coach.advice_context"
+        )
+    
+    def attach_memory_index(self, memory_index: Optional[DiaryMemoryIndex]):
+        """조언 생성 시 비슷한 지난 일기를 찾을 기억 인덱스 연결"""
+        self.memory_index = memory_index
+    
+    def _recall_past(self, plant_name: Optional[str], query_vector) -> str:
+        """
+        식물 별명의 지난 일기 중 지금 감정과 비슷한 것을 프롬프트용 텍스트로 반환
+        
+        조언 검색에 쓴 질의 벡터를 그대로 사용하므로 추가 임베딩 호출이 없습니다.
+        """
+        if self.memory_index is None or not plant_name:
+            return "없음"
+        with span("mind_coach.memory_recall"):
+            hits = self.memory_index.search(plant_name, query_vector, k=self.MEMORY_TOP_K)
+        lines = [
+            f"- {hit['date'][:10]}: {hit['summary']}"
+            + (f" (감정 점수 {hit['emotion']}점)" if hit["emotion"] is not None else "")
+            for hit in hits
+        ]
+        if not lines:
+            return "없음"
+        return fit_context(
+            lines,
+            PROMPT_BUDGETS["mind_coach.past_entries"],
+            name="mind_coach.past_entries"
+        )
+    
+    def _request_emotion(self, diary_text: str) -> str:
+        """감정 분석 LLM 호출 (파싱 전 응답 원문 반환)"""
+        with span("mind_coach.emotion"):
+            user_input = self._fit_diary(diary_text)
+            return self.emotion_chain.invoke({"user_input": user_input})
     
     def analyze_emotion(self, diary_text: str) -> Dict[str, any]:
         """
@@ -215,30 +832,10 @@ JSON 형식으로만 응답해줘.
         """
         try:
             # LLM을 통한 감정 분석
-            response = self.emotion_chain.invoke({"user_input": diary_text})
+            response = self._request_emotion(diary_text)
             
             # JSON 파싱
-            emotion_data = json.loads(response)
-            emotion_score = emotion_data["emotion"]
-            
-            # 감정 라벨 및 색상 결정
-            if emotion_score >= 70:
-                emotion_label = "긍정적"
-                emotion_color = ""
-            elif emotion_score >= 40:
-                emotion_label = "중립적"
-                emotion_color = ""
-            else:
-                emotion_label = "부정적"
-                emotion_color = ""
-            
-            return {
-                "summary": emotion_data["summary"],
-                "cheer": emotion_data["cheer"],
-                "emotion": emotion_score,
-                "emotion_label": emotion_label,
-                "emotion_color": emotion_color
-            }
+            return self._parse_emotion_response(response)
         
         except json.JSONDecodeError as e:
             print(f"[오류] JSON 파싱 실패: {e}")
@@ -248,60 +845,125 @@ JSON 형식으로만 응답해줘.
             print(f"[오류] 감정 분석 중 오류 발생: {e}")
             raise
     
+    def train_pre_scorer(self, storage) -> Dict[str, float]:
+        """저장된 일지의 감정점수로 로컬 감정 점수기 학습 (홀드아웃 일치도 반환)"""
+        return self.pre_scorer.fit_from_storage(storage)
+    
+    def analyze_emotion_local(self, diary_text: str) -> Dict[str, any]:
+        """
+        LLM 호출 없이 로컬 점수기로 잠정 감정 분석 (라우팅/오프라인용)
+        
+        Returns:
+            analyze_emotion()과 같은 형식 (요약은 첫 문장, 응원은 기본 메시지)
+        """
+        emotion_score = self.pre_scorer.predict(diary_text)
+        emotion_label, emotion_color = emotion_label_for(emotion_score)
+        
+        first_sentence = re.split(r'(?<=[.!?])\s+', diary_text.strip())[0] if diary_text.strip() else ""
+        summary = first_sentence if len(first_sentence) <= 60 else first_sentence[:60] + "..."
+        
+        return {
+            "summary": summary,
+            "cheer": DEFAULT_CHEER,
+            "emotion": emotion_score,
+            "emotion_label": emotion_label,
+            "emotion_color": emotion_color
+        }
+    
+    @staticmethod
+    def _context_fallback(context: Optional[str], max_chars: int = 200) -> Optional[str]:
+        """LLM 없이 검색된 위로 메시지 앞부분을 문장 단위로 잘라 조언으로 사용"""
+        if not context:
+            return None
+        advice = ""
+        for sentence in re.split(r'(?<=[.!?])\s+', " ".join(context.split())):
+            if advice and len(advice) + len(sentence) > max_chars:
+                break
+            advice = f"{advice} {sentence}".strip()
+        return advice or None
+    
     def get_plant_advice(
         self,
         emotion_summary: str,
         emotion_score: int,
-        top_k: int = 2
+        top_k: int = 2,
+        degraded: Optional[List[str]] = None,
+        plant_name: Optional[str] = None
     ) -> Tuple[Optional[str], str]:
         """
         감정 점수에 따른 식물 메타포 조언 생성
         
+        검색/LLM 호출이 마감 시간을 넘기거나 실패하면(또는 회로가 열려 있으면)
+        캐시된 조언 → 검색된 원문 → None(기본 메시지) 순서로 대체합니다.
+        
         Args:
             emotion_summary: 감정 요약 정보
             emotion_score: 감정 점수 (0-100)
             top_k: 검색할 문서 수
+            degraded: 대체 응답을 사용한 단계 이름을 추가할 목록
+            plant_name: 주어지면 이 식물 별명의 비슷한 지난 일기도 함께 참고
         
         Returns:
             (조언 텍스트, DB 라벨)
         """
         # 감정 점수에 따라 적절한 DB 선택
-        if emotion_score >= 70:
-            selected_db = self.db_high
-            db_label = "긍정 메시지"
-        else:
-            selected_db = self.db_low
-            db_label = "위로 메시지"
+        selected_db, db_label = self._select_db(emotion_score)
         
         # DB가 없는 경우 기본 메시지 반환
         if selected_db is None:
             return None, db_label
         
-        try:
-            # RAG 검색
-            retriever = selected_db.as_retriever(search_kwargs={"k": top_k})
-            #relevant_docs = retriever.get_relevant_documents(emotion_summary)
-            relevant_docs = retriever.invoke(emotion_summary)
-            context = "\n".join([doc.page_content for doc in relevant_docs])
-            
-            # 조언 생성
+        cache_key = (db_label, emotion_summary)
+        
+        def fallback(stage: str, context: Optional[str] = None):
+            if degraded is not None:
+                degraded.append(stage)
+            return self.advice_cache.get(cache_key) or self._context_fallback(context)
+        
+        def retrieve():
+            # 질의 임베딩 한 번으로 위로 메시지와 지난 일기를 함께 검색
+            query_vector = self.embeddings.embed_query(emotion_summary)
+            context = self._retrieve_context(selected_db, emotion_summary, top_k, query_vector=query_vector)
+            return context, self._recall_past(plant_name, query_vector)
+        
+        # RAG 검색 및 컨텍스트 압축 (Chroma/NumPy 인덱스 공통)
+        with span("mind_coach.retrieval"):
+            context, past_entries = guarded_call(
+                "mind_coach.vector_store",
+                retrieve,
+                self.RETRIEVAL_TIMEOUT,
+                lambda e: (None, None)
+            )
+        if context is None:
+            return fallback("retrieval"), db_label
+        
+        def generate():
             advice = self.plant_advice_chain.invoke({
                 "emotion_summary": emotion_summary,
-                "context": context
+                "context": context,
+                "past_entries": past_entries
             })
-            
-            return advice, db_label
+            self.advice_cache.put(cache_key, advice)
+            return advice
         
-        except Exception as e:
-            print(f"[오류] 식물 조언 생성 중 오류 발생: {e}")
-            return None, db_label
+        # 조언 생성
+        with span("mind_coach.advice"):
+            advice = guarded_call(
+                "openai.chat",
+                generate,
+                self.ADVICE_TIMEOUT,
+                lambda e: fallback("plant_advice", context)
+            )
+        
+        return advice, db_label
     
-    def get_full_response(self, diary_text: str) -> Dict[str, any]:
+    def get_full_response(self, diary_text: str, plant_name: Optional[str] = None) -> Dict[str, any]:
         """
         일기 분석 및 전체 응답 생성
         
         Args:
             diary_text: 사용자가 작성한 일기
+            plant_name: 식물 별명 (주어지면 비슷한 지난 일기를 조언에 반영)
         
         Returns:
             {
@@ -310,33 +972,409 @@ JSON 형식으로만 응답해줘.
                 "emotion": int,
                 "emotion_label": str,
                 "emotion_color": str,
+                "emotion_prescore": int,
                 "plant_advice": str,
-                "db_label": str
+                "db_label": str,
+                "degraded": List[str]  # 대체 응답을 사용한 단계 (정상이면 빈 목록)
             }
         """
-        # 1. 감정 분석
-        emotion_result = self.analyze_emotion(diary_text)
+        degraded: List[str] = []
         
-        # 2. 식물 조언 생성
-        emotion_summary = (
-            f"요약: {emotion_result['summary']}\n"
-            f"감정 점수: {emotion_result['emotion']}점 ({emotion_result['emotion_label']})"
-        )
+        def emotion_fallback(error: Optional[Exception]) -> Dict[str, any]:
+            # LLM이 느리거나 실패하면 로컬 점수기 결과로 바로 응답
+            degraded.append("emotion")
+            return self.analyze_emotion_local(diary_text)
         
-        plant_advice, db_label = self.get_plant_advice(
-            emotion_summary=emotion_summary,
-            emotion_score=emotion_result["emotion"]
-        )
+        with span("mind_coach.full_response"):
+            # 0. 로컬 잠정 점수 (LLM 점수와의 일치도 누적용)
+            prescore = self.pre_scorer.predict(diary_text)
+            
+            # 1. 감정 분석 (브레이커는 LLM 호출만 감싸고, 응답 파싱 실패는 호출 실패로 세지 않음)
+            response = guarded_call(
+                "openai.chat",
+                lambda: self._request_emotion(diary_text),
+                self.EMOTION_TIMEOUT,
+                lambda e: None
+            )
+            if response is None:
+                emotion_result = emotion_fallback(None)
+            else:
+                try:
+                    emotion_result = self._parse_emotion_response(response)
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"[경고] 감정 분석 응답 파싱 실패, 대체 응답 사용: {type(e).__name__}: {e}")
+                    emotion_result = emotion_fallback(e)
+            if "emotion" not in degraded:
+                self.pre_scorer.record(prescore, emotion_result["emotion"])
+            
+            # 2. 식물 조언 생성
+            emotion_summary = self._build_emotion_summary(emotion_result)
+            
+            plant_advice, db_label = self.get_plant_advice(
+                emotion_summary=emotion_summary,
+                emotion_score=emotion_result["emotion"],
+                degraded=degraded,
+                plant_name=plant_name
+            )
         
         # 기본 메시지 설정
         if plant_advice is None:
-            plant_advice = "오늘도 당신의 마음에 귀 기울여주셔서 감사합니다. 식물처럼 천천히, 자신만의 속도로 성장하고 계신 거예요. 🌱"
+            plant_advice = DEFAULT_PLANT_ADVICE
         
         return {
             **emotion_result,
+            "emotion_prescore": prescore,
             "plant_advice": plant_advice,
-            "db_label": db_label
+            "db_label": db_label,
+            "degraded": degraded
         }
+    
+    # ===== 배치 재분석 (일지 백필용) =====
+    
+    def _analysis_fingerprint(self, top_k: int) -> str:
+        """
+        분석 결과를 좌우하는 설정(프롬프트, 채팅/임베딩 모델, 검색 문서 수) 해시
+        
+        프롬프트나 모델을 바꾸면 값이 달라져 예전 체크포인트 결과를 재사용하지 않습니다.
+        """
+        prompts = [
+            [message.prompt.template for message in prompt.messages]
+            for prompt in (self.emotion_prompt, self.plant_advice_prompt, self.diary_summary_prompt)
+        ]
+        llm_params = getattr(self.llm, "_identifying_params", None) or {"type": type(self.llm).__name__}
+        payload = json.dumps(
+            {"prompts": prompts, "llm": llm_params, "embedding": self.EMBEDDING_MODEL, "top_k": top_k},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+    
+    @staticmethod
+    def _text_key(text: str, fingerprint: str = "") -> str:
+        """체크포인트에서 항목을 식별하기 위한 키 (분석 설정 해시 + 일기 텍스트 해시)"""
+        return hashlib.sha1(f"{fingerprint}\n{text}".encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _load_checkpoint(checkpoint_path: Path) -> Dict[str, Dict]:
+        """체크포인트 파일(JSONL)에서 성공한 항목 로드 (텍스트 해시 → 결과)"""
+        completed = {}
+        if not checkpoint_path.exists():
+            return completed
+        
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 중단 시 마지막 줄이 잘린 경우 무시
+                    continue
+                if record.get("error") is None and record.get("result") is not None:
+                    completed[record["key"]] = record["result"]
+        return completed
+    
+    async def _abatch_with_retry(
+        self,
+        runnable,
+        inputs: List,
+        parse,
+        max_concurrency: int,
+        max_retries: int,
+        retry_delay: float
+    ) -> List[Tuple[Optional[any], Optional[str]]]:
+        """
+        runnable.abatch를 실행하고 실패한 항목만 지수 백오프로 재시도
+        
+        Returns:
+            입력 순서대로 (결과, 오류 메시지) 목록
+        """
+        outcomes = [(None, "not started")] * len(inputs)
+        pending = list(range(len(inputs)))
+        
+        for attempt in range(max_retries + 1):
+            if attempt > 0:
+                await asyncio.sleep(retry_delay * (2 ** (attempt - 1)))
+            
+            responses = await runnable.abatch(
+                [inputs[i] for i in pending],
+                config={"max_concurrency": max_concurrency},
+                return_exceptions=True
+            )
+            
+            still_failed = []
+            for i, response in zip(pending, responses):
+                try:
+                    if isinstance(response, Exception):
+                        raise response
+                    outcomes[i] = (parse(response), None)
+                except Exception as e:
+                    outcomes[i] = (None, f"{type(e).__name__}: {e}")
+                    still_failed.append(i)
+            
+            pending = still_failed
+            if not pending:
+                break
+        
+        return outcomes
+    
+    async def _aanalyze_chunk(
+        self,
+        texts: List[str],
+        top_k: int,
+        max_concurrency: int,
+        max_retries: int,
+        retry_delay: float
+    ) -> List[Tuple[Optional[Dict], Optional[str]]]:
+        """일기 묶음 하나를 감정 분석 → 검색 → 조언 순서로 배치 처리"""
+        from langchain_core.runnables import RunnableLambda
+        
+        # 1. 감정 분석 (예산을 넘는 일기만 요약 후 사용 - 요약 실패도 항목별 오류로 기록)
+        fit_then_analyze = (
+            RunnableLambda(lambda text: {"user_input": self._fit_diary(text)})
+            | self.emotion_chain
+        )
+        emotion_outcomes = await self._abatch_with_retry(
+            fit_then_analyze,
+            texts,
+            self._parse_emotion_response,
+            max_concurrency, max_retries, retry_delay
+        )
+        
+        results = [(None, error) for _, error in emotion_outcomes]
+        
+        # 2. DB별로 묶어서 검색 및 조언 생성
+        groups: Dict[str, List[int]] = {}
+        for i, (emotion_result, error) in enumerate(emotion_outcomes):
+            if error is None:
+                _, db_label = self._select_db(emotion_result["emotion"])
+                groups.setdefault(db_label, []).append(i)
+        
+        for db_label, indices in groups.items():
+            selected_db, _ = self._select_db(emotion_outcomes[indices[0]][0]["emotion"])
+            summaries = [self._build_emotion_summary(emotion_outcomes[i][0]) for i in indices]
+            advices = [None] * len(indices)
+            
+            if selected_db is not None:
+                retriever = RunnableLambda(
+                    lambda query, db=selected_db: self._retrieve_context(db, query, top_k)
+                )
+                doc_outcomes = await self._abatch_with_retry(
+                    retriever, summaries,
+                    lambda context: context,
+                    max_concurrency, max_retries, retry_delay
+                )
+                
+                # 검색에 성공한 항목만 조언 생성
+                ok = [j for j, (_, error) in enumerate(doc_outcomes) if error is None]
+                advice_outcomes = await self._abatch_with_retry(
+                    self.plant_advice_chain,
+                    [
+                        {"emotion_summary": summaries[j], "context": doc_outcomes[j][0], "past_entries": "없음"}
+                        for j in ok
+                    ],
+                    lambda advice: advice,
+                    max_concurrency, max_retries, retry_delay
+                )
+                for j, (advice, error) in zip(ok, advice_outcomes):
+                    if error is None:
+                        advices[j] = advice
+                    else:
+                        print(f"[오류] 식물 조언 생성 중 오류 발생: {error}")
+            
+            # get_full_response와 동일하게 조언 실패 시 기본 메시지 사용
+            for j, i in enumerate(indices):
+                results[i] = ({
+                    **emotion_outcomes[i][0],
+                    "plant_advice": advices[j] if advices[j] is not None else DEFAULT_PLANT_ADVICE,
+                    "db_label": db_label
+                }, None)
+        
+        return results
+    
+    async def aanalyze_batch(
+        self,
+        texts: List[str],
+        max_concurrency: int = 4,
+        max_retries: int = 2,
+        retry_delay: float = 1.0,
+        checkpoint_path: Optional[str] = None,
+        chunk_size: int = 50,
+        top_k: int = 2
+    ) -> List[Dict[str, any]]:
+        """analyze_batch의 비동기 버전"""
+        checkpoint = Path(checkpoint_path) if checkpoint_path else None
+        completed = self._load_checkpoint(checkpoint) if checkpoint else {}
+        
+        fingerprint = self._analysis_fingerprint(top_k)
+        keys = [self._text_key(text, fingerprint) for text in texts]
+        items = [
+            {"index": i, "result": completed.get(key), "error": None}
+            for i, key in enumerate(keys)
+        ]
+        todo = [i for i, item in enumerate(items) if item["result"] is None]
+        
+        print(f"[정보] 일괄 분석 시작: 전체 {len(texts)}개 (재개 {len(texts) - len(todo)}개, 처리 대상 {len(todo)}개)")
+        
+        for start in range(0, len(todo), chunk_size):
+            chunk = todo[start:start + chunk_size]
+            outcomes = await self._aanalyze_chunk(
+                [texts[i] for i in chunk],
+                top_k, max_concurrency, max_retries, retry_delay
+            )
+            
+            for i, (result, error) in zip(chunk, outcomes):
+                items[i]["result"] = result
+                items[i]["error"] = error
+            
+            # 묶음 단위로 체크포인트 기록 (중단 후 재개 가능)
+            if checkpoint:
+                checkpoint.parent.mkdir(parents=True, exist_ok=True)
+                with open(checkpoint, "a", encoding="utf-8") as f:
+                    for i, (result, error) in zip(chunk, outcomes):
+                        record = {"key": keys[i], "result": result, "error": error}
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            
+            print(f"[진행] {min(start + chunk_size, len(todo))}/{len(todo)} 처리 완료")
+        
+        failed = sum(1 for item in items if item["error"] is not None)
+        print(f"[완료] 일괄 분석 완료: 성공 {len(items) - failed}개, 실패 {failed}개")
+        return items
+    
+    def analyze_batch(
+        self,
+        texts: List[str],
+        max_concurrency: int = 4,
+        max_retries: int = 2,
+        retry_delay: float = 1.0,
+        checkpoint_path: Optional[str] = None,
+        chunk_size: int = 50,
+        top_k: int = 2
+    ) -> List[Dict[str, any]]:
+        """
+        여러 일기를 한 번에 재분석 (프롬프트/모델 변경 후 백필용)
+        
+        체인의 abatch를 사용해 동시 요청 수를 제한하고, 실패한 항목만 재시도합니다.
+        checkpoint_path를 지정하면 묶음(chunk_size)마다 결과를 기록하고,
+        같은 경로로 다시 실행하면 이미 성공한 일기는 건너뜁니다.
+        체크포인트 키에 프롬프트/모델 설정 해시가 들어가므로, 설정을 바꾼 뒤에는 모두 다시 분석합니다.
+        
+        Args:
+            texts: 분석할 일기 목록
+            max_concurrency: 동시에 실행할 최대 LLM 요청 수
+            max_retries: 항목별 최대 재시도 횟수
+            retry_delay: 첫 재시도 대기 시간(초), 재시도마다 2배씩 증가
+            checkpoint_path: 체크포인트 JSONL 파일 경로 (선택)
+            chunk_size: 체크포인트 기록 단위
+            top_k: 검색할 문서 수
+        
+        Returns:
+            입력 순서대로 [{"index": int, "result": get_full_response 결과 또는 None, "error": str 또는 None}]
+        """
+        return asyncio.run(self.aanalyze_batch(
+            texts,
+            max_concurrency=max_concurrency,
+            max_retries=max_retries,
+            retry_delay=retry_delay,
+            checkpoint_path=checkpoint_path,
+            chunk_size=chunk_size,
+            top_k=top_k
+        ))
+
+
+class MindCoachWarmup:
+    """
+    MindCoachRAG 백그라운드 워밍업 (프로세스 전역)
+    - 서버 첫 실행 시 LLM/임베딩 클라이언트와 Vector DB를 별도 스레드에서 준비
+    - 페이지는 준비 상태만 확인하고, 요청 처리 시에만 완료를 기다림
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self.status = "idle"  # idle / warming / ready / error
+        self.error = None
+        self.mind_coach = None
+        self.memory_index = None
+        self.success_high = False
+        self.success_low = False
+    
+    def start(self, openai_api_key: str, storage=None, **kwargs) -> bool:
+        """
+        워밍업 시작 (이미 시작했으면 무시)
+        
+        Args:
+            openai_api_key: OpenAI API 키
+            storage: 주어지면 저장된 일지로 로컬 감정 점수기 학습 및 지난 일기 기억 인덱스 준비
+            **kwargs: MindCoachRAG 생성 인자
+        
+        Returns:
+            이번 호출로 새로 시작했는지 여부
+        """
+        with self._lock:
+            if self.status in ("warming", "ready"):
+                return False
+            self.status = "warming"
+            self.error = None
+            self._ready.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(openai_api_key, storage, kwargs),
+                name="mind-coach-warmup",
+                daemon=True
+            )
+            self._thread.start()
+            return True
+    
+    def _run(self, openai_api_key: str, storage, kwargs: Dict):
+        """워밍업 스레드 본체"""
+        try:
+            with span("mind_coach.warmup"):
+                mind_coach = MindCoachRAG(openai_api_key=openai_api_key, **kwargs)
+                success_high, success_low = mind_coach.initialize_vector_dbs()
+                if storage is not None:
+                    mind_coach.train_pre_scorer(storage)
+                    self.memory_index = self._prepare_memory(mind_coach, storage)
+            
+            self.mind_coach = mind_coach
+            self.success_high = success_high
+            self.success_low = success_low
+            self.status = "ready"
+            print(f"[완료] Mind Coach 워밍업 완료 - 70점 이상: {success_high}, 70점 이하: {success_low}")
+        except Exception as e:
+            self.error = e
+            self.status = "error"
+            print(f"[오류] Mind Coach 워밍업 실패: {e}")
+        finally:
+            self._ready.set()
+    
+    @staticmethod
+    def _prepare_memory(mind_coach: MindCoachRAG, storage) -> Optional[DiaryMemoryIndex]:
+        """저장된 인덱스를 불러와 빠진 일기만 임베딩한 뒤 저장소/조언에 연결 (실패해도 워밍업은 계속)"""
+        try:
+            memory_index = DiaryMemoryIndex(mind_coach.embeddings, storage.data_dir / "memory")
+            with lane("background"):
+                memory_index.catch_up(storage)
+        except Exception as e:
+            print(f"[경고] 일기 기억 인덱스 준비 실패: {e}")
+            return None
+        storage.attach_memory_index(memory_index)
+        mind_coach.attach_memory_index(memory_index)
+        return memory_index
+    
+    @property
+    def is_ready(self) -> bool:
+        return self.status == "ready"
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """워밍업 완료까지 대기 (성공 여부 반환)"""
+        self._ready.wait(timeout)
+        return self.is_ready
+
+
+# 프로세스 전역 워밍업 (Streamlit 재실행 간에도 유지)
+WARMUP = MindCoachWarmup()
 
 
 def main_example():
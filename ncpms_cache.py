@@ -0,0 +1,141 @@
+"""
+NCPMS API 응답 디스크 캐시
+- 서비스 코드(SVC01/SVC05)와 요청 파라미터로 키 생성 (API 키는 제외)
+- gzip으로 압축한 JSON 파일로 저장 ({cache_dir}/{서비스 코드}/{키}.json.gz)
+- TTL이 지난 항목은 다시 요청하되, 요청이 실패하면 만료된 응답으로 대체
+- 오프라인(cache-only) 모드에서는 네트워크 요청 없이 캐시만 사용
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from metrics import inc
+
+
+# 키에서 제외하는 파라미터 (환경마다 다른 인증 정보)
+SECRET_PARAMS = {"apiKey"}
+
+# 기본 TTL (병해충 기준 정보는 거의 바뀌지 않음)
+DEFAULT_TTL = 30 * 24 * 3600
+
+
+class OfflineCacheMiss(LookupError):
+    """오프라인 모드에서 캐시에 없는 요청"""
+
+
+class NcpmsResponseCache:
+    """NCPMS JSON 응답 캐시 (파일 단위 원자적 쓰기, 스레드/프로세스 간 공유 가능)"""
+
+    def __init__(
+        self,
+        cache_dir: str = "./ncpms_cache",
+        ttl: Optional[float] = DEFAULT_TTL,
+        offline: Optional[bool] = None
+    ):
+        """
+        Args:
+            cache_dir: 캐시 디렉토리
+            ttl: 응답 유효 시간(초), None이면 만료 없음
+            offline: True면 네트워크 요청 없이 캐시만 사용
+                     (생략 시 MYGREEN_NCPMS_OFFLINE=1 환경변수로 결정)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        if offline is None:
+            offline = os.environ.get("MYGREEN_NCPMS_OFFLINE", "").lower() in ("1", "true", "yes")
+        self.offline = offline
+
+    @staticmethod
+    def key(params: Dict[str, Any]) -> str:
+        """API 키를 뺀 파라미터로 만든 캐시 키"""
+        public = {name: str(value) for name, value in params.items() if name not in SECRET_PARAMS}
+        payload = json.dumps(public, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def _path(self, params: Dict[str, Any]) -> Path:
+        service = str(params.get("serviceCode", "misc"))
+        return self.cache_dir / service / f"{self.key(params)}.json.gz"
+
+    def get(self, params: Dict[str, Any], allow_stale: bool = False) -> Optional[Any]:
+        """
+        캐시된 응답 조회
+
+        Args:
+            params: 요청 파라미터
+            allow_stale: True면 TTL이 지난 응답도 반환 (요청 실패 시 대체용)
+
+        Returns:
+            응답 JSON (없거나 만료되었으면 None)
+        """
+        path = self._path(params)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[경고] NCPMS 캐시 손상, 무시: {path.name} ({e})")
+            return None
+
+        expired = self.ttl is not None and time.time() - entry["fetched_at"] > self.ttl
+        if expired and not allow_stale and not self.offline:
+            return None
+        return entry["response"]
+
+    def put(self, params: Dict[str, Any], response: Any):
+        """응답 저장 (임시 파일에 쓴 뒤 교체해 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록 함)"""
+        path = self._path(params)
+        path.parent.mkdir(exist_ok=True)
+        entry = {
+            "fetched_at": time.time(),
+            "params": {name: value for name, value in params.items() if name not in SECRET_PARAMS},
+            "response": response,
+        }
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{time.monotonic_ns()}.tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def fetch(self, params: Dict[str, Any], request, refresh: bool = False) -> Any:
+        """
+        캐시 우선으로 응답 조회 (없거나 만료되었으면 request()로 받아 저장)
+
+        Args:
+            params: 요청 파라미터
+            request: 실제 요청 함수 (응답 JSON 반환, 실패 시 예외)
+            refresh: True면 유효한 캐시가 있어도 다시 요청 (인덱스 동기화처럼 최신 응답이 필요할 때,
+                     요청이 실패하면 캐시 응답으로 대체, 오프라인 모드에서는 무시)
+
+        Raises:
+            OfflineCacheMiss: 오프라인 모드에서 캐시에 없음
+        """
+        service = params.get("serviceCode", "misc")
+        cached = None if refresh and not self.offline else self.get(params)
+        if cached is not None:
+            inc(f"ncpms_cache.{service}.hits")
+            return cached
+        if self.offline:
+            inc(f"ncpms_cache.{service}.offline_misses")
+            raise OfflineCacheMiss(f"오프라인 모드: 캐시에 없는 {service} 요청 ({self.key(params)})")
+
+        inc(f"ncpms_cache.{service}.refreshes" if refresh else f"ncpms_cache.{service}.misses")
+        try:
+            response = request()
+        except Exception:
+            stale = self.get(params, allow_stale=True)
+            if stale is None:
+                raise
+            inc(f"ncpms_cache.{service}.stale_served")
+            print(f"[경고] NCPMS {service} 요청 실패, 만료된 캐시 응답 사용")
+            return stale
+
+        # 오류 응답(서비스 본문 없음)은 저장하지 않음
+        if isinstance(response, dict) and "service" in response:
+            self.put(params, response)
+        return response
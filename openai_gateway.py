@@ -0,0 +1,263 @@
+"""
+OpenAI 호출 게이트웨이
+- 같은 요청(모델, 메시지, 파라미터)이 동시에 진행 중이면 먼저 시작한 호출 결과를 함께 사용 (single-flight)
+- 모든 호출은 rate_limiter.GOVERNOR의 RPM/TPM/동시성 한도와 우선순위 차선을 거침
+- ChatOpenAI(Runnable), 임베딩, chat.completions, TTS, Whisper 호출용 래퍼 제공
+- 합쳐진 요청 수는 metrics 카운터(single_flight.<이름>.*)로 기록
+"""
+
+import json
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics import inc
+from rate_limiter import GOVERNOR, family_for
+from token_budget import count_tokens
+
+
+# 클라이언트 자체 재시도 횟수 - 0으로 두고 모든 재시도를 게이트웨이가 담당
+# (클라이언트 재시도는 속도 제한 버킷을 거치지 않아 429 급증을 키움)
+CLIENT_MAX_RETRIES = 0
+
+# 429/일시적 오류(5xx, 408/409, 연결 오류, 타임아웃) 시 게이트웨이 시도 횟수 (첫 시도 포함)
+RATE_LIMIT_ATTEMPTS = 3
+
+# 일시적 오류 첫 재시도 대기 시간(초, 이후 지수 증가 + 지터)
+TRANSIENT_RETRY_DELAY = 0.5
+
+# 재시도하는 일시적 오류 (openai 클라이언트 기본 재시도 대상과 같음)
+TRANSIENT_STATUS = {408, 409, 500, 502, 503, 504}
+TRANSIENT_ERRORS = {"APIConnectionError", "APITimeoutError", "InternalServerError"}
+
+# 출력 토큰 수를 알 수 없을 때 TPM 계산에 쓰는 예상치
+DEFAULT_COMPLETION_TOKENS = 512
+
+
+def fingerprint(*parts: Any) -> str:
+    """요청 구성 요소로 만든 고정 길이 키"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """키별로 진행 중인 호출을 하나로 합치는 실행기 (스레드 안전)"""
+
+    def __init__(self):
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any], name: str = "default") -> Any:
+        """
+        같은 key의 호출이 진행 중이면 그 결과를 기다리고, 아니면 fn을 직접 실행
+
+        결과는 진행 중인 동안에만 공유하며 캐시하지 않습니다.
+        예외도 기다리던 호출 모두에게 그대로 전달됩니다.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            inc(f"single_flight.{name}.coalesced")
+            return future.result()
+
+        inc(f"single_flight.{name}.calls")
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def inflight(self) -> int:
+        """현재 진행 중인 고유 요청 수"""
+        with self._lock:
+            return len(self._inflight)
+
+
+# 프로세스 전역 (Streamlit 세션 간 공유)
+FLIGHT = SingleFlight()
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def _is_transient(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    return status in TRANSIENT_STATUS or (status is None and type(error).__name__ in TRANSIENT_ERRORS)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """429 응답 헤더의 재시도 대기 시간(초)"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def governed_call(family: str, tokens: int, fn: Callable[[], Any]) -> Any:
+    """
+    속도 제한을 지키며 호출 (클라이언트 재시도를 끄므로 모든 재시도를 여기서 처리)
+
+    429면 계열 전체를 쉬게 한 뒤, 일시적 오류면 지수 백오프 후 다시 줄을 서서 재시도합니다.
+    재시도도 매번 한도를 거치므로 호출 하나가 보내는 요청은 최대 RATE_LIMIT_ATTEMPTS개입니다.
+
+    Args:
+        family: 모델 계열 (chat, embeddings, tts, whisper)
+        tokens: 예상 토큰 수 (TPM 계산용)
+        fn: 실제 호출
+    """
+    for attempt in range(RATE_LIMIT_ATTEMPTS):
+        with GOVERNOR.acquire(family, tokens):
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == RATE_LIMIT_ATTEMPTS - 1:
+                    raise
+                if _is_rate_limited(e):
+                    GOVERNOR.report_rate_limited(family, _retry_after(e))
+                    continue
+                if not _is_transient(e):
+                    raise
+                reason = f"{type(e).__name__}: {e}"
+
+        # 대기하는 동안 동시성 슬롯을 잡고 있지 않도록 슬롯 밖에서 대기
+        inc(f"openai_gateway.{family}.transient_retries")
+        delay = TRANSIENT_RETRY_DELAY * (2 ** attempt) * (0.5 + random.random())
+        print(f"[경고] OpenAI {family} 호출 실패, {delay:.1f}초 후 재시도: {reason}")
+        time.sleep(delay)
+
+
+def _messages_tokens(messages) -> int:
+    total = 0
+    for message in messages:
+        content = message.get("content", "") if isinstance(message, dict) else getattr(message, "content", message)
+        total += count_tokens(content if isinstance(content, str) else str(content))
+    return total
+
+
+def _model_params(model) -> Dict[str, Any]:
+    """요청 키에 넣을 모델 설정 (모델명, temperature 등)"""
+    params = getattr(model, "_identifying_params", None)
+    if params is None:
+        params = {"model": getattr(model, "model_name", None) or getattr(model, "model", None)}
+    return dict(params)
+
+
+def coalesce_chat(llm, flight: SingleFlight = FLIGHT):
+    """
+    채팅 모델을 single-flight Runnable로 감쌈
+
+    `prompt | coalesce_chat(llm) | StrOutputParser()` 형태로 체인에 그대로 사용합니다.
+    키는 모델 설정과 프롬프트 메시지(역할, 내용)로 구성합니다.
+    """
+    from langchain_core.runnables import RunnableLambda
+
+    params = _model_params(llm)
+
+    def invoke(prompt_value, config=None):
+        messages = prompt_value.to_messages() if hasattr(prompt_value, "to_messages") else prompt_value
+        key = fingerprint(
+            "chat",
+            params,
+            [(getattr(m, "type", ""), getattr(m, "content", m)) for m in messages]
+        )
+        tokens = _messages_tokens(messages) + (getattr(llm, "max_tokens", None) or DEFAULT_COMPLETION_TOKENS)
+        return flight.do(
+            key,
+            lambda: governed_call("chat", tokens, lambda: llm.invoke(prompt_value, config)),
+            name="chat"
+        )
+
+    return RunnableLambda(invoke, name="coalesced_chat")
+
+
+class CoalescedEmbeddings:
+    """임베딩 객체를 single-flight로 감싼 래퍼 (그 외 속성은 원본에 위임)"""
+
+    def __init__(self, embeddings, flight: SingleFlight = FLIGHT):
+        self.embeddings = embeddings
+        self.flight = flight
+        self._params = _model_params(embeddings)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        key = fingerprint("embed_documents", self._params, list(texts))
+        tokens = sum(count_tokens(text) for text in texts)
+        return self.flight.do(
+            key,
+            lambda: governed_call("embeddings", tokens, lambda: self.embeddings.embed_documents(texts)),
+            name="embeddings"
+        )
+
+    def embed_query(self, text: str) -> List[float]:
+        key = fingerprint("embed_query", self._params, text)
+        return self.flight.do(
+            key,
+            lambda: governed_call("embeddings", count_tokens(text), lambda: self.embeddings.embed_query(text)),
+            name="embeddings"
+        )
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        import asyncio
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        import asyncio
+        return await asyncio.to_thread(self.embed_query, text)
+
+    def __getattr__(self, name: str):
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+
+def coalesced_chat_completion(client, flight: SingleFlight = FLIGHT, **kwargs):
+    """
+    client.chat.completions.create를 single-flight로 호출
+
+    키는 요청 인자 전체(model, messages, temperature 등)로 구성합니다.
+    """
+    key = fingerprint("chat.completions", kwargs)
+    tokens = _messages_tokens(kwargs.get("messages", [])) + (kwargs.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+    return flight.do(
+        key,
+        lambda: governed_call(
+            family_for(kwargs.get("model")), tokens, lambda: client.chat.completions.create(**kwargs)
+        ),
+        name="chat"
+    )
+
+
+def governed_speech(client, **kwargs):
+    """client.audio.speech.create (TTS)를 속도 제한을 지키며 호출"""
+    return governed_call("tts", 0, lambda: client.audio.speech.create(**kwargs))
+
+
+def governed_transcription(client, **kwargs):
+    """client.audio.transcriptions.create (Whisper)를 속도 제한을 지키며 호출"""
+    def transcribe():
+        # 429 재시도 시 업로드 파일을 처음부터 다시 읽도록 되감음
+        audio_file = kwargs.get("file")
+        if hasattr(audio_file, "seek"):
+            audio_file.seek(0)
+        return client.audio.transcriptions.create(**kwargs)
+
+    return governed_call("whisper", 0, transcribe)
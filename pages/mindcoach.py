@@ -1,8 +1,12 @@
 # pages/mindcoach.py
 import os
 import streamlit as st
-from mind_coach import MindCoachRAG
+from mind_coach import WARMUP
 from diary_storage import DiaryStorage
+from metrics import REGISTRY
+
+# 요청 처리 시 워밍업 완료를 기다리는 최대 시간(초)
+WARMUP_WAIT_TIMEOUT = 60
 
 # 페이지 기본 설정
 st.set_page_config(
@@ -85,22 +89,40 @@ def check_api_key():
 # =============================
 # Mind Coach 및 Storage 초기화
 # =============================
-@st.cache_resource
-def initialize_mind_coach():
-    """Mind Coach 시스템 초기화 (캐싱)"""
-    api_key = os.environ.get("OPENAI_API_KEY")
-    mind_coach = MindCoachRAG(openai_api_key=api_key)
-    
-    # Vector DB 초기화
-    success_high, success_low = mind_coach.initialize_vector_dbs()
-    
-    return mind_coach, success_high, success_low
-
 @st.cache_resource
 def initialize_storage():
     """일지 저장소 초기화 (캐싱)"""
     return DiaryStorage()
 
+def initialize_mind_coach():
+    """Mind Coach 백그라운드 워밍업 시작 (홈에서 이미 시작했으면 무시)"""
+    api_key = os.environ.get("OPENAI_API_KEY")
+    WARMUP.start(api_key, storage=initialize_storage())
+
+def show_mind_coach_status():
+    """Mind Coach 준비 상태 표시"""
+    if WARMUP.status == "warming":
+        st.caption("⏳ Mind Coach를 준비하고 있어요. 일기를 먼저 작성하셔도 괜찮아요.")
+    elif WARMUP.status == "error":
+        st.error(f"❌ Mind Coach 초기화에 실패했습니다: {WARMUP.error}")
+    elif not WARMUP.success_high and not WARMUP.success_low:
+        st.warning("⚠️ PDF 파일을 찾을 수 없어 기본 메시지로 동작합니다.")
+
+
+# =============================
+# 단계별 지연 시간 내보내기
+# =============================
+def export_metrics():
+    """단계별 지연 시간을 Prometheus 파일(MYGREEN_METRICS_FILE)과 로그로 내보내기"""
+    metrics_file = os.environ.get("MYGREEN_METRICS_FILE")
+    if metrics_file:
+        REGISTRY.write_prometheus(metrics_file)
+    
+    # 일지 20건마다 로그로 요약 출력
+    stats = REGISTRY.summary().get("mind_coach.full_response")
+    if stats and stats["count"] % 20 == 0:
+        REGISTRY.log_summary()
+
 
 # =============================
 # Mind Coach 메인 함수
@@ -111,14 +133,12 @@ def mind_coach_main():
     # API 키 확인
     check_api_key()
     
-    # Mind Coach 초기화
-    mind_coach, success_high, success_low = initialize_mind_coach()
-    
     # 저장소 초기화
     storage = initialize_storage()
     
-    if not success_high and not success_low:
-        st.warning("⚠️ PDF 파일을 찾을 수 없어 기본 메시지로 동작합니다.")
+    # Mind Coach 초기화 (백그라운드, 페이지 렌더링은 막지 않음)
+    initialize_mind_coach()
+    show_mind_coach_status()
     
     # 세션 상태 초기화
     if "messages" not in st.session_state:
@@ -246,10 +266,26 @@ def mind_coach_main():
             "content": user_input
         })
         
+        # 워밍업이 끝나지 않았으면 정해진 시간까지만 대기
+        if not WARMUP.is_ready:
+            with st.spinner("Mind Coach를 준비하는 중..."):
+                WARMUP.wait(timeout=WARMUP_WAIT_TIMEOUT)
+        
         # AI 응답 생성
         with st.spinner("마음을 분석하는 중..."):
             try:
-                result = mind_coach.get_full_response(user_input)
+                if WARMUP.status == "warming":
+                    raise RuntimeError(f"Mind Coach 준비가 {WARMUP_WAIT_TIMEOUT}초 안에 끝나지 않았습니다. 잠시 후 다시 시도해주세요.")
+                if not WARMUP.is_ready:
+                    raise RuntimeError(f"Mind Coach 초기화 실패: {WARMUP.error}")
+                mind_coach = WARMUP.mind_coach
+                # 홈에서 워밍업한 경우 이 페이지의 저장소에도 기억 인덱스 연결
+                if WARMUP.memory_index is not None:
+                    storage.attach_memory_index(WARMUP.memory_index)
+                result = mind_coach.get_full_response(user_input, plant_name=plant_name)
+                
+                if result.get("degraded"):
+                    st.info("⏳ AI 응답이 지연되어 일부 내용은 간단한 분석으로 대신했어요.")
                 
                 # 일지 저장
                 save_success = storage.save_diary(
@@ -261,6 +297,8 @@ def mind_coach_main():
                 if not save_success:
                     st.warning("⚠️ 일지 저장에 실패했습니다.")
                 
+                export_metrics()
+                
                 # 응답 포맷팅
                 if result['emotion'] >= 70:
                     badge_bg = "#e8f5e9"
@@ -1,14 +1,17 @@
 # pages/voice_chat.py (with plant-specific conversation management)
 import os
 import streamlit as st
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnableWithMessageHistory
-from langchain_core.chat_history import InMemoryChatMessageHistory
-from openai import OpenAI
 import base64
 from io import BytesIO
+from typing import TYPE_CHECKING
+from token_budget import PROMPT_BUDGETS, fit_text, trim_messages
+from openai_gateway import CLIENT_MAX_RETRIES, coalesce_chat, governed_speech, governed_transcription
+
+# langchain/openai는 무거우므로 실제로 사용할 때 import (첫 화면 렌더링 시간 단축)
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+    from langchain_core.runnables import RunnableWithMessageHistory
+    from langchain_core.chat_history import InMemoryChatMessageHistory
 try:
     from audio_recorder_streamlit import audio_recorder
     AUDIO_RECORDER_AVAILABLE = True
@@ -192,15 +195,18 @@ def check_api_key():
 # =============================
 @st.cache_resource
 def initialize_llm():
+    from langchain_openai import ChatOpenAI
     return ChatOpenAI(
         model="gpt-4o-mini",
         temperature=0.8,
         frequency_penalty=1.0,
+        max_retries=CLIENT_MAX_RETRIES,
     )
 
 @st.cache_resource
 def initialize_openai_client():
-    return OpenAI()
+    from openai import OpenAI
+    return OpenAI(max_retries=CLIENT_MAX_RETRIES)
 
 
 # =============================
@@ -210,7 +216,8 @@ def text_to_speech(text):
     """OpenAI TTS API를 사용하여 텍스트를 음성으로 변환"""
     try:
         client = initialize_openai_client()
-        response = client.audio.speech.create(
+        response = governed_speech(
+            client,
             model="tts-1",
             voice="nova",  # alloy, echo, fable, onyx, nova, shimmer 중 선택 가능
             input=text
@@ -224,7 +231,8 @@ def speech_to_text(audio_file):
     """OpenAI Whisper API를 사용하여 음성을 텍스트로 변환"""
     try:
         client = initialize_openai_client()
-        transcript = client.audio.transcriptions.create(
+        transcript = governed_transcription(
+            client,
             model="whisper-1",
             file=audio_file,
             language="ko"
@@ -253,16 +261,28 @@ def create_audio_player(audio_data):
 if "_comm_histories" not in st.session_state:
     st.session_state._comm_histories = {}
 
-def get_session_history(session_id: str) -> InMemoryChatMessageHistory:
+def get_session_history(session_id: str) -> "InMemoryChatMessageHistory":
+    from langchain_core.chat_history import InMemoryChatMessageHistory
     store = st.session_state._comm_histories
     if session_id not in store:
         store[session_id] = InMemoryChatMessageHistory()
     return store[session_id]
 
 
-def build_chain(persona: int, plantname: str, llm: ChatOpenAI) -> RunnableWithMessageHistory:
+def build_chain(persona: int, plantname: str, llm: "ChatOpenAI") -> "RunnableWithMessageHistory":
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.runnables import RunnablePassthrough, RunnableWithMessageHistory
+
     prompt = get_prompt_template(persona, plantname)
-    base_chain = prompt | llm | StrOutputParser()
+    # 긴 대화에서도 입력 크기가 일정하도록 최근 이력과 사용자 입력을 토큰 예산에 맞춤
+    trim_inputs = RunnablePassthrough.assign(
+        history=lambda x: trim_messages(
+            x.get("history", []), PROMPT_BUDGETS["voice_chat.history"], name="voice_chat.history"
+        ),
+        input=lambda x: fit_text(x["input"], PROMPT_BUDGETS["voice_chat.input"], name="voice_chat.input"),
+    )
+    # 재실행 등으로 같은 요청이 동시에 나가면 LLM 호출 하나로 합침
+    base_chain = trim_inputs | prompt | coalesce_chat(llm) | StrOutputParser()
 
     # RunnableWithMessageHistory가 history를 자동으로 주입/저장
     chain_with_history = RunnableWithMessageHistory(
@@ -278,6 +298,7 @@ def build_chain(persona: int, plantname: str, llm: ChatOpenAI) -> RunnableWithMe
 # 프롬프트 템플릿
 # =============================
 def get_prompt_template(persona, plantname):
+    from langchain_core.prompts import ChatPromptTemplate
     prompts = {
         0: ChatPromptTemplate.from_template(
             f"""
@@ -7,26 +7,188 @@
 
 import os
 import re
+import json
+import time
+import hashlib
+import random
+import itertools
+import shutil
+import threading
 import requests
-from io import BytesIO
-from PIL import Image
-from typing import List, Dict, Tuple
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator, List, Dict, Optional, Tuple
 from pathlib import Path
+from urllib.parse import urlsplit
 
-from langchain_core.documents import Document
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
-from openai import OpenAI
+# PIL/langchain/chromadb/openai는 무거우므로 실제로 사용할 때 import (페이지 시작 시간 단축)
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from langchain_community.vectorstores import Chroma
+
+from embedding_ingest import EmbeddingIngestor
+from token_budget import PROMPT_BUDGETS, fit_context
+from context_compression import fetch_candidates, compress_documents
+from openai_gateway import CLIENT_MAX_RETRIES, CoalescedEmbeddings, coalesced_chat_completion
+from rate_limiter import lane
+from circuit_breaker import AnswerCache, guarded_call
+from metrics import inc, observe, span
+from ncpms_cache import NcpmsResponseCache
+from disease_corpus import DiseaseCorpus
+from image_store import ImageStore
+
+
+class HostThrottle:
+    """호스트별 동시 요청 수와 요청 시작 간격 제한 (스레드 안전)"""
+    
+    def __init__(self, max_concurrency: int = 4, min_interval: float = 0.0):
+        """
+        Args:
+            max_concurrency: 호스트 하나에 동시에 보내는 최대 요청 수
+            min_interval: 같은 호스트로 요청을 시작하는 최소 간격(초)
+        """
+        self.max_concurrency = max_concurrency
+        self.min_interval = min_interval
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def slot(self, url: str):
+        """url의 호스트에 요청을 보낼 수 있을 때까지 대기 후 실행"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.max_concurrency))
+        with semaphore:
+            if self.min_interval > 0:
+                with self._lock:
+                    now = time.monotonic()
+                    start = max(now, self._next_start.get(host, 0.0))
+                    self._next_start[host] = start + self.min_interval
+                if start > now:
+                    time.sleep(start - now)
+            yield
 
 
 class PlantDiseaseCollector:
     """NCPMS API를 통한 병해충 데이터 수집"""
     
-    def __init__(self, api_key: str, base_url: str = "http://ncpms.rda.go.kr/npmsAPI/service"):
+    # 재시도하는 응답 상태 코드 (일시적인 서버 오류)
+    RETRY_STATUS = {500, 502, 503, 504}
+    
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "http://ncpms.rda.go.kr/npmsAPI/service",
+        max_workers: int = 8,
+        per_host_limit: int = 4,
+        min_host_interval: float = 0.05,
+        max_retries: int = 3,
+        retry_delay: float = 0.5,
+        cache: Optional[NcpmsResponseCache] = None,
+        thumbnail_size: Optional[Tuple[int, int]] = None,
+        image_dir: str = "./crop_images"
+    ):
+        """
+        Args:
+            api_key: NCPMS API 키
+            base_url: NCPMS 서비스 URL
+            max_workers: 병해충별 상세 정보/이미지를 동시에 수집하는 최대 작업 수 (1이면 순차 수집)
+            per_host_limit: 호스트 하나에 동시에 보내는 최대 요청 수
+            min_host_interval: 같은 호스트로 요청을 시작하는 최소 간격(초)
+            max_retries: 5xx 응답/타임아웃/연결 오류 시 최대 재시도 횟수
+            retry_delay: 첫 재시도 대기 시간(초, 이후 지수 증가 + 지터)
+            cache: SVC01/SVC05 응답 디스크 캐시 (오프라인 모드면 이미지도 저장된 파일만 사용)
+            thumbnail_size: 주어지면 이미지 저장 시 이 크기의 썸네일도 생성 (PIL 필요)
+            image_dir: 병해충 이미지 저장 디렉토리
+        """
         self.api_key = api_key
         self.base_url = base_url
-        self.image_dir = Path("./crop_images")
-        self.image_dir.mkdir(exist_ok=True)
+        self.image_dir = Path(image_dir)
+        self.images = ImageStore(self.image_dir)
+        self.thumbnail_size = thumbnail_size
+        self.max_workers = max_workers
+        self.throttle = HostThrottle(per_host_limit, min_host_interval)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.cache = cache
+        
+        # keep-alive 연결을 재사용하는 세션 (동시 수집 작업 수만큼 연결 유지)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(max_workers, per_host_limit))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # 마지막 collect_all_data에서 실패한 항목 [{"sickKey", "병명", "오류"}]
+        self.last_failures: List[Dict[str, str]] = []
+    
+    def close(self):
+        """세션 연결 풀 정리"""
+        self.session.close()
+    
+    def _describe_error(self, error: Exception) -> str:
+        """로그/실패 목록용 오류 설명 (요청 URL에 들어간 API 키는 가림)"""
+        message = f"{type(error).__name__}: {error}"
+        return message.replace(self.api_key, "***") if self.api_key else message
+    
+    def _get(
+        self,
+        url: str,
+        params: Optional[Dict] = None,
+        timeout: float = 10,
+        service: str = "image",
+        stream: bool = False
+    ):
+        """
+        호스트별 제한을 지키며 GET 요청 (5xx/타임아웃/연결 오류는 지터를 더한 지수 백오프로 재시도)
+        
+        응답 시간은 ncpms.<service>.response 지표로 기록합니다.
+        마지막 시도까지 5xx면 그 응답을 그대로 반환합니다 (호출자가 raise_for_status로 처리).
+        
+        Args:
+            url: 요청 URL
+            params: 쿼리 파라미터
+            timeout: 요청 타임아웃(초)
+            service: 지표 이름 (SVC01, SVC05, image)
+            stream: True면 본문을 받지 않고 응답 반환 (iter_content로 읽은 뒤 close 필요)
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.throttle.slot(url):
+                    started = time.perf_counter()
+                    response = self.session.get(url, params=params, timeout=timeout, stream=stream)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                inc(f"ncpms.{service}.{'timeouts' if isinstance(e, requests.Timeout) else 'connection_errors'}")
+                if attempt == self.max_retries:
+                    raise
+                reason = self._describe_error(e)
+            else:
+                observe(f"ncpms.{service}.response", time.perf_counter() - started)
+                if response.status_code not in self.RETRY_STATUS or attempt == self.max_retries:
+                    return response
+                inc(f"ncpms.{service}.server_errors")
+                reason = f"HTTP {response.status_code}"
+                response.close()
+            
+            inc(f"ncpms.{service}.retries")
+            delay = self.retry_delay * (2 ** attempt) * (0.5 + random.random())
+            print(f"[경고] NCPMS {service} 요청 실패, {delay:.1f}초 후 재시도: {reason}")
+            time.sleep(delay)
+    
+    def _get_json(self, params: Dict[str, str], refresh: bool = False):
+        """NCPMS 서비스 요청 (캐시가 있으면 캐시 우선, refresh=True면 다시 요청해 캐시 갱신)"""
+        service = params["serviceCode"]
+        
+        def request():
+            response = self._get(self.base_url, params=params, timeout=10, service=service)
+            response.raise_for_status()
+            return response.json()
+        
+        if self.cache is None:
+            return request()
+        return self.cache.fetch(params, request, refresh=refresh)
     
     @staticmethod
     def cleaning_str(text: str) -> str:
@@ -39,8 +201,8 @@ class PlantDiseaseCollector:
         clean_text = re.sub(r'\s+', ' ', clean_text)  # 연속 공백 제거
         return clean_text.strip()
     
-    def get_crop_diseases(self, crop_name: str) -> List[Dict[str, str]]:
-        """특정 작물의 병해충 목록 가져오기"""
+    def get_crop_diseases(self, crop_name: str, refresh: bool = False) -> List[Dict[str, str]]:
+        """특정 작물의 병해충 목록 가져오기 (refresh=True면 캐시를 건너뛰고 다시 요청)"""
         params = {
             "apiKey": self.api_key,
             "serviceCode": "SVC01",
@@ -49,45 +211,48 @@ class PlantDiseaseCollector:
         }
         
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self._get_json(params, refresh=refresh)
             if "service" in data and "list" in data["service"]:
                 return data["service"]["list"]
             return []
         except Exception as e:
-            print(f"[오류] 작물 정보 조회 실패: {e}")
+            print(f"[오류] 작물 정보 조회 실패: {self._describe_error(e)}")
             return []
     
-    def get_disease_detail(self, sick_key: str) -> Dict[str, str]:
-        """특정 병해충의 상세 정보 가져오기"""
+    def _fetch_disease_detail(self, sick_key: str, refresh: bool = False) -> Dict[str, str]:
+        """특정 병해충의 상세 정보 조회 (실패 시 예외 발생, refresh=True면 캐시를 건너뛰고 다시 요청)"""
         params = {
             "apiKey": self.api_key,
             "serviceCode": "SVC05",
             "sickKey": sick_key
         }
         
+        data = self._get_json(params, refresh=refresh)
+        if "service" in data:
+            sick_info = data["service"]
+            return {
+                "병명": self.cleaning_str(sick_info.get("sickNameKor", "")),
+                "발생생태": self.cleaning_str(sick_info.get("developmentCondition", "")),
+                "병 증상": self.cleaning_str(sick_info.get("symptoms", "")),
+                "방제방법": self.cleaning_str(sick_info.get("preventionMethod", ""))
+            }
+        return {}
+    
+    def get_disease_detail(self, sick_key: str) -> Dict[str, str]:
+        """특정 병해충의 상세 정보 가져오기"""
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            if "service" in data:
-                sick_info = data["service"]
-                return {
-                    "병명": self.cleaning_str(sick_info.get("sickNameKor", "")),
-                    "발생생태": self.cleaning_str(sick_info.get("developmentCondition", "")),
-                    "병 증상": self.cleaning_str(sick_info.get("symptoms", "")),
-                    "방제방법": self.cleaning_str(sick_info.get("preventionMethod", ""))
-                }
-            return {}
+            return self._fetch_disease_detail(sick_key)
         except Exception as e:
-            print(f"[오류] 병해충 상세 정보 조회 실패 ({sick_key}): {e}")
+            print(f"[오류] 병해충 상세 정보 조회 실패 ({sick_key}): {self._describe_error(e)}")
             return {}
     
     def save_disease_image(self, crop_name: str, disease_name: str, img_url: str) -> str:
-        """병해충 이미지 저장 및 경로 반환"""
+        """
+        병해충 이미지 저장 및 경로 반환
+        
+        응답을 청크 단위로 바로 디스크에 쓰고 내용 해시 파일명(원본 형식 유지)으로 저장합니다.
+        이미 받은 URL이나 같은 내용의 이미지는 다시 저장하지 않습니다.
+        """
         # noImg 체크
         if img_url == "http://ncpms.rda.go.kr/images/common/noImg.gif":
             print(f"    [이미지] {disease_name}: 기본 이미지(noImg) - 스킵")
@@ -98,20 +263,34 @@ class PlantDiseaseCollector:
             print(f"    [이미지] {disease_name}: 이미지 URL 없음 - 스킵")
             return None
         
+        # 이미 받은 URL이면 다운로드 없이 재사용 (다른 작물에서 받은 경우 포함)
+        record = self.images.lookup(img_url)
+        if record is not None:
+            self.images.add_crop(img_url, crop_name)
+            print(f"    [이미지] {disease_name}: 저장된 이미지 재사용 - {record['file']}")
+            return self.images.path_of(record)
+        
+        # 오프라인 모드에서는 이미 저장된 이미지만 사용
+        if self.cache is not None and self.cache.offline:
+            print(f"    [이미지] {disease_name}: 오프라인 모드, 저장된 이미지 없음 - 스킵")
+            return None
+        
         try:
             print(f"    [이미지] {disease_name}: 다운로드 시작 - {img_url}")
-            response = requests.get(img_url, timeout=20)
-            response.raise_for_status()
-            
-            img = Image.open(BytesIO(response.content))
-            # 파일명 정규화 (특수문자 제거)
-            safe_disease_name = re.sub(r'[^\w\s-]', '', disease_name).strip()
-            safe_disease_name = re.sub(r'[-\s]+', '_', safe_disease_name)
-            filename = f"{crop_name}_{safe_disease_name}.png"
-            filepath = self.image_dir / filename
-            img.save(filepath)
-            print(f"    [이미지] {disease_name}: 저장 완료 - {filepath}")
-            return str(filepath)
+            response = self._get(img_url, timeout=20, stream=True)
+            with response:
+                response.raise_for_status()
+                record = self.images.store_stream(
+                    img_url,
+                    response.iter_content(ImageStore.CHUNK_SIZE),
+                    crop_name,
+                    response.headers.get("Content-Type")
+                )
+            if self.thumbnail_size:
+                self.images.make_thumbnail(record, self.thumbnail_size)
+            filepath = self.images.path_of(record)
+            print(f"    [이미지] {disease_name}: 저장 완료 - {filepath} ({record['bytes']} bytes)")
+            return filepath
         except Exception as e:
             print(f"    [오류] 이미지 저장 실패 ({disease_name}): {e}")
             print(f"    [오류] URL: {img_url}")
@@ -134,28 +313,8 @@ class PlantDiseaseCollector:
             disease_name = disease.get("sickNameKor", f"병{idx}")
             print(f"  - {disease_name}")
         
-        # 2. 각 병해충의 상세 정보 가져오기
-        all_diseases = []
-        for idx, disease in enumerate(disease_list, 1):
-            sick_key = disease.get("sickKey")
-            disease_name = disease.get("sickNameKor", f"병{idx}")
-            
-            print(f"  [{idx}/{len(disease_list)}] {disease_name} 처리 중...")
-            
-            # 상세 정보
-            detail = self.get_disease_detail(sick_key)
-            if detail:
-                detail["작물명"] = crop_name
-                detail["sickKey"] = sick_key
-                
-                # 이미지 저장 및 경로 추가
-                if "thumbImg" in disease:
-                    img_path = self.save_disease_image(crop_name, disease_name, disease["thumbImg"])
-                    detail["이미지경로"] = img_path
-                else:
-                    detail["이미지경로"] = None
-                
-                all_diseases.append(detail)
+        # 2. 각 병해충의 상세 정보/이미지를 동시에 가져오기 (결과는 목록 순서 유지)
+        all_diseases = self.collect_details(crop_name, disease_list)
         
         print(f"[완료] 총 {len(all_diseases)}개의 병해충 데이터 수집 완료")
         print(f"[디버그] 저장된 병해충 목록:")
@@ -165,6 +324,141 @@ class PlantDiseaseCollector:
         return all_diseases
 
         return all_diseases
+    
+    @staticmethod
+    def list_entry_hash(disease: Dict[str, str]) -> str:
+        """SVC01 목록 항목 해시 (병명/이미지 등 목록 정보가 바뀌었는지 비교용)"""
+        payload = json.dumps(disease, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+    
+    def collect_details(
+        self,
+        crop_name: str,
+        disease_list: List[Dict[str, str]],
+        refresh: bool = False
+    ) -> List[Dict[str, str]]:
+        """
+        SVC01 목록 항목들의 상세 정보/이미지를 동시에 수집
+        
+        실패한 항목은 결과에서 빠지고 last_failures에 기록됩니다.
+        refresh=True면 SVC05 응답 캐시를 건너뛰고 다시 요청합니다.
+        
+        Returns:
+            목록 순서를 유지한 상세 정보 목록
+        """
+        total = len(disease_list)
+        if total == 0:
+            self.last_failures = []
+            return []
+        
+        with span("plant_doctor.collect_details"):
+            if self.max_workers > 1 and total > 1:
+                with ThreadPoolExecutor(
+                    max_workers=min(self.max_workers, total),
+                    thread_name_prefix="ncpms"
+                ) as executor:
+                    outcomes = list(executor.map(
+                        lambda item: self.collect_one(crop_name, item[0], total, item[1], refresh),
+                        enumerate(disease_list, 1)
+                    ))
+            else:
+                outcomes = [
+                    self.collect_one(crop_name, idx, total, disease, refresh)
+                    for idx, disease in enumerate(disease_list, 1)
+                ]
+        
+        all_diseases = [detail for detail, _ in outcomes if detail]
+        self.last_failures = [failure for _, failure in outcomes if failure]
+        if self.last_failures:
+            inc("plant_doctor.collect_failures", len(self.last_failures))
+            print(f"[경고] {len(self.last_failures)}개 병해충 수집 실패:")
+            for failure in self.last_failures:
+                print(f"  - {failure['병명']} ({failure['sickKey']}): {failure['오류']}")
+        return all_diseases
+    
+    def iter_details(
+        self,
+        crop_name: str,
+        disease_list: List[Dict[str, str]]
+    ) -> Iterator[Dict[str, str]]:
+        """
+        SVC01 목록 항목들의 상세 정보/이미지를 동시에 수집하면서 끝나는 대로 하나씩 반환
+        
+        진행 중인 작업은 max_workers개로 제한되므로, 소비 쪽이 느리면 새 요청도 멈춥니다.
+        반환 순서는 목록 순서와 다를 수 있으며, 실패한 항목은 끝난 뒤 last_failures에 기록됩니다.
+        """
+        total = len(disease_list)
+        failures = []
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers), thread_name_prefix="ncpms") as executor:
+            items = iter(enumerate(disease_list, 1))
+            pending = set()
+            while True:
+                # 다음 단계가 받아 간 만큼만 새로 제출
+                for idx, disease in items:
+                    pending.add(executor.submit(self.collect_one, crop_name, idx, total, disease))
+                    if len(pending) >= max(1, self.max_workers):
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    detail, failure = future.result()
+                    if failure:
+                        failures.append(failure)
+                    if detail:
+                        yield detail
+        
+        self.last_failures = failures
+        if failures:
+            inc("plant_doctor.collect_failures", len(failures))
+            print(f"[경고] {len(failures)}개 병해충 수집 실패:")
+            for failure in failures:
+                print(f"  - {failure['병명']} ({failure['sickKey']}): {failure['오류']}")
+    
+    def collect_one(
+        self,
+        crop_name: str,
+        idx: int,
+        total: int,
+        disease: Dict[str, str],
+        refresh: bool = False
+    ) -> Tuple[Optional[Dict[str, str]], Optional[Dict[str, str]]]:
+        """
+        병해충 하나의 상세 정보와 이미지 수집 (refresh=True면 SVC05 응답 캐시를 건너뜀)
+        
+        Returns:
+            (상세 정보 또는 None, 실패 정보 또는 None) - 예외는 실패 정보로 바꿔 반환
+        """
+        sick_key = disease.get("sickKey")
+        disease_name = disease.get("sickNameKor", f"병{idx}")
+        
+        print(f"  [{idx}/{total}] {disease_name} 처리 중...")
+        
+        try:
+            # 상세 정보
+            detail = self._fetch_disease_detail(sick_key, refresh=refresh)
+        except Exception as e:
+            error = self._describe_error(e)
+            print(f"[오류] 병해충 상세 정보 조회 실패 ({sick_key}): {error}")
+            return None, {"sickKey": sick_key, "병명": disease_name, "오류": error}
+        if not detail:
+            return None, {"sickKey": sick_key, "병명": disease_name, "오류": "상세 정보 없음"}
+        
+        detail["작물명"] = crop_name
+        detail["sickKey"] = sick_key
+        detail["목록해시"] = self.list_entry_hash(disease)
+        
+        # 이미지 저장 및 경로 추가
+        if "thumbImg" in disease:
+            detail["이미지경로"] = self.save_disease_image(crop_name, disease_name, disease["thumbImg"])
+        else:
+            detail["이미지경로"] = None
+        
+        # 이미지 내용 해시 (같은 이미지를 쓰는 병해충/작물 식별용)
+        record = self.images.lookup(disease["thumbImg"]) if detail["이미지경로"] else None
+        detail["이미지해시"] = record["sha256"] if record else None
+        
+        return detail, None
 
 
 class TextPreprocessor:
@@ -217,13 +511,55 @@ class PlantDiseaseRAG:
         '과꽃' : 'FL012105',    
         '봉숭아(봉선화)' : 'FL012131',    }
     
-    def __init__(self, openai_api_key: str, chroma_base_dir: str = "./chroma_db"):
+    # 호출별 마감 시간(초) - 넘기면 기다리지 않고 대체 응답 사용
+    DETAIL_TIMEOUT = 20.0
+    RETRIEVAL_TIMEOUT = 5.0
+    
+    UNAVAILABLE_MESSAGE = "지금은 상세 정보를 불러올 수 없습니다. 잠시 후 다시 시도해주세요."
+    
+    # 작물 인덱스 디렉토리에 함께 두는 마지막 동기화 기록
+    SYNC_STATE_FILE = "sync_state.json"
+    
+    # 인덱스를 만드는 동안 작물 인덱스 디렉토리에 두는 표식 (있으면 아직 검색에 쓰지 않음)
+    BUILDING_FILE = "building"
+    
+    def __init__(
+        self,
+        openai_api_key: str,
+        chroma_base_dir: str = "./chroma_db",
+        corpus_dir: str = "./disease_corpus",
+        max_open_indexes: int = 4
+    ):
+        """
+        Args:
+            openai_api_key: OpenAI API 키
+            chroma_base_dir: 작물별 ChromaDB 디렉토리
+            corpus_dir: 작물별 수집 원본(JSONL) 디렉토리 - 인덱스 재생성의 기준 데이터
+            max_open_indexes: 열어 둘 작물 인덱스(Chroma) 최대 개수 (넘으면 가장 오래 안 쓴 작물부터 닫음)
+        """
         self.openai_api_key = openai_api_key
         self.chroma_base_dir = Path(chroma_base_dir)
         self.chroma_base_dir.mkdir(exist_ok=True)
-        self.embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-        self.client = OpenAI(api_key=openai_api_key)
+        self.corpus = DiseaseCorpus(corpus_dir)
+        
+        # 작물별로 열어 둔 인덱스와 열 때의 세대 표식 (질의마다 SQLite/HNSW를 다시 열지 않도록 LRU로 유지)
+        self.max_open_indexes = max_open_indexes
+        self._open_indexes: "OrderedDict[str, Tuple[Chroma, Optional[int]]]" = OrderedDict()
+        self._open_indexes_lock = threading.Lock()
+        
+        from langchain_openai import OpenAIEmbeddings
+        from openai import OpenAI
+        
+        # 같은 요청이 동시에 들어오면 한 번만 호출 (세션 간 공유)
+        self.embeddings = CoalescedEmbeddings(
+            OpenAIEmbeddings(openai_api_key=openai_api_key, max_retries=CLIENT_MAX_RETRIES)
+        )
+        self.ingestor = EmbeddingIngestor(self.embeddings)
+        self.client = OpenAI(api_key=openai_api_key, max_retries=CLIENT_MAX_RETRIES)
         self.preprocessor = TextPreprocessor()
+        
+        # 장애 시 대체 응답용 최근 상세 답변 캐시
+        self.answer_cache = AnswerCache()
     
     @classmethod
     def get_supported_crops(cls) -> List[str]:
@@ -260,8 +596,48 @@ class PlantDiseaseRAG:
         collection_name = self._get_collection_name(crop_name)
         return self.chroma_base_dir / collection_name
     
-    def create_crop_index(self, crop_name: str, diseases: List[Dict[str, str]]) -> Chroma:
-        """작물별 병해충 인덱스 생성"""
+    def index_ready(self, crop_name: str) -> bool:
+        """
+        작물 인덱스가 검색에 쓸 수 있는 상태인지 확인
+        
+        생성 중이거나 생성이 중간에 실패한 인덱스(표식이 남아 있음)는 준비되지 않은 것으로 봅니다.
+        """
+        chroma_dir = self._get_chroma_dir(crop_name)
+        return chroma_dir.exists() and not (chroma_dir / self.BUILDING_FILE).exists()
+    
+    def _begin_build(self, crop_name: str):
+        """인덱스 생성 시작 표식 (새 디렉토리는 표식을 넣은 채로 만들어 준비 전 상태가 보이지 않게 함)"""
+        chroma_dir = self._get_chroma_dir(crop_name)
+        if not chroma_dir.exists():
+            tmp_dir = chroma_dir.with_name(f"{chroma_dir.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_dir.mkdir(parents=True, exist_ok=True)
+            (tmp_dir / self.BUILDING_FILE).touch()
+            try:
+                os.rename(tmp_dir, chroma_dir)
+            except OSError:
+                # 다른 작업이 먼저 만든 경우
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        (chroma_dir / self.BUILDING_FILE).touch()
+    
+    def _end_build(self, crop_name: str):
+        (self._get_chroma_dir(crop_name) / self.BUILDING_FILE).unlink(missing_ok=True)
+    
+    def create_crop_index(
+        self,
+        crop_name: str,
+        diseases: List[Dict[str, str]],
+        save_corpus: bool = True
+    ) -> "Chroma":
+        """
+        작물별 병해충 인덱스 생성
+        
+        Args:
+            crop_name: 작물명 (한글)
+            diseases: PlantDiseaseCollector.collect_all_data 결과
+            save_corpus: True면 인덱싱 전에 수집 원본을 코퍼스 새 버전으로 저장
+        """
+        from langchain_community.vectorstores import Chroma
+        
         # 지원하는 작물인지 확인
         if not self.is_supported_crop(crop_name):
             raise ValueError(
@@ -269,10 +645,134 @@ class PlantDiseaseRAG:
                 f"지원 작물: {', '.join(self.get_supported_crops())}"
             )
         
+        # 임베딩이 실패해도 다시 수집하지 않도록 원본부터 저장
+        if save_corpus:
+            self.corpus.save(crop_name, diseases)
+        
         c_code_name = self._get_c_code_name(crop_name)
         print(f"[인덱스] '{crop_name}({c_code_name})' ChromaDB 인덱스 생성 중...")
         
-        # Document 생성
+        documents = self._build_documents(crop_name, diseases)
+        
+        # ChromaDB 생성 (작물별 디렉토리에 저장)
+        chroma_dir = self._get_chroma_dir(crop_name)
+        collection_name = self._get_collection_name(crop_name)
+        
+        self._begin_build(crop_name)
+        vectorstore = Chroma(
+            persist_directory=str(chroma_dir),
+            embedding_function=self.embeddings,
+            collection_name=collection_name
+        )
+        # 토큰 기준 배치로 병렬 임베딩 후 배치별 upsert (대화형 요청보다 낮은 우선순위)
+        with lane("background"):
+            self.ingestor.ingest(vectorstore, documents, ids=self._document_ids(documents))
+        self._write_sync_state(crop_name, {"mode": "full", "upserted": len(documents)})
+        self._remember_index(crop_name, vectorstore)
+        self._end_build(crop_name)
+        
+        print(f"[완료] '{crop_name}' 인덱스 생성 완료 ({len(documents)}개 문서)")
+        print(f"   컬렉션명: {collection_name}")
+        return vectorstore
+    
+    def stream_crop_index(
+        self,
+        crop_name: str,
+        collector: PlantDiseaseCollector,
+        save_corpus: bool = True
+    ) -> "Chroma":
+        """
+        수집 → 임베딩 → upsert를 파이프라인으로 연결해 작물 인덱스 생성
+        
+        상세 정보가 하나씩 도착하는 대로 문서로 바꿔 배치 임베딩하므로,
+        전체 소요 시간이 단계별 시간의 합이 아니라 가장 느린 단계 수준이 됩니다.
+        
+        Args:
+            crop_name: 작물명 (한글)
+            collector: 목록/상세 정보를 가져올 수집기
+            save_corpus: True면 수집한 원본을 코퍼스 새 버전으로 저장 (목록 순서)
+        
+        Raises:
+            RuntimeError: 병해충 목록을 가져오지 못함
+        """
+        from langchain_community.vectorstores import Chroma
+        
+        if not self.is_supported_crop(crop_name):
+            raise ValueError(
+                f"'{crop_name}'는 지원하지 않는 작물입니다.\n"
+                f"지원 작물: {', '.join(self.get_supported_crops())}"
+            )
+        
+        disease_list = collector.get_crop_diseases(crop_name)
+        if not disease_list:
+            raise RuntimeError(f"'{crop_name}' 병해충 목록을 가져오지 못했습니다.")
+        
+        c_code_name = self._get_c_code_name(crop_name)
+        print(f"[인덱스] '{crop_name}({c_code_name})' 병해충 {len(disease_list)}개 수집/인덱스 생성 동시 진행...")
+        
+        # 첫 상세 정보가 도착한 뒤에 인덱스 디렉토리 생성 (전부 실패하면 빈 인덱스를 남기지 않음)
+        details = collector.iter_details(crop_name, disease_list)
+        first = next(details, None)
+        if first is None:
+            raise RuntimeError(f"'{crop_name}' 병해충 데이터를 수집하지 못했습니다.")
+        
+        # 적재가 끝날 때까지는 index_ready()가 False (중간에 실패해도 완성된 인덱스로 보이지 않음)
+        self._begin_build(crop_name)
+        vectorstore = Chroma(
+            persist_directory=str(self._get_chroma_dir(crop_name)),
+            embedding_function=self.embeddings,
+            collection_name=self._get_collection_name(crop_name)
+        )
+        
+        collected = []
+        
+        def documents():
+            for detail in itertools.chain([first], details):
+                collected.append(detail)
+                yield self._build_documents(crop_name, [detail])[0]
+        
+        try:
+            with span("plant_doctor.stream_index"), lane("background"):
+                self.ingestor.ingest_stream(vectorstore, documents(), id_of=self._document_id)
+        finally:
+            # 임베딩이 실패해도 다시 수집하지 않도록 받은 원본은 저장
+            if save_corpus and collected:
+                order = {item.get("sickKey"): i for i, item in enumerate(disease_list)}
+                collected.sort(key=lambda detail: order.get(detail["sickKey"], len(order)))
+                self.corpus.save(crop_name, collected)
+        self._write_sync_state(crop_name, {"mode": "stream", "upserted": len(collected)})
+        self._remember_index(crop_name, vectorstore)
+        self._end_build(crop_name)
+        
+        print(f"[완료] '{crop_name}' 인덱스 생성 완료 ({len(collected)}개 문서)")
+        return vectorstore
+    
+    def reindex_from_corpus(self, crop_name: str, version: Optional[int] = None) -> "Chroma":
+        """
+        저장된 코퍼스로 작물 인덱스를 처음부터 다시 생성 (NCPMS 요청 없음)
+        
+        문서 템플릿, 청크, 임베딩 모델을 바꾼 뒤 사용합니다.
+        
+        Args:
+            crop_name: 작물명 (한글)
+            version: 코퍼스 버전 (생략 시 최신)
+        """
+        diseases = self.corpus.load(crop_name, version)
+        print(f"[인덱스] '{crop_name}' 코퍼스({len(diseases)}개 병해충)로 인덱스 재생성")
+        
+        # 기존 컬렉션 삭제 (열린 클라이언트가 있을 수 있으므로 디렉토리는 지우지 않음)
+        if self._get_chroma_dir(crop_name).exists():
+            self._begin_build(crop_name)
+            self.load_crop_index(crop_name).delete_collection()
+            self.invalidate_crop_index(crop_name)
+        
+        return self.create_crop_index(crop_name, diseases, save_corpus=False)
+    
+    def _build_documents(self, crop_name: str, diseases: List[Dict[str, str]]) -> List["Document"]:
+        """수집된 병해충 정보를 문서로 구성"""
+        from langchain_core.documents import Document
+        
+        c_code_name = self._get_c_code_name(crop_name)
         documents = []
         for disease in diseases:
             # 병해충 정보를 하나의 문서로 구성
@@ -283,50 +783,252 @@ class PlantDiseaseRAG:
                 f"방제방법:\n{disease.get('방제방법', '정보 없음')}"
             )
             
-            # 메타데이터에 구조화된 정보 포함
+            # 메타데이터에 구조화된 정보 포함 (sick_key/해시는 증분 동기화용)
             metadata = {
+                "sick_key": disease.get('sickKey') or '',
+                "list_hash": disease.get('목록해시') or '',
+                "content_hash": hashlib.sha1(
+                    f"{content}|{disease.get('이미지경로') or ''}|{disease.get('이미지해시') or ''}".encode("utf-8")
+                ).hexdigest()[:16],
                 "disease_name": disease.get('병명', ''),
                 "crop_name": crop_name,  # 한글 이름 유지
                 "crop_code": c_code_name,
                 "has_ecology": bool(disease.get('발생생태')),
                 "has_symptoms": bool(disease.get('병 증상')),
                 "has_prevention": bool(disease.get('방제방법')),
-                "image_path": disease.get('이미지경로', '')  # 이미지 경로 추가
+                "image_path": disease.get('이미지경로', ''),  # 이미지 경로 추가
+                "image_sha256": disease.get('이미지해시') or ''
             }
             
             documents.append(Document(page_content=content, metadata=metadata))
         
-        # ChromaDB 생성 (작물별 디렉토리에 저장)
+        return documents
+    
+    @staticmethod
+    def _document_id(document: "Document") -> str:
+        """문서 ID (sickKey, 없으면 내용 해시) - 다시 적재해도 중복 문서가 생기지 않음"""
+        return document.metadata["sick_key"] or document.metadata["content_hash"]
+    
+    @classmethod
+    def _document_ids(cls, documents: List["Document"]) -> List[str]:
+        return [cls._document_id(doc) for doc in documents]
+    
+    # ===== 증분 동기화 =====
+    
+    def last_synced(self, crop_name: str) -> Optional[float]:
+        """작물 인덱스를 마지막으로 생성/동기화한 시각 (기록이 없으면 None)"""
+        state_path = self._get_chroma_dir(crop_name) / self.SYNC_STATE_FILE
+        if not state_path.exists():
+            return None
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("synced_at")
+        except (OSError, ValueError):
+            return None
+    
+    def needs_sync(self, crop_name: str, max_age: float) -> bool:
+        """인덱스가 준비되어 있고, 마지막 동기화 후 max_age초가 지났는지 확인"""
+        if not self.index_ready(crop_name):
+            return False
+        synced_at = self.last_synced(crop_name)
+        return synced_at is None or time.time() - synced_at > max_age
+    
+    def _write_sync_state(self, crop_name: str, stats: Dict):
         chroma_dir = self._get_chroma_dir(crop_name)
-        collection_name = self._get_collection_name(crop_name)
+        chroma_dir.mkdir(parents=True, exist_ok=True)
+        with open(chroma_dir / self.SYNC_STATE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"synced_at": time.time(), "stats": stats}, f, ensure_ascii=False)
+    
+    def sync_crop_index(
+        self,
+        crop_name: str,
+        collector: PlantDiseaseCollector,
+        refresh_details: bool = False,
+        refresh_cache: bool = True
+    ) -> Dict[str, int]:
+        """
+        SVC01 목록과 인덱스를 sickKey 단위로 비교해 바뀐 병해충만 반영
         
-        vectorstore = Chroma.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            persist_directory=str(chroma_dir),
-            collection_name=collection_name
-        )
+        - 새로 생기거나 목록 정보가 바뀐 sickKey만 상세 정보를 다시 가져와 upsert
+        - 목록에서 사라진 sickKey 문서는 삭제
+        - refresh_details=True면 모든 상세 정보를 다시 가져오되, 내용이 같은 문서는 재임베딩하지 않음
+        - 상세 조회에 실패한 sickKey는 기존 문서를 그대로 유지
+        - sickKey 메타데이터가 없는 예전 인덱스는 한 번 전체 재적재
+          (새 문서를 먼저 적재하고, 전부 성공했을 때만 예전 문서 삭제)
         
-        print(f"[완료] '{crop_name}' 인덱스 생성 완료 ({len(documents)}개 문서)")
-        print(f"   컬렉션명: {collection_name}")
-        return vectorstore
+        Args:
+            crop_name: 작물명 (한글)
+            collector: 목록/상세 정보를 가져올 수집기
+            refresh_details: 목록이 같아도 상세 정보를 다시 확인할지 여부
+            refresh_cache: 수집기의 NCPMS 응답 캐시를 건너뛰고 다시 요청할지 여부
+                           (캐시 TTL이 동기화 주기보다 길어 캐시를 읽으면 변경을 놓침)
+        
+        Returns:
+            {"listed", "fetched", "upserted", "deleted", "unchanged", "failed"}
+        """
+        # 인덱스가 없거나 생성이 중간에 실패했으면 새로 생성 (sickKey ID라 남은 문서와 중복되지 않음)
+        if not self.index_ready(crop_name):
+            vectorstore = self.stream_crop_index(crop_name, collector)
+            upserted = len(vectorstore.get(include=[])["ids"])
+            failed = len(collector.last_failures)
+            return {"listed": upserted + failed, "fetched": upserted + failed, "upserted": upserted,
+                    "deleted": 0, "unchanged": 0, "failed": failed}
+        
+        with span("plant_doctor.sync_index"):
+            # 목록 조회 실패(빈 목록)로 인덱스를 비우지 않도록 먼저 확인
+            disease_list = collector.get_crop_diseases(crop_name, refresh=refresh_cache)
+            if not disease_list:
+                raise RuntimeError(f"'{crop_name}' 병해충 목록을 가져오지 못해 동기화를 건너뜁니다.")
+            
+            vectorstore = self.load_crop_index(crop_name)
+            indexed = vectorstore.get(include=["metadatas"])
+            indexed_meta = {}
+            legacy_ids = []
+            for doc_id, metadata in zip(indexed["ids"], indexed["metadatas"]):
+                metadata = metadata or {}
+                if metadata.get("sick_key"):
+                    indexed_meta[metadata["sick_key"]] = metadata
+                else:
+                    legacy_ids.append(doc_id)
+            if legacy_ids:
+                # 예전 문서는 새 문서를 모두 적재한 뒤에 지움 (재적재 중에도 검색 가능)
+                print(f"[정보] '{crop_name}' 예전 형식 문서 {len(legacy_ids)}개 - 전체 재적재")
+                indexed_meta = {}
+            
+            listed = {item.get("sickKey"): item for item in disease_list if item.get("sickKey")}
+            to_fetch = [
+                item for key, item in listed.items()
+                if refresh_details
+                or key not in indexed_meta
+                or indexed_meta[key].get("list_hash") != collector.list_entry_hash(item)
+            ]
+            removed = [key for key in indexed_meta if key not in listed]
+            
+            details = collector.collect_details(crop_name, to_fetch, refresh=refresh_cache)
+            documents = [
+                doc for doc in self._build_documents(crop_name, details)
+                if indexed_meta.get(doc.metadata["sick_key"], {}).get("content_hash") != doc.metadata["content_hash"]
+                or indexed_meta[doc.metadata["sick_key"]].get("list_hash") != doc.metadata["list_hash"]
+            ]
+            
+            if documents:
+                with lane("background"):
+                    self.ingestor.ingest(vectorstore, documents, ids=self._document_ids(documents))
+            if removed:
+                vectorstore.delete(ids=removed)
+            
+            # 하나라도 조회에 실패했으면 예전 문서를 남겨 두고 다음 동기화에서 다시 시도
+            legacy_kept = bool(legacy_ids) and bool(collector.last_failures)
+            if legacy_kept:
+                print(f"[경고] '{crop_name}' 조회 실패 {len(collector.last_failures)}개 - 예전 형식 문서 유지")
+                legacy_ids = []
+            elif legacy_ids:
+                vectorstore.delete(ids=legacy_ids)
+            
+            self._update_corpus(crop_name, listed, details, removed)
+        
+        stats = {
+            "listed": len(listed),
+            "fetched": len(to_fetch),
+            "upserted": len(documents),
+            "deleted": len(removed) + len(legacy_ids),
+            "unchanged": len(listed) - len(documents) - len(collector.last_failures),
+            "failed": len(collector.last_failures),
+        }
+        # 예전 문서를 남겨 둔 경우 동기화 시각을 남기지 않아 다음 확인 때 바로 다시 시도
+        if not legacy_kept:
+            self._write_sync_state(crop_name, {"mode": "incremental", **stats})
+            # 같은 컬렉션을 갱신한 것이므로 열어 둔 인덱스는 새 세대 표식으로 계속 사용
+            self._remember_index(crop_name, vectorstore)
+        print(
+            f"[완료] '{crop_name}' 인덱스 동기화 - 목록 {stats['listed']}, 조회 {stats['fetched']}, "
+            f"반영 {stats['upserted']}, 삭제 {stats['deleted']}, 실패 {stats['failed']}"
+        )
+        return stats
     
-    def load_crop_index(self, crop_name: str) -> Chroma:
-        """기존 작물 인덱스 로드"""
+    def _update_corpus(
+        self,
+        crop_name: str,
+        listed: Dict[str, Dict],
+        details: List[Dict[str, str]],
+        removed: List[str]
+    ):
+        """동기화 결과를 코퍼스 새 버전으로 반영 (코퍼스가 없으면 전부 새로 가져온 경우만 저장)"""
+        fetched = {detail["sickKey"]: detail for detail in details}
+        if self.corpus.exists(crop_name):
+            previous = {disease.get("sickKey"): disease for disease in self.corpus.load(crop_name)}
+        elif len(fetched) == len(listed):
+            previous = {}
+        else:
+            return
+        merged = [
+            fetched.get(key) or previous[key]
+            for key in listed
+            if key in fetched or key in previous
+        ]
+        self.corpus.save(crop_name, merged)
+    
+    def load_crop_index(self, crop_name: str) -> "Chroma":
+        """기존 작물 인덱스 로드 (열어 둔 인덱스가 있으면 재사용)"""
+        from langchain_community.vectorstores import Chroma
+        
         chroma_dir = self._get_chroma_dir(crop_name)
         collection_name = self._get_collection_name(crop_name)
         
+        # 다른 프로세스(ingest_crops.py 등)가 컬렉션을 지우고 다시 만들었으면
+        # 세대 표식(동기화 기록 수정 시각)이 바뀌므로 열어 둔 인덱스를 버리고 다시 엶
+        stamp = self._index_stamp(crop_name)
+        with self._open_indexes_lock:
+            entry = self._open_indexes.get(collection_name)
+            if entry is not None:
+                vectorstore, opened_stamp = entry
+                if self.index_ready(crop_name) and opened_stamp == stamp:
+                    self._open_indexes.move_to_end(collection_name)
+                    inc("plant_doctor.index_handles.hits")
+                    return vectorstore
+                # 디렉토리가 지워졌거나 다시 만들어졌으면 열어 둔 인덱스도 버림
+                del self._open_indexes[collection_name]
+                inc("plant_doctor.index_handles.stale")
+        
         if not chroma_dir.exists():
             raise FileNotFoundError(f"'{crop_name}'의 인덱스가 존재하지 않습니다.")
         
-        vectorstore = Chroma(
-            persist_directory=str(chroma_dir),
-            embedding_function=self.embeddings,
-            collection_name=collection_name
-        )
+        inc("plant_doctor.index_handles.misses")
+        with span("plant_doctor.open_index"):
+            vectorstore = Chroma(
+                persist_directory=str(chroma_dir),
+                embedding_function=self.embeddings,
+                collection_name=collection_name
+            )
         
+        # 생성 중인 인덱스는 보관하지 않음 (완성된 뒤 새로 열어야 함)
+        if self.index_ready(crop_name):
+            self._remember_index(crop_name, vectorstore, stamp)
         return vectorstore
     
+    def _index_stamp(self, crop_name: str) -> Optional[int]:
+        """인덱스 세대 표식 - 생성/동기화 때마다 새로 쓰는 동기화 기록의 수정 시각 (없으면 None)"""
+        try:
+            return (self._get_chroma_dir(crop_name) / self.SYNC_STATE_FILE).stat().st_mtime_ns
+        except OSError:
+            return None
+    
+    def _remember_index(self, crop_name: str, vectorstore: "Chroma", stamp: Optional[int] = None):
+        """열린 인덱스 보관 (같은 작물의 이전 인덱스는 교체, 한도를 넘으면 가장 오래 안 쓴 작물 제거)"""
+        if stamp is None:
+            stamp = self._index_stamp(crop_name)
+        with self._open_indexes_lock:
+            self._open_indexes[self._get_collection_name(crop_name)] = (vectorstore, stamp)
+            self._open_indexes.move_to_end(self._get_collection_name(crop_name))
+            while len(self._open_indexes) > self.max_open_indexes:
+                self._open_indexes.popitem(last=False)
+                inc("plant_doctor.index_handles.evictions")
+    
+    def invalidate_crop_index(self, crop_name: str):
+        """열어 둔 작물 인덱스 버리기 (컬렉션 삭제/재생성 후 다음 질의에서 다시 열림)"""
+        with self._open_indexes_lock:
+            self._open_indexes.pop(self._get_collection_name(crop_name), None)
+    
     def search_similar_diseases(
         self, 
         crop_name: str, 
@@ -379,24 +1081,55 @@ class PlantDiseaseRAG:
         crop_name: str, 
         disease_name: str
     ) -> str:
-        """선택된 병해충의 상세 정보 RAG 답변 생성"""
+        """
+        선택된 병해충의 상세 정보 RAG 답변 생성
+        
+        검색/LLM 호출이 마감 시간을 넘기거나 실패하면(또는 회로가 열려 있으면)
+        캐시된 답변 → 검색된 원문 → 안내 문구 순서로 대체합니다.
+        """
+        cache_key = (crop_name, disease_name)
         
         # 1. 벡터 스토어에서 해당 병해충 정보 검색
         vectorstore = self.load_crop_index(crop_name)
         
-        # 필터 없이 병명으로 검색하고 수동 필터링
-        results = vectorstore.similarity_search(f"병명: {disease_name}", k=10)
+        def retrieve():
+            # 필터 없이 병명으로 검색하고 수동 필터링 (후보 임베딩도 함께 가져옴)
+            query_vector = self.embeddings.embed_query(f"병명: {disease_name}")
+            return (query_vector, *fetch_candidates(vectorstore, query_vector, fetch_k=10))
+        
+        retrieved = guarded_call(
+            "plant_doctor.vector_store", retrieve, self.RETRIEVAL_TIMEOUT, lambda e: None
+        )
+        if retrieved is None:
+            return self.answer_cache.get(cache_key) or self.UNAVAILABLE_MESSAGE
+        query_vector, results, vectors = retrieved
         
         # 병명이 정확히 일치하는 것만 선택
-        filtered_results = []
-        for r in results:
-            if r.metadata.get("disease_name") == disease_name and r.metadata.get("crop_name") == crop_name:
-                filtered_results.append(r)
+        matched = [
+            i for i, r in enumerate(results)
+            if r.metadata.get("disease_name") == disease_name and r.metadata.get("crop_name") == crop_name
+        ]
         
-        if not filtered_results:
+        if not matched:
             return f"'{disease_name}' 정보를 찾을 수 없습니다. 작물이 올바른지 확인해주세요."
         
-        context = filtered_results[0].page_content
+        # 같은 병해충 문서가 여러 개면 MMR로 고르고 겹치는 내용/반복 문장 제거
+        chunks, _ = compress_documents(
+            [results[i] for i in matched],
+            vectors[matched],
+            query_vector,
+            k=2,
+            name="plant_doctor.detail"
+        )
+        
+        # 병명/발생생태/증상/방제방법 섹션을 모두 남기고 긴 섹션부터 균등하게 잘라 예산에 맞춤
+        context = fit_context(
+            "\n\n".join(chunks).split("\n\n"),
+            PROMPT_BUDGETS["plant_doctor.detail_context"],
+            name="plant_doctor.detail_context",
+            separator="\n\n",
+            fair=True
+        )
         
         print(f"[상세정보] '{disease_name}' 컨텍스트 로드 완료")
         print(f"[컨텍스트 미리보기] {context[:200]}...")
@@ -421,13 +1154,25 @@ class PlantDiseaseRAG:
             }
         ]
         
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.2
-        )
+        def generate():
+            # 여러 사용자가 같은 병해충을 동시에 조회하면 호출 하나로 합침
+            response = coalesced_chat_completion(
+                self.client,
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=0.2
+            )
+            answer = response.choices[0].message.content
+            self.answer_cache.put(cache_key, answer)
+            return answer
+        
+        def fallback(error: Exception) -> str:
+            cached = self.answer_cache.get(cache_key)
+            if cached:
+                return cached
+            return f"(AI 답변이 지연되어 수집된 원문 정보를 보여드립니다)\n\n{context}"
         
-        return response.choices[0].message.content
+        return guarded_call("openai.chat", generate, self.DETAIL_TIMEOUT, fallback)
 
 
 def main_example():
@@ -453,8 +1198,9 @@ def main_example():
     print("1단계: 작물 등록 및 병해충 데이터 수집")
     print("=" * 60)
     
-    collector = PlantDiseaseCollector(api_key=NCPMS_API_KEY)
-    crop_name = "토마토"  # 사용자가 입력한 작물명 (한글)
+    collector = PlantDiseaseCollector(api_key=NCPMS_API_KEY, cache=NcpmsResponseCache())
+    # 사용자가 입력한 작물명 (한글, 생략 시 첫 번째 지원 작물)
+    crop_name = os.getenv("CROP_NAME") or rag_system.get_supported_crops()[0]
     
     # 지원 작물 확인
     if not rag_system.is_supported_crop(crop_name):
@@ -0,0 +1,209 @@
+"""
+OpenAI 호출 속도 제한 (프로세스 전역)
+- 모델 계열(chat/embeddings/tts/whisper)별 분당 요청 수(RPM), 분당 토큰 수(TPM) 토큰 버킷
+- 계열별 동시 요청 수 제한
+- 우선순위 차선: 대화형(interactive) 요청이 백필/인덱스 생성(background)보다 먼저 처리
+- 429 응답 시 해당 계열 전체를 잠시 쉬게 함 (라이브러리 재시도가 폭주를 키우지 않도록)
+"""
+
+import time
+import heapq
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from metrics import inc, observe
+
+
+# 우선순위 차선 (숫자가 작을수록 먼저)
+LANES = {"interactive": 0, "background": 1}
+
+# 모델 계열별 기본 한도 (OpenAI 계정 등급에 맞게 configure로 조정)
+DEFAULT_LIMITS = {
+    "chat": {"rpm": 500, "tpm": 200_000, "max_concurrency": 16},
+    "embeddings": {"rpm": 3000, "tpm": 1_000_000, "max_concurrency": 8},
+    "tts": {"rpm": 50, "tpm": None, "max_concurrency": 4},
+    "whisper": {"rpm": 50, "tpm": None, "max_concurrency": 4},
+}
+
+# background 차선은 버킷의 이 비율만큼을 대화형 요청 몫으로 남겨둠
+BACKGROUND_RESERVE = 0.2
+
+_CURRENT_LANE = contextvars.ContextVar("openai_lane", default="interactive")
+
+
+@contextmanager
+def lane(name: str):
+    """
+    블록 안의 OpenAI 호출 우선순위 지정
+
+    사용 예:
+        with lane("background"):
+            mind_coach.analyze_batch(texts)
+    """
+    if name not in LANES:
+        raise ValueError(f"알 수 없는 차선: {name} (지원: {', '.join(LANES)})")
+    token = _CURRENT_LANE.set(name)
+    try:
+        yield
+    finally:
+        _CURRENT_LANE.reset(token)
+
+
+def current_lane() -> str:
+    """현재 컨텍스트의 우선순위 차선"""
+    return _CURRENT_LANE.get()
+
+
+def family_for(model: Optional[str]) -> str:
+    """모델 이름으로 계열 판별"""
+    model = (model or "").lower()
+    if "embedding" in model:
+        return "embeddings"
+    if model.startswith("tts"):
+        return "tts"
+    if model.startswith("whisper") or "transcribe" in model:
+        return "whisper"
+    return "chat"
+
+
+class TokenBucket:
+    """초당 rate만큼 채워지는 용량 capacity의 토큰 버킷 (잠금은 호출자가 관리)"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float, floor: float = 0.0) -> float:
+        """amount를 꺼낸 뒤에도 floor 이상 남으려면 기다려야 하는 시간(초)"""
+        self._refill(now)
+        deficit = min(amount, self.capacity) + floor - self.level
+        return max(0.0, deficit / self.rate)
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+
+class _FamilyState:
+    """계열 하나의 버킷, 동시 요청 수, 대기열"""
+
+    def __init__(self, rpm: int, tpm: Optional[int], max_concurrency: int):
+        self.requests = TokenBucket(rpm, rpm / 60)
+        self.tokens = TokenBucket(tpm, tpm / 60) if tpm else None
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self.cooldown_until = 0.0
+        self.waiting = []
+
+    def wait_time(self, tokens: int, now: float, reserve: float) -> Optional[float]:
+        """지금 요청을 보낼 수 있으면 0, 아니면 다시 확인할 때까지 시간(초, None이면 해제 대기)"""
+        if now < self.cooldown_until:
+            return self.cooldown_until - now
+        if self.active >= self.max_concurrency:
+            return None
+        wait = self.requests.wait_time(1, now, reserve * self.requests.capacity)
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens, now, reserve * self.tokens.capacity))
+        return wait
+
+
+class RateGovernor:
+    """모델 계열별 RPM/TPM/동시성 제한과 우선순위 대기열 (스레드 안전)"""
+
+    def __init__(self, limits: Optional[Dict[str, Dict]] = None):
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._families: Dict[str, _FamilyState] = {}
+        for family, config in (limits or DEFAULT_LIMITS).items():
+            self.configure(family, **config)
+
+    def configure(self, family: str, rpm: int, tpm: Optional[int] = None, max_concurrency: int = 8):
+        """계열 한도 설정 (기존 대기열은 유지)"""
+        with self._cond:
+            state = _FamilyState(rpm, tpm, max_concurrency)
+            previous = self._families.get(family)
+            if previous is not None:
+                state.active = previous.active
+                state.waiting = previous.waiting
+                state.cooldown_until = previous.cooldown_until
+            self._families[family] = state
+            self._cond.notify_all()
+
+    def _state(self, family: str) -> _FamilyState:
+        if family not in self._families:
+            self.configure(family, **DEFAULT_LIMITS["chat"])
+        return self._families[family]
+
+    @contextmanager
+    def acquire(self, family: str, tokens: int = 0, lane_name: Optional[str] = None):
+        """
+        요청 한 건을 보낼 수 있을 때까지 대기 후 실행 (블록을 벗어나면 동시 요청 슬롯 반환)
+
+        Args:
+            family: 모델 계열 (chat, embeddings, tts, whisper)
+            tokens: 요청 예상 토큰 수 (입력 + 예상 출력)
+            lane_name: 우선순위 차선 (생략 시 현재 컨텍스트의 차선)
+        """
+        lane_name = lane_name or current_lane()
+        reserve = BACKGROUND_RESERVE if LANES[lane_name] > 0 else 0.0
+        ticket = (LANES[lane_name], next(self._seq))
+        started = time.monotonic()
+
+        with self._cond:
+            state = self._state(family)
+            heapq.heappush(state.waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if state.waiting[0] == ticket:
+                        wait = state.wait_time(tokens, now, reserve)
+                        if wait == 0:
+                            break
+                    self._cond.wait(timeout=wait)
+            except BaseException:
+                state.waiting.remove(ticket)
+                heapq.heapify(state.waiting)
+                self._cond.notify_all()
+                raise
+
+            heapq.heappop(state.waiting)
+            state.requests.take(1)
+            if state.tokens is not None:
+                state.tokens.take(tokens)
+            state.active += 1
+            self._cond.notify_all()
+
+        waited = time.monotonic() - started
+        observe(f"rate_limiter.{family}.wait", waited)
+        if waited > 0.01:
+            inc(f"rate_limiter.{family}.{lane_name}.throttled")
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                state.active -= 1
+                self._cond.notify_all()
+
+    def report_rate_limited(self, family: str, retry_after: Optional[float] = None):
+        """429 응답을 받으면 계열 전체를 retry_after초(기본 2초) 동안 멈춤"""
+        delay = retry_after if retry_after and retry_after > 0 else 2.0
+        with self._cond:
+            state = self._state(family)
+            state.cooldown_until = max(state.cooldown_until, time.monotonic() + delay)
+            self._cond.notify_all()
+        inc(f"rate_limiter.{family}.rate_limited")
+        print(f"[경고] OpenAI {family} 호출 한도 초과(429) - {delay:.1f}초 대기")
+
+
+# 프로세스 전역 (Streamlit 세션 간 공유)
+GOVERNOR = RateGovernor()
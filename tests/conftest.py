@@ -0,0 +1,8 @@
+"""테스트 공통 설정 - 저장소 루트와 benchmarks/를 import 경로에 추가"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
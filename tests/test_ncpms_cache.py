@@ -0,0 +1,117 @@
+"""NcpmsResponseCache - 키(API 키 제외), TTL 만료, 만료 응답 대체, 오프라인 모드"""
+
+import gzip
+import json
+
+import pytest
+
+from ncpms_cache import NcpmsResponseCache, OfflineCacheMiss
+from ncpms_stub_server import NcpmsStubServer
+from plant_doctor import PlantDiseaseCollector
+
+CROP = "국화"
+
+
+def make_collector(server: NcpmsStubServer, cache: NcpmsResponseCache, tmp_path, api_key: str = "stub-key"):
+    return PlantDiseaseCollector(
+        api_key,
+        base_url=server.base_url,
+        max_workers=1,
+        min_host_interval=0.0,
+        max_retries=0,
+        retry_delay=0.01,
+        cache=cache,
+        image_dir=str(tmp_path / "crop_images")
+    )
+
+
+def age_entries(cache: NcpmsResponseCache, seconds: float):
+    """저장된 응답을 seconds만큼 오래된 것으로 고침"""
+    for path in cache.cache_dir.glob("*/*.json.gz"):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            entry = json.load(f)
+        entry["fetched_at"] -= seconds
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+
+
+def test_key_ignores_api_key(tmp_path):
+    params = {"serviceCode": "SVC01", "serviceType": "AA003", "cropName": CROP}
+    assert NcpmsResponseCache.key({**params, "apiKey": "a"}) == NcpmsResponseCache.key({**params, "apiKey": "b"})
+    assert NcpmsResponseCache.key(params) != NcpmsResponseCache.key({**params, "cropName": "장미"})
+
+    cache = NcpmsResponseCache(str(tmp_path / "cache"), offline=False)
+    with NcpmsStubServer() as server:
+        first = make_collector(server, cache, tmp_path, api_key="key-one").get_crop_diseases(CROP)
+        second = make_collector(server, cache, tmp_path, api_key="key-two").get_crop_diseases(CROP)
+
+    assert first and second == first
+    assert server.stats["SVC01.requests"] == 1
+    # 저장된 파일에 API 키가 남지 않음
+    for path in cache.cache_dir.glob("*/*.json.gz"):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            text = f.read()
+        assert "key-one" not in text and "apiKey" not in text
+
+
+def test_expired_entry_is_refetched(tmp_path):
+    cache = NcpmsResponseCache(str(tmp_path / "cache"), ttl=60, offline=False)
+    with NcpmsStubServer() as server:
+        collector = make_collector(server, cache, tmp_path)
+        collector.get_crop_diseases(CROP)
+        collector.get_crop_diseases(CROP)
+        assert server.stats["SVC01.requests"] == 1
+
+        age_entries(cache, 120)
+        assert collector.get_crop_diseases(CROP)
+        assert server.stats["SVC01.requests"] == 2
+
+        # 다시 받은 응답으로 갱신되어 다음 조회는 캐시 사용
+        collector.get_crop_diseases(CROP)
+        assert server.stats["SVC01.requests"] == 2
+
+
+def test_stale_entry_served_when_fetch_fails(tmp_path):
+    cache = NcpmsResponseCache(str(tmp_path / "cache"), ttl=60, offline=False)
+    with NcpmsStubServer() as server:
+        expected = make_collector(server, cache, tmp_path).get_crop_diseases(CROP)
+    age_entries(cache, 120)
+
+    with NcpmsStubServer(error_rate=1.0) as failing:
+        diseases = make_collector(failing, cache, tmp_path).get_crop_diseases(CROP)
+
+    assert diseases == expected
+    assert failing.stats["SVC01.errors"] == 1
+
+
+def test_offline_env_raises_on_miss_without_network(tmp_path, monkeypatch):
+    monkeypatch.setenv("MYGREEN_NCPMS_OFFLINE", "1")
+    cache = NcpmsResponseCache(str(tmp_path / "cache"))
+    assert cache.offline
+
+    def request():
+        raise AssertionError("오프라인 모드에서 네트워크 요청")
+
+    with pytest.raises(OfflineCacheMiss):
+        cache.fetch({"apiKey": "k", "serviceCode": "SVC05", "sickKey": "STUB-FL022402-01"}, request)
+
+    with NcpmsStubServer() as server:
+        collector = make_collector(server, cache, tmp_path)
+        detail, failure = collector.collect_one(CROP, 1, 1, {"sickKey": "STUB-FL022402-01", "sickNameKor": "흰녹병"})
+
+    assert detail is None
+    assert "OfflineCacheMiss" in failure["오류"]
+    assert server.stats == {}
+
+
+def test_offline_serves_expired_entries(tmp_path):
+    online = NcpmsResponseCache(str(tmp_path / "cache"), ttl=60, offline=False)
+    with NcpmsStubServer() as server:
+        expected = make_collector(server, online, tmp_path).get_crop_diseases(CROP)
+    age_entries(online, 120)
+
+    offline = NcpmsResponseCache(str(tmp_path / "cache"), ttl=60, offline=True)
+    assert offline.fetch(
+        {"apiKey": "other", "serviceCode": "SVC01", "serviceType": "AA003", "cropName": CROP},
+        lambda: pytest.fail("오프라인 모드에서 네트워크 요청")
+    )["service"]["list"] == expected
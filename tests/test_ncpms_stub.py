@@ -0,0 +1,88 @@
+"""
+PlantDiseaseCollector를 NCPMS 대체 서버(빈 포트)에 연결해 수집 순서/실패 기록/재시도 확인
+
+응답 데이터는 benchmarks/ncpms_fixtures_synthetic의 합성 데이터입니다.
+"""
+
+import pytest
+
+from ncpms_stub_server import NcpmsStubServer
+from plant_doctor import PlantDiseaseCollector
+
+CROP = "국화"
+
+
+def make_collector(server: NcpmsStubServer, tmp_path, **kwargs) -> PlantDiseaseCollector:
+    options = {"max_workers": 4, "min_host_interval": 0.0, "retry_delay": 0.01}
+    options.update(kwargs)
+    return PlantDiseaseCollector(
+        "stub",
+        base_url=server.base_url,
+        image_dir=str(tmp_path / "crop_images"),
+        **options
+    )
+
+
+def listed_keys(server: NcpmsStubServer):
+    return [item["sickKey"] for item in server.fixtures["svc01"][CROP]]
+
+
+def test_collect_all_data_keeps_list_order(tmp_path):
+    # 응답 지연을 섞어 완료 순서가 목록 순서와 달라지게 함
+    with NcpmsStubServer(latency="uniform:0.0,0.05", seed=1) as server:
+        collector = make_collector(server, tmp_path)
+        try:
+            diseases = collector.collect_all_data(CROP)
+        finally:
+            collector.close()
+
+    assert [disease["sickKey"] for disease in diseases] == listed_keys(server)
+    assert collector.last_failures == []
+    assert all(disease["작물명"] == CROP for disease in diseases)
+
+
+@pytest.mark.parametrize("fault", ["error", "drop"])
+def test_last_failures_records_failed_details(tmp_path, fault):
+    rate = {"error_rate": 1.0} if fault == "error" else {"drop_rate": 1.0}
+    with NcpmsStubServer(fault_services=["SVC05"], **rate) as server:
+        collector = make_collector(server, tmp_path, max_retries=0)
+        try:
+            diseases = collector.collect_all_data(CROP)
+        finally:
+            collector.close()
+
+    assert diseases == []
+    assert [failure["sickKey"] for failure in collector.last_failures] == listed_keys(server)
+    expected = "HTTPError" if fault == "error" else "ConnectionError"
+    assert all(expected in failure["오류"] for failure in collector.last_failures)
+
+
+def test_retry_recovers_after_initial_failures(tmp_path):
+    with NcpmsStubServer(fail_first=2) as server:
+        collector = make_collector(server, tmp_path, max_retries=2)
+        try:
+            diseases = collector.collect_all_data(CROP)
+        finally:
+            collector.close()
+
+    keys = listed_keys(server)
+    assert [disease["sickKey"] for disease in diseases] == keys
+    assert collector.last_failures == []
+    # 목록 1회 + 상세 병해충마다 2회씩 실패 후 성공
+    assert server.stats["SVC01.errors"] == 2
+    assert server.stats["SVC05.errors"] == 2 * len(keys)
+
+
+def test_images_go_to_image_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with NcpmsStubServer() as server:
+        collector = make_collector(server, tmp_path / "store")
+        try:
+            diseases = collector.collect_all_data(CROP)
+        finally:
+            collector.close()
+
+    saved = [disease["이미지경로"] for disease in diseases if disease["이미지경로"]]
+    assert saved
+    assert all(str(tmp_path / "store" / "crop_images") in path for path in saved)
+    assert not (tmp_path / "crop_images").exists()
@@ -0,0 +1,289 @@
+"""
+프롬프트 입력 토큰 예산
+- tiktoken(cl100k_base) 기반 토큰 수 계산 및 토큰 단위 자르기
+- 프롬프트별 예산 (PROMPT_BUDGETS)
+- 긴 텍스트 map-reduce 요약, 검색 컨텍스트 우선순위 자르기, 대화 이력 자르기
+- 예산 초과 빈도는 metrics 카운터(token_budget.<이름>.*)로 기록
+"""
+
+import re
+from typing import Callable, List
+
+from metrics import inc
+
+
+# 프롬프트별 입력 토큰 예산
+PROMPT_BUDGETS = {
+    "mind_coach.diary": 1500,            # 감정 분석에 넣는 일기 본문
+    "mind_coach.advice_context": 800,    # 식물 조언에 넣는 검색 문서
+    "mind_coach.past_entries": 300,      # 식물 조언에 넣는 비슷한 지난 일기
+    "plant_doctor.detail_context": 2000, # 병해충 상세 답변 컨텍스트
+    "voice_chat.history": 1200,          # 식물 친구 대화 이력
+    "voice_chat.input": 500,             # 식물 친구 대화 사용자 입력
+}
+
+# 대화 메시지 1개당 역할/구분자 토큰 (OpenAI chat 형식 기준 근사치)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_ENCODING = None
+_ENCODING_LOADED = False
+
+
+def _get_encoding():
+    """cl100k_base 인코딩 (한 번만 로드, 실패 시 None)"""
+    global _ENCODING, _ENCODING_LOADED
+    if not _ENCODING_LOADED:
+        _ENCODING_LOADED = True
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"[경고] tiktoken 인코딩 로드 실패, 추정치 사용: {e}")
+    return _ENCODING
+
+
+def count_tokens(text: str) -> int:
+    """
+    텍스트 토큰 수 계산 (cl100k_base)
+
+    tiktoken 인코딩을 불러올 수 없는 환경(오프라인 등)에서는
+    UTF-8 바이트 수 기준의 보수적 추정치를 사용합니다.
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # 한글 1글자(3바이트) ≈ 1토큰, 영문은 이보다 적으므로 상한에 가까운 추정
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = "") -> str:
+    """
+    토큰 수가 max_tokens 이하가 되도록 텍스트 뒷부분을 자름
+
+    글자 경계에서 자르므로 한글이 깨지지 않습니다.
+
+    Args:
+        text: 원본 텍스트
+        max_tokens: 최대 토큰 수
+        suffix: 잘린 경우 뒤에 붙일 표시 (예: "...", 예산에 포함)
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    limit = max_tokens - (count_tokens(suffix) if suffix else 0)
+    if limit <= 0:
+        return ""
+
+    # 예산 안에 들어가는 가장 긴 앞부분을 이진 탐색
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= limit:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low].rstrip() + suffix
+
+
+def record_budget(name: str, tokens: int, max_tokens: int) -> bool:
+    """
+    예산 검사 결과를 카운터로 기록
+
+    Returns:
+        예산 초과 여부
+    """
+    inc(f"token_budget.{name}.checked")
+    if tokens <= max_tokens:
+        return False
+    inc(f"token_budget.{name}.hit")
+    inc(f"token_budget.{name}.tokens_over", tokens - max_tokens)
+    return True
+
+
+def fit_text(text: str, max_tokens: int, name: str = "default") -> str:
+    """예산을 넘는 텍스트를 토큰 단위로 잘라 반환 (지표 기록 포함)"""
+    if not record_budget(name, count_tokens(text), max_tokens):
+        return text
+    return truncate_to_tokens(text, max_tokens, suffix="...")
+
+
+def split_by_tokens(text: str, max_tokens: int) -> List[str]:
+    """
+    문단 → 문장 경계를 유지하며 max_tokens 이하 조각으로 분할
+
+    한 문장이 예산보다 길면 토큰 단위로 잘라 나눕니다.
+    """
+    units = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) <= max_tokens:
+            units.append(paragraph)
+            continue
+        for sentence in re.split(r'(?<=[.!?。])\s+|\n', paragraph):
+            sentence = sentence.strip()
+            while sentence and count_tokens(sentence) > max_tokens:
+                head = truncate_to_tokens(sentence, max_tokens)
+                if not head:
+                    break
+                units.append(head)
+                sentence = sentence[len(head):].strip()
+            if sentence:
+                units.append(sentence)
+
+    pieces, current, current_tokens = [], [], 0
+    for unit in units:
+        tokens = count_tokens(unit)
+        if current and current_tokens + tokens > max_tokens:
+            pieces.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += tokens
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+def summarize_to_budget(
+    text: str,
+    max_tokens: int,
+    summarize_many: Callable[[List[str]], List[str]],
+    name: str = "default",
+    max_rounds: int = 2
+) -> str:
+    """
+    예산을 넘는 텍스트를 map-reduce 방식으로 요약
+
+    1) map: 예산 크기 조각으로 나눠 조각별 요약 (summarize_many로 한 번에 요청)
+    2) reduce: 요약을 이어 붙여도 예산을 넘으면 요약본을 다시 같은 방식으로 요약
+    max_rounds 후에도 넘으면 토큰 단위로 잘라 상한을 보장합니다.
+
+    Args:
+        text: 원본 텍스트
+        max_tokens: 최대 토큰 수
+        summarize_many: 조각 목록 → 요약 목록 (예: 요약 체인의 batch)
+        name: 지표 이름 (token_budget.<name>.*)
+        max_rounds: 최대 요약 단계 수
+    """
+    tokens = count_tokens(text)
+    if not record_budget(name, tokens, max_tokens):
+        return text
+
+    current = text
+    for _ in range(max_rounds):
+        pieces = split_by_tokens(current, max_tokens)
+        inc(f"token_budget.{name}.summarized_pieces", len(pieces))
+        current = "\n".join(summary.strip() for summary in summarize_many(pieces))
+        if count_tokens(current) <= max_tokens:
+            break
+
+    return truncate_to_tokens(current, max_tokens, suffix="...")
+
+
+def _fair_shares(token_counts: List[int], max_tokens: int) -> List[int]:
+    """짧은 항목은 그대로 두고 남는 예산을 긴 항목끼리 균등 분배 (water-filling)"""
+    shares = [0] * len(token_counts)
+    remaining = max_tokens
+    pending = sorted(range(len(token_counts)), key=lambda i: token_counts[i])
+    while pending:
+        share = remaining // len(pending)
+        i = pending[0]
+        if token_counts[i] <= share:
+            shares[i] = token_counts[i]
+            remaining -= token_counts[i]
+            pending.pop(0)
+        else:
+            for i in pending:
+                shares[i] = share
+            break
+    return shares
+
+
+def fit_context(
+    chunks: List[str],
+    max_tokens: int,
+    name: str = "default",
+    separator: str = "\n",
+    fair: bool = False,
+    min_chunk_tokens: int = 50
+) -> str:
+    """
+    검색 문서를 예산 안에 맞춰 이어 붙임
+
+    Args:
+        chunks: 우선순위 순서의 문서 목록 (검색 순위 순)
+        max_tokens: 최대 토큰 수
+        name: 지표 이름 (token_budget.<name>.*)
+        separator: 문서 구분자
+        fair: True면 모든 문서를 남기고 긴 문서부터 균등하게 자름 (구조화된 섹션용),
+              False면 앞 순위 문서부터 채우고 남는 예산으로 다음 문서를 자름
+        min_chunk_tokens: 우선순위 모드에서 잘린 문서로 넣을 최소 남은 예산
+    """
+    chunks = [chunk for chunk in chunks if chunk]
+    counts = [count_tokens(chunk) for chunk in chunks]
+    separator_tokens = count_tokens(separator) if separator else 0
+    total = sum(counts) + separator_tokens * max(0, len(chunks) - 1)
+
+    if not record_budget(name, total, max_tokens):
+        return separator.join(chunks)
+
+    available = max_tokens - separator_tokens * max(0, len(chunks) - 1)
+
+    if fair:
+        shares = _fair_shares(counts, max(0, available))
+        kept = [
+            chunk if share >= count else truncate_to_tokens(chunk, share, suffix="...")
+            for chunk, count, share in zip(chunks, counts, shares)
+        ]
+        return separator.join(chunk for chunk in kept if chunk)
+
+    kept, remaining = [], max_tokens
+    for chunk, count in zip(chunks, counts):
+        cost = count + (separator_tokens if kept else 0)
+        if cost <= remaining:
+            kept.append(chunk)
+            remaining -= cost
+            continue
+        room = remaining - (separator_tokens if kept else 0)
+        if room >= min_chunk_tokens:
+            kept.append(truncate_to_tokens(chunk, room, suffix="..."))
+        break
+    return separator.join(kept)
+
+
+def _message_tokens(message) -> int:
+    """대화 메시지 1개의 토큰 수 (BaseMessage 또는 {"content": ...})"""
+    content = message.get("content", "") if isinstance(message, dict) else getattr(message, "content", "")
+    if not isinstance(content, str):
+        content = str(content)
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def trim_messages(messages: List, max_tokens: int, name: str = "default") -> List:
+    """
+    대화 이력을 최신 메시지부터 예산만큼만 남김
+
+    Args:
+        messages: 오래된 순서의 메시지 목록 (BaseMessage 또는 dict)
+        max_tokens: 최대 토큰 수
+        name: 지표 이름 (token_budget.<name>.*)
+
+    Returns:
+        예산 안에 들어가는 최근 메시지 목록 (원래 순서 유지)
+    """
+    counts = [_message_tokens(message) for message in messages]
+    if not record_budget(name, sum(counts), max_tokens):
+        return list(messages)
+
+    kept, used = [], 0
+    for message, tokens in zip(reversed(messages), reversed(counts)):
+        if used + tokens > max_tokens:
+            break
+        kept.append(message)
+        used += tokens
+    inc(f"token_budget.{name}.messages_dropped", len(messages) - len(kept))
+    return list(reversed(kept))
+
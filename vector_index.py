@@ -0,0 +1,159 @@
+"""
+인메모리 NumPy 벡터 인덱스
+- 정규화된 float32 임베딩 행렬을 .npy 파일로 저장하고 memory-map으로 로드
+- 내적(코사인 유사도) 한 번과 argpartition으로 Top-K 검색
+- 문서 수가 적은 코퍼스에서 Chroma(SQLite/HNSW) 로딩 비용 없이 검색
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class NumpyVectorIndex:
+    """정규화된 float32 행렬 기반 벡터 인덱스 (Chroma similarity_search 호환)"""
+
+    VECTORS_FILE = "vectors.npy"
+    RECORDS_FILE = "records.json"
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        documents: List[str],
+        metadatas: Optional[List[Dict]] = None,
+        ids: Optional[List[str]] = None,
+        embedding_function=None,
+        info: Optional[Dict] = None
+    ):
+        """
+        Args:
+            vectors: (문서 수, 차원) 임베딩 행렬 (정규화 전이어도 됨)
+            documents: 문서 본문 목록
+            metadatas: 문서별 메타데이터 목록
+            ids: 문서 ID 목록
+            embedding_function: 질의 임베딩에 사용할 Embeddings (embed_query 필요)
+            info: 인덱스와 함께 저장할 부가 정보 (원본 해시, 임베딩 모델 등)
+        """
+        self.vectors = self._normalize(vectors)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas) if metadatas is not None else [{} for _ in self.documents]
+        self.ids = list(ids) if ids is not None else [str(i) for i in range(len(self.documents))]
+        self.embedding_function = embedding_function
+        self.info = dict(info or {})
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        """행 단위 L2 정규화 (이미 정규화된 memmap은 그대로 사용)"""
+        if isinstance(vectors, np.memmap):
+            return vectors
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) == 0:
+            return vectors.reshape(len(vectors), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    # ===== 생성 / 저장 / 로드 =====
+
+    @classmethod
+    def from_chroma(cls, db, embedding_function=None, info: Optional[Dict] = None) -> "NumpyVectorIndex":
+        """기존 Chroma 컬렉션의 임베딩을 그대로 가져와 생성 (재임베딩 없음)"""
+        data = db.get(include=["embeddings", "documents", "metadatas"])
+        vectors = np.asarray(data["embeddings"], dtype=np.float32)
+        return cls(
+            vectors,
+            data["documents"],
+            metadatas=[m or {} for m in data["metadatas"]],
+            ids=data["ids"],
+            embedding_function=embedding_function or getattr(db, "embeddings", None),
+            info=info
+        )
+
+    def save(self, index_dir: str):
+        """인덱스를 디렉토리에 저장 (vectors.npy + records.json)"""
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        np.save(index_dir / self.VECTORS_FILE, np.ascontiguousarray(self.vectors, dtype=np.float32))
+        with open(index_dir / self.RECORDS_FILE, "w", encoding="utf-8") as f:
+            json.dump(
+                {"ids": self.ids, "documents": self.documents, "metadatas": self.metadatas, "info": self.info},
+                f, ensure_ascii=False
+            )
+
+    @classmethod
+    def exists(cls, index_dir: str) -> bool:
+        """저장된 인덱스가 있는지 확인"""
+        index_dir = Path(index_dir)
+        return (index_dir / cls.VECTORS_FILE).exists() and (index_dir / cls.RECORDS_FILE).exists()
+
+    @classmethod
+    def load(cls, index_dir: str, embedding_function=None, mmap: bool = True) -> "NumpyVectorIndex":
+        """저장된 인덱스 로드 (기본: 행렬을 memory-map으로 열어 복사 없이 사용)"""
+        index_dir = Path(index_dir)
+        vectors = np.load(index_dir / cls.VECTORS_FILE, mmap_mode="r" if mmap else None)
+        with open(index_dir / cls.RECORDS_FILE, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        index = cls.__new__(cls)
+        index.vectors = vectors if mmap else cls._normalize(vectors)
+        index.documents = records["documents"]
+        index.metadatas = records["metadatas"]
+        index.ids = records["ids"]
+        index.embedding_function = embedding_function
+        index.info = records.get("info", {})
+        return index
+
+    # ===== 검색 =====
+
+    def search_by_vector(self, query_vector, k: int = 4) -> List[Tuple[int, float]]:
+        """
+        질의 벡터로 Top-K 검색
+
+        Returns:
+            유사도 내림차순 (문서 위치, 코사인 유사도) 목록
+        """
+        n = len(self.documents)
+        if n == 0 or k <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        scores = self.vectors @ query
+        k = min(k, n)
+        if k < n:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def similarity_search_with_score(self, query: str, k: int = 4) -> List[Tuple["Document", float]]:
+        """텍스트 질의로 검색 (Document, 코사인 유사도) 반환"""
+        from langchain_core.documents import Document
+
+        if self.embedding_function is None:
+            raise ValueError("질의 임베딩을 위한 embedding_function이 없습니다.")
+
+        query_vector = self.embedding_function.embed_query(query)
+        return [
+            (Document(page_content=self.documents[i], metadata=self.metadatas[i]), score)
+            for i, score in self.search_by_vector(query_vector, k)
+        ]
+
+    def similarity_search(self, query: str, k: int = 4) -> List["Document"]:
+        """텍스트 질의로 검색 (Chroma.similarity_search와 같은 형식)"""
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def as_retriever(self, search_kwargs: Optional[Dict] = None):
+        """invoke/abatch를 지원하는 검색 Runnable 반환 (Chroma.as_retriever 대체)"""
+        from langchain_core.runnables import RunnableLambda
+
+        k = (search_kwargs or {}).get("k", 4)
+        return RunnableLambda(lambda query: self.similarity_search(query, k=k))